@@ -0,0 +1,288 @@
+"""Analyze likes across locally stored messages.
+
+Messages carry the user IDs of everyone who liked them in ``favorited_by``,
+so once messages have been fetched (for example with
+:func:`~groupy.api.messages.Messages.backfill`), like statistics for any
+window of time can be computed without further requests. Likes have no time
+of their own, so windows select messages by when they were created.
+
+Computations over large archives use `NumPy <https://numpy.org/>`_ when it
+is installed, which is an optional dependency::
+
+    pip install GroupyAPI[analytics]
+"""
+import collections
+import datetime
+import heapq
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def to_timestamp(when):
+    """Return a POSIX timestamp for a time.
+
+    :param when: a :class:`~datetime.datetime` or a timestamp
+    :return: the timestamp, or ``None`` if no time is given
+    :rtype: float
+    """
+    if when is None:
+        return None
+    if isinstance(when, datetime.datetime):
+        return when.timestamp()
+    return float(when)
+
+
+class LikedMessage:
+    """The like data of one message.
+
+    :param str message_id: the ID of the message
+    :param str sender_id: the user ID of its sender
+    :param float created_at: when it was created, as a timestamp
+    :param likers: the user IDs of those who liked it
+    :type likers: :class:`list`
+    """
+
+    def __init__(self, message_id, sender_id, created_at, likers):
+        self.message_id = message_id
+        self.sender_id = sender_id
+        self.created_at = created_at
+        self.likers = likers
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return '<{}(message_id={!r}, like_count={})>'.format(
+            klass, self.message_id, self.like_count)
+
+    @property
+    def like_count(self):
+        """Return the number of likes."""
+        return len(self.likers)
+
+    @classmethod
+    def from_message(cls, message):
+        """Create like data from a message.
+
+        :param message: a message
+        :type message: :class:`~groupy.api.messages.GenericMessage`
+        :rtype: :class:`~groupy.analytics.LikedMessage`
+        """
+        data = message.data
+        sender_id = data.get('user_id') or data.get('sender_id')
+        likers = list(data.get('favorited_by') or [])
+        return cls(message.id, sender_id, float(data['created_at']), likers)
+
+
+class LikeAnalytics:
+    """Like statistics over a growing set of messages.
+
+    Messages can be added page by page. Adding a message again replaces its
+    earlier like data, so refetched pages keep the statistics current. The
+    all-time given and received counts are maintained as messages are added;
+    other statistics are computed on demand, vectorized with NumPy when it is
+    available and ``use_numpy`` is not turned off.
+
+    :param messages: messages to start with
+    :param bool use_numpy: whether to use NumPy if it is installed
+    """
+
+    def __init__(self, messages=None, use_numpy=True):
+        self.use_numpy = use_numpy and numpy is not None
+        self.messages = {}
+        #: the number of likes given by each user
+        self.given = collections.Counter()
+        #: the number of likes received by each user
+        self.received = collections.Counter()
+        self._arrays = None
+        if messages is not None:
+            self.add(messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def _count(self, liked, sign):
+        for liker in liked.likers:
+            self.given[liker] += sign
+        self.received[liked.sender_id] += sign * liked.like_count
+
+    def add(self, messages):
+        """Add or update messages.
+
+        :param messages: messages
+        :return: the number of messages not seen before
+        :rtype: int
+        """
+        new_count = 0
+        for message in messages:
+            liked = LikedMessage.from_message(message)
+            previous = self.messages.get(liked.message_id)
+            if previous is None:
+                new_count += 1
+            else:
+                self._count(previous, -1)
+            self.messages[liked.message_id] = liked
+            self._count(liked, 1)
+        self._arrays = None
+        # drop users whose counts fell to zero after updates
+        self.given += collections.Counter()
+        self.received += collections.Counter()
+        return new_count
+
+    def _select(self, start, end):
+        start, end = to_timestamp(start), to_timestamp(end)
+        for liked in self.messages.values():
+            if start is not None and liked.created_at < start:
+                continue
+            if end is not None and liked.created_at >= end:
+                continue
+            yield liked
+
+    def _get_arrays(self):
+        if self._arrays is not None:
+            return self._arrays
+        user_ids = []
+        indexes = {}
+
+        def get_index(user_id):
+            if user_id not in indexes:
+                indexes[user_id] = len(user_ids)
+                user_ids.append(user_id)
+            return indexes[user_id]
+
+        liked_list = list(self.messages.values())
+        likers, senders, like_times = [], [], []
+        for liked in liked_list:
+            sender = get_index(liked.sender_id)
+            for liker in liked.likers:
+                likers.append(get_index(liker))
+                senders.append(sender)
+                like_times.append(liked.created_at)
+        self._arrays = {
+            'user_ids': user_ids,
+            'messages': liked_list,
+            'times': numpy.array([m.created_at for m in liked_list],
+                                 dtype=float),
+            'counts': numpy.array([m.like_count for m in liked_list],
+                                  dtype=int),
+            'likers': numpy.array(likers, dtype=int),
+            'senders': numpy.array(senders, dtype=int),
+            'like_times': numpy.array(like_times, dtype=float),
+        }
+        return self._arrays
+
+    @staticmethod
+    def _get_mask(times, start, end):
+        mask = numpy.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= to_timestamp(start)
+        if end is not None:
+            mask &= times < to_timestamp(end)
+        return mask
+
+    def top_messages(self, k=10, start=None, end=None):
+        """Return the most liked messages created within a window.
+
+        :param int k: the number of messages
+        :param start: the start of the window (inclusive)
+        :param end: the end of the window (exclusive)
+        :return: the like data of the messages, most liked first
+        :rtype: :class:`list`
+        """
+        if not self.use_numpy:
+            return heapq.nlargest(k, self._select(start, end),
+                                  key=lambda m: m.like_count)
+        arrays = self._get_arrays()
+        indexes = numpy.nonzero(self._get_mask(arrays['times'], start, end))[0]
+        counts = arrays['counts'][indexes]
+        if k < len(indexes):
+            best = numpy.argpartition(-counts, k)[:k]
+            indexes, counts = indexes[best], counts[best]
+        order = numpy.argsort(-counts, kind='stable')
+        return [arrays['messages'][i] for i in indexes[order]]
+
+    def count_likes(self, start=None, end=None):
+        """Return the likes given and received by each user within a window.
+
+        :param start: the start of the window (inclusive)
+        :param end: the end of the window (exclusive)
+        :return: the given and the received counts by user ID
+        :rtype: tuple
+        """
+        if start is None and end is None:
+            return (collections.Counter(self.given),
+                    collections.Counter(self.received))
+        if not self.use_numpy:
+            given, received = collections.Counter(), collections.Counter()
+            for liked in self._select(start, end):
+                given.update(liked.likers)
+                if liked.likers:
+                    received[liked.sender_id] += liked.like_count
+            return given, received
+        arrays = self._get_arrays()
+        mask = self._get_mask(arrays['like_times'], start, end)
+        size = len(arrays['user_ids'])
+        given_counts = numpy.bincount(arrays['likers'][mask], minlength=size)
+        received_counts = numpy.bincount(arrays['senders'][mask],
+                                         minlength=size)
+        return (self._to_counter(given_counts),
+                self._to_counter(received_counts))
+
+    def _to_counter(self, counts):
+        user_ids = self._get_arrays()['user_ids']
+        return collections.Counter({user_ids[i]: int(counts[i])
+                                    for i in numpy.nonzero(counts)[0]})
+
+    def top_users(self, k=10, start=None, end=None, received=True):
+        """Return the users with the most likes within a window.
+
+        :param int k: the number of users
+        :param start: the start of the window (inclusive)
+        :param end: the end of the window (exclusive)
+        :param bool received: whether to rank by likes received rather than
+                              likes given
+        :return: pairs of user ID and like count, most liked first
+        :rtype: :class:`list`
+        """
+        given_counts, received_counts = self.count_likes(start=start, end=end)
+        counts = received_counts if received else given_counts
+        return heapq.nlargest(k, counts.items(), key=lambda item: item[1])
+
+    def get_graph(self, start=None, end=None):
+        """Return who liked whose messages within a window.
+
+        :param start: the start of the window (inclusive)
+        :param end: the end of the window (exclusive)
+        :return: the number of likes from each liker to each sender, as
+                 ``{liker: {sender: count}}``
+        :rtype: dict
+        """
+        graph = collections.defaultdict(collections.Counter)
+        for liked in self._select(start, end):
+            for liker in liked.likers:
+                graph[liker][liked.sender_id] += 1
+        return dict(graph)
+
+    def get_adjacency_matrix(self, start=None, end=None):
+        """Return who liked whose messages within a window, as a matrix.
+
+        Requires NumPy.
+
+        :param start: the start of the window (inclusive)
+        :param end: the end of the window (exclusive)
+        :return: the user IDs, and a square matrix in which the entry at row
+                 ``i`` and column ``j`` is the number of likes from user ``i``
+                 to messages of user ``j``
+        :rtype: tuple
+        :raises ImportError: if NumPy is not installed
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required for an adjacency matrix')
+        arrays = self._get_arrays()
+        mask = self._get_mask(arrays['like_times'], start, end)
+        size = len(arrays['user_ids'])
+        matrix = numpy.zeros((size, size), dtype=int)
+        pairs = (arrays['likers'][mask], arrays['senders'][mask])
+        numpy.add.at(matrix, pairs, 1)
+        return list(arrays['user_ids']), matrix
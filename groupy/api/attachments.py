@@ -1,5 +1,13 @@
+from collections import namedtuple
+from concurrent import futures
+import os
+import threading
+
+import requests
+
 from . import base
 from groupy import utils
+from groupy import exceptions
 
 
 # use a class registry to enable factory creation of attachment objects
@@ -130,39 +138,119 @@ class LinkedImage(Image):
 
 
 class Images(base.Manager):
-    """A manager for handling image uploads/downloads."""
+    """A manager for handling image uploads/downloads.
+
+    :param session: the request session
+    :type session: :class:`~groupy.session.Session`
+    :param cache: an optional cache for downloaded images
+    :type cache: :class:`~groupy.cache.ImageCache`
+    :param compressor: an optional compressor for uploaded images
+    :type compressor: :class:`~groupy.compression.ImageCompressor`
+    """
 
     #: the base url for the pictures API
     base_url = 'https://image.groupme.com/'
 
+    #: the outcome of one upload of :func:`upload_many`
+    UploadResult = namedtuple('UploadResult', 'source image error')
+
+    def __init__(self, session, cache=None, compressor=None):
+        super().__init__(session)
+        self.cache = cache
+        self.compressor = compressor
+
     def from_file(self, fp):
         """Create a new image attachment from an image file.
 
-        :param file fp: a file object containing binary image data
+        :param fp: a file object containing binary image data, or a path
         :return: an image attachment
         :rtype: :class:`~groupy.api.attachments.Image`
         """
         image_urls = self.upload(fp)
         return Image(image_urls['url'], source_url=image_urls['picture_url'])
 
-    def upload(self, fp):
+    def upload(self, fp, compress=True):
         """Upload image data to the image service.
 
         Call this, rather than :func:`from_file`, you don't want to
-        create an attachment of the image.
+        create an attachment of the image. The data is streamed from the file
+        rather than read into memory first, unless the manager has a
+        compressor, in which case the image is compressed first.
 
-        :param file fp: a file object containing binary image data
+        :param fp: a file object containing binary image data, or a path
+        :param bool compress: whether to use the compressor, if any
         :return: the URLs for the image uploaded
         :rtype: dict
         """
+        if isinstance(fp, (str, os.PathLike)):
+            with open(fp, 'rb') as f:
+                return self.upload(f, compress=compress)
+        if compress and self.compressor is not None:
+            fp = self.compressor.compress(fp)
         url = utils.urljoin(self.url, 'pictures')
-        response = self.session.post(url, data=fp.read())
+        response = self.session.post(url, data=fp)
         image_urls = response.data
         return image_urls
 
+    def upload_many(self, files, workers=4):
+        """Create image attachments from many image files concurrently.
+
+        A failed upload does not affect the others; its exception is returned
+        in place of the image. If the manager has a compressor configured with
+        processes, the images are compressed in its process pool and each is
+        uploaded as soon as it is compressed; at most twice as many compressed
+        images as workers wait to be uploaded at once.
+
+        :param files: file objects containing binary image data, or paths
+        :type files: :class:`list`
+        :param int workers: the number of concurrent uploads
+        :return: the result of each upload, in the order given
+        :rtype: :class:`list` of
+                :class:`~groupy.api.attachments.Images.UploadResult`
+        """
+        files = list(files)
+
+        def upload(source, compressed=None):
+            try:
+                if isinstance(compressed, Exception):
+                    raise compressed
+                if compressed is None:
+                    image_urls = self.upload(source)
+                else:
+                    image_urls = self.upload(compressed, compress=False)
+            except Exception as e:
+                return self.UploadResult(source, None, e)
+            image = Image(image_urls['url'],
+                          source_url=image_urls['picture_url'])
+            return self.UploadResult(source, image, None)
+
+        if self.compressor is None or not self.compressor.processes:
+            with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(upload, files))
+
+        def upload_compressed(source, compressed, slots):
+            try:
+                return upload(source, compressed)
+            finally:
+                slots.release()
+
+        slots = threading.BoundedSemaphore(workers * 2)
+        results = [None] * len(files)
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            jobs = []
+            for index, compressed in self.compressor.iter_compressed(files):
+                slots.acquire()
+                jobs.append((index, executor.submit(
+                    upload_compressed, files[index], compressed, slots)))
+        for index, job in jobs:
+            results[index] = job.result()
+        return results
+
     def download(self, image, url_field='url', suffix=None):
         """Download the binary data of an image attachment.
 
+        If the manager has a cache, the image is only downloaded on a miss.
+
         :param image: an image attachment
         :type image: :class:`~groupy.api.attachments.Image`
         :param str url_field: the field of the image with the right URL
@@ -170,12 +258,135 @@ class Images(base.Manager):
         :return: binary image data
         :rtype: bytes
         """
-        url = getattr(image, url_field)
-        if suffix is not None:
-            url = '.'.join(url, suffix)
+        url = self.get_url(image, url_field=url_field, suffix=suffix)
+        if self.cache is not None:
+            content = self.cache.get(url)
+            if content is not None:
+                return content
         response = self.session.get(url)
+        if self.cache is not None:
+            self.cache.put(url, response.content)
         return response.content
 
+    def get_url(self, image, url_field='url', suffix=None):
+        """Return the URL of an image attachment.
+
+        :param image: an image attachment
+        :type image: :class:`~groupy.api.attachments.Image`
+        :param str url_field: the field of the image with the right URL
+        :param str suffix: an optional URL suffix (such as ``'preview'``,
+                           ``'large'``, or ``'avatar'``)
+        :return: the URL
+        :rtype: str
+        """
+        url = getattr(image, url_field)
+        if suffix is not None:
+            url = '{}.{}'.format(url, suffix)
+        return url
+
+    def download_to(self, image, dest, url_field='url', suffix=None,
+                    chunk_size=65536, resume=False):
+        """Stream the binary data of an image attachment to a file.
+
+        The data is written in chunks, so memory use is bounded by the chunk
+        size. If the manager has a cache, the image is copied from the cache
+        instead whenever possible.
+
+        With ``resume``, an existing file at ``dest`` is taken to be a partial
+        download of the same image, and only the rest of the file is requested
+        with an HTTP range request. If the server does not return exactly the
+        rest of the file, the file is downloaded again from the start.
+
+        :param image: an image attachment
+        :type image: :class:`~groupy.api.attachments.Image`
+        :param dest: a path or a file object opened for binary writing
+        :param str url_field: the field of the image with the right URL
+        :param str suffix: an optional URL suffix
+        :param int chunk_size: number of bytes to read at a time
+        :param bool resume: whether to resume a partially downloaded file
+        :return: the number of bytes written
+        :rtype: int
+        :raises groupy.exceptions.NoResponse: if the download is interrupted
+        """
+        url = self.get_url(image, url_field=url_field, suffix=suffix)
+        if self.cache is not None:
+            return self._download_through_cache(url, dest,
+                                                chunk_size=chunk_size)
+        if hasattr(dest, 'write'):
+            return self._stream(url, dest, chunk_size=chunk_size)
+        offset = 0
+        if resume and os.path.exists(dest):
+            offset = os.path.getsize(dest)
+        with open(dest, 'ab' if offset else 'wb') as fp:
+            return self._stream(url, fp, offset=offset, chunk_size=chunk_size)
+
+    def _download_through_cache(self, url, dest, chunk_size=65536):
+        src = self.cache.open(url)
+        tmp_path = None
+        try:
+            if src is None:
+                with self.cache.create_temp_file() as f:
+                    tmp_path = f.name
+                    self._stream(url, f, chunk_size=chunk_size)
+                src = open(tmp_path, 'rb')
+            with src:
+                if hasattr(dest, 'write'):
+                    written = self._copy(src, dest, chunk_size=chunk_size)
+                else:
+                    with open(dest, 'wb') as fp:
+                        written = self._copy(src, fp, chunk_size=chunk_size)
+        except Exception:
+            if tmp_path is not None:
+                os.remove(tmp_path)
+            raise
+        if tmp_path is not None:
+            self.cache.add(url, tmp_path)
+        return written
+
+    @staticmethod
+    def _copy(src, dest, chunk_size=65536):
+        written = 0
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            dest.write(chunk)
+            written += len(chunk)
+        return written
+
+    def _stream(self, url, fp, offset=0, chunk_size=65536):
+        headers = {'range': 'bytes={}-'.format(offset)} if offset else None
+        try:
+            response = self.session.get(url, headers=headers, stream=True)
+        except exceptions.BadResponse as e:
+            # nothing remains beyond the offset
+            if offset and e.response.status_code == 416:
+                return 0
+            raise
+        try:
+            if offset and response.status_code == 206:
+                content_range = response.headers.get('content-range') or ''
+                if not content_range.startswith('bytes {}-'.format(offset)):
+                    # not the rest of the file, so start over
+                    response.close()
+                    return self._restart(url, fp, chunk_size=chunk_size)
+            elif offset:
+                # the range was ignored so start over
+                fp.seek(0)
+                fp.truncate()
+            written = 0
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    fp.write(chunk)
+                    written += len(chunk)
+            except requests.RequestException as e:
+                raise exceptions.NoResponse(e.request) from e
+            return written
+        finally:
+            response.close()
+
+    def _restart(self, url, fp, chunk_size=65536):
+        fp.seek(0)
+        fp.truncate()
+        return self._stream(url, fp, chunk_size=chunk_size)
+
     def download_preview(self, image, url_field='url'):
         """Downlaod the binary data of an image attachment at preview size.
 
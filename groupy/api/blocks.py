@@ -1,3 +1,6 @@
+import threading
+import time
+
 from . import base
 
 
@@ -12,6 +15,7 @@ class Blocks(base.Manager):
     def __init__(self, session, user_id):
         super().__init__(session, 'blocks')
         self.user_id = user_id
+        self._cache = None
 
     def list(self):
         """List the users you have blocked.
@@ -44,6 +48,8 @@ class Blocks(base.Manager):
         params = {'user': self.user_id, 'otherUser': other_user_id}
         response = self.session.post(self.url, params=params)
         block = response.data['block']
+        if self._cache is not None:
+            self._cache.add(other_user_id)
         return Block(self, **block)
 
     def unblock(self, other_user_id):
@@ -55,8 +61,31 @@ class Blocks(base.Manager):
         """
         params = {'user': self.user_id, 'otherUser': other_user_id}
         response = self.session.delete(self.url, params=params)
+        if response.ok and self._cache is not None:
+            self._cache.discard(other_user_id)
         return response.ok
 
+    def cached(self, ttl=None):
+        """Return a local set of the users you have blocked.
+
+        The set is shared by every call on this manager, and is kept up to
+        date when blocking or unblocking through this manager. Pass it to
+        :func:`~groupy.api.memberships.Member.block` and
+        :func:`~groupy.api.memberships.Member.unblock` to keep it up to date
+        when blocking or unblocking members too.
+
+        :param float ttl: the number of seconds before the blocks are listed
+                          again (the current TTL, or 300 for a new set, if
+                          ``None``)
+        :return: the blocked users
+        :rtype: :class:`~groupy.api.blocks.BlockSet`
+        """
+        if self._cache is None:
+            self._cache = BlockSet(self, ttl=300 if ttl is None else ttl)
+        elif ttl is not None:
+            self._cache.ttl = ttl
+        return self._cache
+
 
 class Block(base.ManagedResource):
     """A block between you and another user."""
@@ -83,3 +112,87 @@ class Block(base.ManagedResource):
         :rtype: bool
         """
         return self.manager.unblock(other_user_id=self.blocked_user_id)
+
+
+class BlockSet:
+    """A locally cached set of the users you have blocked.
+
+    The blocks are listed with one request, and then any number of users can
+    be checked without further requests until the blocks are ``ttl`` seconds
+    old.
+
+    :param manager: a blocks manager
+    :type manager: :class:`~groupy.api.blocks.Blocks`
+    :param float ttl: the number of seconds before the blocks are listed again
+    :param func clock: a function returning the current time in seconds
+    """
+
+    def __init__(self, manager, ttl=300, clock=time.monotonic):
+        self.manager = manager
+        self.ttl = ttl
+        self.clock = clock
+        self.user_ids = set()
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id):
+        return self.is_blocked(user_id)
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self.user_ids)
+
+    @property
+    def is_stale(self):
+        """Return ``True`` if the blocks should be listed again."""
+        if self.loaded_at is None:
+            return True
+        return self.clock() - self.loaded_at >= self.ttl
+
+    def refresh(self):
+        """List the blocks again."""
+        user_ids = {block.blocked_user_id for block in self.manager.list()}
+        with self._lock:
+            self.user_ids = user_ids
+            self.loaded_at = self.clock()
+
+    def _ensure_fresh(self):
+        if self.is_stale:
+            self.refresh()
+
+    def add(self, user_id):
+        """Record a new block without listing the blocks again.
+
+        :param str user_id: the ID of the blocked user
+        """
+        with self._lock:
+            self.user_ids.add(user_id)
+
+    def discard(self, user_id):
+        """Record a removed block without listing the blocks again.
+
+        :param str user_id: the ID of the unblocked user
+        """
+        with self._lock:
+            self.user_ids.discard(user_id)
+
+    def is_blocked(self, user_id):
+        """Check whether you have a user blocked.
+
+        :param str user_id: the ID of a user
+        :return: ``True`` if the user is blocked
+        :rtype: bool
+        """
+        self._ensure_fresh()
+        return user_id in self.user_ids
+
+    def filter_blocked(self, members):
+        """Return the members whose users you have blocked.
+
+        :param members: members, or anything else with a ``user_id``
+        :type members: :class:`list`
+        :return: the blocked members, in the order given
+        :rtype: :class:`list`
+        """
+        self._ensure_fresh()
+        return [m for m in members if m.user_id in self.user_ids]
@@ -1,7 +1,19 @@
+from concurrent import futures
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
 from . import base
+from groupy import broadcast
 from groupy import utils
 
 
+logger = logging.getLogger(__name__)
+
+
 class Bots(base.Manager):
     """A bot manager."""
 
@@ -62,6 +74,33 @@ class Bots(base.Manager):
         response = self.session.post(url, json=payload)
         return response.ok
 
+    def broadcast(self, bot_ids, text, attachments=None, **kwargs):
+        """Post the same message as many bots in parallel.
+
+        :param bot_ids: the IDs of the bots
+        :type bot_ids: :class:`list`
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :param kwargs kwargs: additional :class:`~groupy.broadcast.Broadcaster`
+                              arguments
+        :return: the result for each bot, in the order given
+        :rtype: :class:`list`
+        """
+        broadcaster = broadcast.Broadcaster(**kwargs)
+        return broadcaster.to_bots(self, bot_ids, text,
+                                   attachments=attachments)
+
+    def dispatcher(self, **kwargs):
+        """Return a dispatcher for posting many bot messages concurrently.
+
+        :param kwargs kwargs: additional :class:`~groupy.api.bots.Dispatcher`
+                              arguments
+        :return: a running dispatcher
+        :rtype: :class:`~groupy.api.bots.Dispatcher`
+        """
+        return Dispatcher(self, **kwargs)
+
     def destroy(self, bot_id):
         """Destroy a bot.
 
@@ -103,3 +142,241 @@ class Bot(base.ManagedResource):
         :rtype: bool
         """
         return self.manager.destroy(self.bot_id)
+
+
+class DispatchStats(utils.Stats):
+    """Statistics about the posts of a dispatcher."""
+
+    def __init__(self):
+        super().__init__()
+        #: the number of posts submitted
+        self.submitted = 0
+        #: the number of posts delivered
+        self.delivered = 0
+        #: the number of posts that failed for good
+        self.failed = 0
+        #: the number of retries after transient failures
+        self.retries = 0
+        #: the total number of seconds posts spent queued before delivery
+        self.total_latency = 0
+        #: the longest number of seconds a post spent queued before delivery
+        self.max_latency = 0
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(submitted={}, delivered={}, failed={})>'
+                .format(klass, self.submitted, self.delivered, self.failed))
+
+    def add_delivery(self, latency):
+        """Record a delivered post.
+
+        :param float latency: seconds between submission and delivery
+        """
+        with self._lock:
+            self.delivered += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    @property
+    def mean_latency(self):
+        """Return the mean number of seconds from submission to delivery."""
+        return self.total_latency / self.delivered if self.delivered else 0
+
+    @property
+    def throughput(self):
+        """Return the number of posts delivered per second."""
+        return self.get_rate('delivered')
+
+
+class _Post:
+    def __init__(self, bot_id, text, attachments, priority):
+        self.bot_id = bot_id
+        self.text = text
+        self.attachments = attachments
+        self.priority = priority
+        self.attempts = 0
+        self.submitted_at = time.monotonic()
+        self.future = futures.Future()
+        self.is_finished = False
+
+
+class Dispatcher:
+    """Post bot messages from a bounded queue with a pool of workers.
+
+    Posts with a lower priority number are sent first. Posts are limited by a
+    global rate and a per-bot rate, and transient failures are retried with an
+    exponentially increasing delay. Each post is represented by a
+    :class:`~concurrent.futures.Future` that resolves to ``True`` once the
+    post is delivered.
+
+    :param manager: the bot manager
+    :type manager: :class:`~groupy.api.bots.Bots`
+    :param int workers: the number of concurrent posts
+    :param int maxsize: the maximum number of posts waiting in the queue
+    :param float rate: the maximum number of posts per second (unlimited if
+                       ``None``)
+    :param float bot_rate: the maximum number of posts per second for each bot
+                           (unlimited if ``None``)
+    :param int max_retries: the maximum number of retries of a post
+    :param float backoff: the number of seconds before the first retry
+    """
+
+    def __init__(self, manager, workers=8, maxsize=1000, rate=None,
+                 bot_rate=None, max_retries=3, backoff=1):
+        self.manager = manager
+        self.limiter = utils.RateLimiter(rate) if rate else None
+        self.bot_rate = bot_rate
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = DispatchStats()
+        self._bot_limiters = {}
+        self._ready = queue.PriorityQueue(maxsize=maxsize)
+        self._delayed = []
+        self._counter = itertools.count()
+        self._changed = threading.Condition()
+        self._pending = 0
+        self._is_closed = False
+        self._workers = [threading.Thread(target=self._work, daemon=True)
+                         for __ in range(workers)]
+        self._timer = threading.Thread(target=self._release_delayed,
+                                       daemon=True)
+        for thread in self._workers + [self._timer]:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, bot_id, text, attachments=None, priority=0, callback=None,
+               timeout=None):
+        """Queue a post, waiting for room in the queue if necessary.
+
+        :param str bot_id: the ID of the bot
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :param int priority: lower numbers are posted first
+        :param func callback: called with the future once the post is done
+        :param float timeout: maximum seconds to wait for room in the queue
+        :return: a future for the post
+        :rtype: :class:`~concurrent.futures.Future`
+        :raises RuntimeError: if the dispatcher is closed
+        :raises queue.Full: if there was no room in the queue in time
+        """
+        if self._is_closed:
+            raise RuntimeError('the dispatcher is closed')
+        post = _Post(bot_id, text, attachments, priority)
+        post.future.add_done_callback(lambda f: self._on_done(post))
+        if callback is not None:
+            post.future.add_done_callback(callback)
+        with self._changed:
+            self._pending += 1
+        try:
+            self._ready.put((priority, next(self._counter), post),
+                            timeout=timeout)
+        except queue.Full:
+            self._finish(post)
+            raise
+        self.stats.add(submitted=1)
+        return post.future
+
+    def close(self, wait=True):
+        """Stop accepting posts and stop the workers once all are done.
+
+        :param bool wait: whether to wait for the queued posts to be done
+        """
+        self._is_closed = True
+        if wait:
+            self._shut_down()
+        else:
+            threading.Thread(target=self._shut_down, daemon=True).start()
+
+    def _shut_down(self):
+        with self._changed:
+            while self._pending:
+                self._changed.wait()
+            self._changed.notify_all()
+        for __ in self._workers:
+            self._ready.put((float('inf'), next(self._counter), None))
+        for thread in self._workers + [self._timer]:
+            thread.join()
+
+    def _on_done(self, post):
+        # cancelled posts may still be waiting in a queue
+        if post.future.cancelled():
+            self._finish(post)
+
+    def _finish(self, post):
+        with self._changed:
+            if post.is_finished:
+                return
+            post.is_finished = True
+            self._pending -= 1
+            self._changed.notify_all()
+
+    def _delay(self, post, seconds):
+        with self._changed:
+            entry = (time.monotonic() + seconds, next(self._counter), post)
+            heapq.heappush(self._delayed, entry)
+            self._changed.notify_all()
+
+    def _release_delayed(self):
+        with self._changed:
+            while not (self._is_closed and not self._pending):
+                now = time.monotonic()
+                if self._delayed and self._delayed[0][0] <= now:
+                    __, __, post = heapq.heappop(self._delayed)
+                    entry = (post.priority, next(self._counter), post)
+                    self._changed.release()
+                    try:
+                        self._ready.put(entry)
+                    finally:
+                        self._changed.acquire()
+                    continue
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._changed.wait(timeout)
+
+    def _get_bot_limiter(self, bot_id):
+        with self._changed:
+            if bot_id not in self._bot_limiters:
+                self._bot_limiters[bot_id] = utils.RateLimiter(self.bot_rate)
+            return self._bot_limiters[bot_id]
+
+    def _work(self):
+        while True:
+            __, __, post = self._ready.get()
+            if post is None:
+                return
+            if self.bot_rate:
+                delay = self._get_bot_limiter(post.bot_id).try_acquire()
+                if delay:
+                    self._delay(post, delay)
+                    continue
+            if self.limiter is not None:
+                self.limiter.acquire()
+            self._send(post)
+
+    def _send(self, post):
+        is_first_attempt = not post.attempts
+        if is_first_attempt and not post.future.set_running_or_notify_cancel():
+            self._finish(post)
+            return
+        post.attempts += 1
+        try:
+            result = self.manager.post(post.bot_id, post.text,
+                                       attachments=post.attachments)
+        except Exception as e:
+            can_retry = post.attempts <= self.max_retries
+            if utils.is_transient_error(e) and can_retry:
+                self.stats.add(retries=1)
+                self._delay(post, self.backoff * 2 ** (post.attempts - 1))
+                return
+            logger.exception('could not post as bot %s', post.bot_id)
+            self.stats.add(failed=1)
+            post.future.set_exception(e)
+        else:
+            self.stats.add_delivery(time.monotonic() - post.submitted_at)
+            post.future.set_result(result)
+        self._finish(post)
@@ -1,6 +1,10 @@
+from collections import namedtuple
+
 from . import base
 from . import messages
+from groupy import export
 from groupy import pagers
+from groupy import polling
 from groupy import utils
 
 
@@ -34,6 +38,34 @@ class Chats(base.Manager):
         """
         return self.list(per_page=per_page).autopage()
 
+    def directory(self, chats=None, watermarks=None, per_page=10, limit=20):
+        """Return a local directory of your chats that syncs incrementally.
+
+        :param dict chats: a previous snapshot of chats by other user ID
+        :param dict watermarks: the last message ID of each chat by other user
+                                ID, as of a previous sync
+        :param int per_page: how many chats per page
+        :param int limit: maximum number of messages per page
+        :return: a chat directory
+        :rtype: :class:`~groupy.api.chats.ChatDirectory`
+        """
+        return ChatDirectory(self, chats=chats, watermarks=watermarks,
+                             per_page=per_page, limit=limit)
+
+    def export(self, sink, **kwargs):
+        """Export the direct messages of all chats concurrently.
+
+        :param func sink: a function accepting a chat and a list of its
+                          messages
+        :param kwargs kwargs: additional
+                              :class:`~groupy.export.DirectMessageExporter`
+                              arguments
+        :return: the totals of the export
+        :rtype: :class:`~groupy.export.ExportStats`
+        """
+        exporter = export.DirectMessageExporter(self, sink, **kwargs)
+        return exporter.export()
+
 
 class Chat(base.ManagedResource):
     """A chat with another user."""
@@ -68,3 +100,89 @@ class Chat(base.ManagedResource):
         :rtype: bool
         """
         return self.messages.create(text=text, attachments=attachments)
+
+
+class ChatDirectory:
+    """A local snapshot of your chats that can be synced incrementally.
+
+    Since chats are listed in order of recent activity, a sync pages through
+    the chats only until it reaches a page containing a chat that has not
+    been updated since the snapshot, and then fetches new direct messages
+    only for the chats that have changed.
+
+    The first sync of an empty snapshot lists every chat and only records
+    the last message of each. Chats that appear in later syncs are new
+    conversations, so all of their messages are fetched.
+
+    :param manager: the chat manager
+    :type manager: :class:`~groupy.api.chats.Chats`
+    :param dict chats: a previous snapshot of chats by other user ID
+    :param dict watermarks: the last message ID of each chat by other user ID
+    :param int per_page: how many chats per page
+    :param int limit: maximum number of messages per page
+    """
+
+    #: a chat and its new messages (oldest first)
+    Change = namedtuple('Change', 'chat messages')
+
+    def __init__(self, manager, chats=None, watermarks=None, per_page=10,
+                 limit=20):
+        self.manager = manager
+        self.chats = dict(chats or {})
+        self.watermarks = dict(watermarks or {})
+        self.per_page = per_page
+        self.limit = limit
+
+    def __len__(self):
+        return len(self.chats)
+
+    def __iter__(self):
+        return iter(self.chats.values())
+
+    @staticmethod
+    def get_last_message_id(chat):
+        """Return the ID of the last message in a chat.
+
+        :param chat: a chat
+        :type chat: :class:`~groupy.api.chats.Chat`
+        :return: the ID of the last message, if any
+        :rtype: str
+        """
+        last_message = chat.data.get('last_message') or {}
+        return last_message.get('id')
+
+    def has_changed(self, chat):
+        """Return ``True`` if a chat was updated since the snapshot.
+
+        :param chat: a chat
+        :type chat: :class:`~groupy.api.chats.Chat`
+        :rtype: bool
+        """
+        known = self.chats.get(chat.other_user['id'])
+        return known is None or chat.updated_at > known.updated_at
+
+    def sync(self):
+        """Bring the snapshot up to date and fetch new direct messages.
+
+        :return: the changes (each a :class:`ChatDirectory.Change`), most
+                 recently active chat first
+        :rtype: :class:`list`
+        """
+        if not self.chats:
+            chats = list(self.manager.list_all(per_page=self.per_page))
+            for chat in chats:
+                user_id = chat.other_user['id']
+                self.chats[user_id] = chat
+                self.watermarks[user_id] = self.get_last_message_id(chat)
+            return [self.Change(chat, []) for chat in chats]
+
+        changes = []
+        chats = self.manager.list(per_page=self.per_page)
+        for chat in chats.list_changed(self.has_changed):
+            user_id = chat.other_user['id']
+            messages, last_id = polling.fetch_since(
+                chat.messages, self.watermarks.get(user_id), limit=self.limit)
+            self.chats[user_id] = chat
+            self.watermarks[user_id] = last_id
+            changes.append(self.Change(chat, messages))
+        return changes
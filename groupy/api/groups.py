@@ -1,3 +1,5 @@
+from collections import namedtuple
+
 from . import base
 from . import bots
 from . import messages
@@ -5,7 +7,9 @@ from . import memberships
 from . import user
 from groupy import utils
 from groupy import pagers
+from groupy import polling
 from groupy import exceptions
+from groupy import leaderboards
 
 
 class Groups(base.Manager):
@@ -51,6 +55,19 @@ class Groups(base.Manager):
         """
         return self.list(per_page=per_page, omit=omit).autopage()
 
+    def list_changed(self, has_changed, per_page=10, omit=None):
+        """List groups until reaching a page with an unchanged group.
+
+        :param func has_changed: a callable that returns ``True`` for a group
+                                 that has changed
+        :param int per_page: number of groups per page
+        :param int omit: a comma-separated list of fields to exclude
+        :return: the changed groups, most recently active first
+        :rtype: :class:`list`
+        """
+        groups = self.list(per_page=per_page, omit=omit)
+        return groups.list_changed(has_changed)
+
     def list_former(self):
         """List all former groups.
 
@@ -61,6 +78,47 @@ class Groups(base.Manager):
         response = self.session.get(url)
         return [Group(self, **group) for group in response.data]
 
+    def change_feed(self, watermarks=None, per_page=50, limit=100):
+        """Return a feed of new messages across all of your groups.
+
+        :param dict watermarks: the last message ID of each group by group_id,
+                                as of a previous sweep
+        :param int per_page: number of groups per page
+        :param int limit: maximum number of messages per page
+        :return: a change feed
+        :rtype: :class:`~groupy.api.groups.ChangeFeed`
+        """
+        return ChangeFeed(self, watermarks=watermarks, per_page=per_page,
+                          limit=limit)
+
+    def directory(self, groups=None, per_page=50, omit=None):
+        """Return a local directory of your groups that syncs incrementally.
+
+        :param dict groups: a previous snapshot of groups by group_id
+        :param int per_page: number of groups per page
+        :param int omit: a comma-separated list of fields to exclude
+        :return: a group directory
+        :rtype: :class:`~groupy.api.groups.GroupDirectory`
+        """
+        return GroupDirectory(self, groups=groups, per_page=per_page,
+                              omit=omit)
+
+    def leaderboard(self, group_ids=None, **kwargs):
+        """Return the most liked messages across many groups.
+
+        :param group_ids: the group_ids of the groups (all of your groups if
+                          not given)
+        :type group_ids: :class:`list`
+        :param kwargs kwargs: additional arguments for the leaderboard
+        :return: an aggregate leaderboard
+        :rtype: :class:`~groupy.leaderboards.AggregateLeaderboard`
+        """
+        if group_ids is None:
+            groups = self.list_all(omit='memberships')
+            group_ids = [group.group_id for group in groups]
+        return leaderboards.AggregateLeaderboard(self.session, group_ids,
+                                                 **kwargs)
+
     def get(self, id):
         """Get a single group by ID.
 
@@ -180,16 +238,202 @@ class Groups(base.Manager):
         :return: the result
         :rtype: :class:`~groupy.api.groups.ChangeOwnersResult`
         """
+        result, = self._change_owners([(group_id, owner_id)])
+        return result
+
+    def _change_owners(self, requests):
         url = utils.urljoin(self.url, 'change_owners')
         payload = {
-            'requests': [{
-                'group_id': group_id,
-                'owner_id': owner_id,
-            }],
+            'requests': [{'group_id': g, 'owner_id': o} for g, o in requests],
         }
         response = self.session.post(url, json=payload)
-        result, = response.data['results']  # should be exactly one
-        return ChangeOwnersResult(**result)
+        results = {r['group_id']: r for r in response.data['results']}
+        return [ChangeOwnersResult(**results[group_id])
+                if group_id in results
+                else ChangeOwnersResult(group_id, owner_id, None)
+                for group_id, owner_id in requests]
+
+    def change_owners_many(self, requests, chunk_size=50):
+        """Change the owners of many groups.
+
+        The requests are sent in chunks of ``chunk_size`` per call. If a call
+        fails, the requests in its chunk get results without a status, and the
+        exception is kept on each as its ``error``.
+
+        .. note:: you must be the owner to change owners
+
+        :param requests: pairs of the group_id of a group and the ID of its
+                         new owner
+        :type requests: :class:`list`
+        :param int chunk_size: the maximum number of requests per call
+        :return: a result for each request, in the order given
+        :rtype: :class:`list`
+        """
+        requests = list(requests)
+        results = []
+        for i in range(0, len(requests), chunk_size):
+            chunk = requests[i:i + chunk_size]
+            try:
+                results.extend(self._change_owners(chunk))
+            except exceptions.ApiError as e:
+                results.extend(ChangeOwnersResult(g, o, None, error=e)
+                               for g, o in chunk)
+        return results
+
+
+class ChangeFeed:
+    """A feed of new messages across all of your groups.
+
+    Each group in the group listing carries the ID of its last message, and the
+    listing is ordered by recent activity. A sweep therefore pages through the
+    groups only until it reaches a page containing a group whose last message
+    has not changed, and then fetches new messages only for the groups that
+    have changed.
+
+    The first sweep only records the last message of every group.
+
+    :param manager: the group manager
+    :type manager: :class:`~groupy.api.groups.Groups`
+    :param dict watermarks: the last message ID of each group by group_id
+    :param int per_page: number of groups per page
+    :param int limit: maximum number of messages per page
+    """
+
+    #: a group and its new messages (oldest first)
+    Change = namedtuple('Change', 'group messages')
+
+    def __init__(self, manager, watermarks=None, per_page=50, limit=100):
+        self.manager = manager
+        self.watermarks = dict(watermarks or {})
+        self.per_page = per_page
+        self.limit = limit
+
+    @staticmethod
+    def get_last_message_id(group):
+        """Return the ID of the last message in a group.
+
+        :param group: a group
+        :type group: :class:`~groupy.api.groups.Group`
+        :return: the ID of the last message, if any
+        :rtype: str
+        """
+        messages = group.data.get('messages') or {}
+        return messages.get('last_message_id')
+
+    def has_changed(self, group):
+        """Return ``True`` if the last message of a group has changed.
+
+        :param group: a group
+        :type group: :class:`~groupy.api.groups.Group`
+        :rtype: bool
+        """
+        if group.group_id not in self.watermarks:
+            return True
+        last_message_id = self.get_last_message_id(group)
+        return self.watermarks[group.group_id] != last_message_id
+
+    def find_changed_groups(self):
+        """Return the groups whose last message has changed.
+
+        :return: the changed groups, most recently active first
+        :rtype: :class:`list`
+        """
+        return self.manager.list_changed(self.has_changed,
+                                         per_page=self.per_page,
+                                         omit='memberships')
+
+    def sweep(self):
+        """Return the new messages of every group that has changed.
+
+        :return: the changes, most recently active group first
+        :rtype: :class:`list` of :class:`~groupy.api.groups.ChangeFeed.Change`
+        """
+        changes = []
+        for group in self.find_changed_groups():
+            last_message_id = self.get_last_message_id(group)
+            if group.group_id not in self.watermarks:
+                messages = []
+            else:
+                messages, last_id = polling.fetch_since(
+                    group.messages, self.watermarks[group.group_id],
+                    limit=self.limit)
+                if messages:
+                    last_message_id = last_id
+            self.watermarks[group.group_id] = last_message_id
+            changes.append(self.Change(group, messages))
+        return changes
+
+
+class GroupDirectory:
+    """A local snapshot of your groups that can be synced incrementally.
+
+    Since groups are listed in order of recent activity, a sync pages through
+    the groups only until it reaches a page containing a group that has not
+    been updated since the snapshot. Groups you have left are found through
+    the list of former groups. Groups that were destroyed can only be found by
+    a full sync, which lists every group.
+
+    :param manager: the group manager
+    :type manager: :class:`~groupy.api.groups.Groups`
+    :param dict groups: a previous snapshot of groups by group_id
+    :param int per_page: number of groups per page
+    :param int omit: a comma-separated list of fields to exclude
+    """
+
+    #: the groups added, changed, and removed by a sync
+    Delta = namedtuple('Delta', 'added changed removed')
+
+    def __init__(self, manager, groups=None, per_page=50, omit=None):
+        self.manager = manager
+        self.groups = dict(groups or {})
+        self.per_page = per_page
+        self.omit = omit
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        return iter(self.groups.values())
+
+    def has_changed(self, group):
+        """Return ``True`` if a group was updated since the snapshot.
+
+        :param group: a group
+        :type group: :class:`~groupy.api.groups.Group`
+        :rtype: bool
+        """
+        known = self.groups.get(group.group_id)
+        return known is None or group.updated_at > known.updated_at
+
+    def sync(self, full=False):
+        """Bring the snapshot up to date.
+
+        The first sync of an empty snapshot is always a full sync.
+
+        :param bool full: whether to list every group
+        :return: the groups added, changed, and removed
+        :rtype: :class:`~groupy.api.groups.GroupDirectory.Delta`
+        """
+        missing_ids = set()
+        if full or not self.groups:
+            current = list(self.manager.list_all(per_page=self.per_page,
+                                                 omit=self.omit))
+            missing_ids = set(self.groups) - {g.group_id for g in current}
+            updated = [g for g in current if self.has_changed(g)]
+        else:
+            updated = self.manager.list_changed(self.has_changed,
+                                                per_page=self.per_page,
+                                                omit=self.omit)
+        added = [g for g in updated if g.group_id not in self.groups]
+        changed = [g for g in updated if g.group_id in self.groups]
+        self.groups.update((g.group_id, g) for g in updated)
+
+        updated_ids = {g.group_id for g in updated}
+        former_ids = {g.group_id for g in self.manager.list_former()}
+        removed_ids = (missing_ids | former_ids) - updated_ids
+        removed = [self.groups.pop(group_id) for group_id in list(self.groups)
+                   if group_id in removed_ids]
+        return self.Delta(added, changed, removed)
 
 
 class ChangeOwnersResult:
@@ -198,6 +442,7 @@ class ChangeOwnersResult:
     :param str group_id: group_id of the group
     :param str owner_id: the ID of the new owner
     :param str status: the status of the request
+    :param error: the exception raised if the request could not be made
     """
 
     #: the status that represents success
@@ -214,11 +459,14 @@ class ChangeOwnersResult:
                'required fields is not an ID',
     }
 
-    def __init__(self, group_id, owner_id, status):
+    def __init__(self, group_id, owner_id, status, error=None):
         self.group_id = group_id
         self.owner_id = owner_id
         self.status = status
+        self.error = error
         self.reason = self.status_texts.get(status, 'unknown')
+        if error is not None:
+            self.reason = str(error)
 
     @property
     def is_success(self):
@@ -372,6 +620,25 @@ class Group(base.ManagedResource):
         """
         return self.memberships.update(nickname=nickname, **kwargs)
 
+    def reconcile(self, users, **kwargs):
+        """Make the members of the group match the desired users.
+
+        The group is refreshed first so that the plan is made against the
+        current members.
+
+        :param users: the desired users, as dictionaries containing a nickname
+                      and either an email, phone number, or user_id
+        :type users: :class:`list`
+        :param kwargs kwargs: additional arguments to
+                              ``Memberships.reconcile``
+        :return: the plan and the result of each operation
+        :rtype: :class:`~groupy.api.memberships.Reconciliation`
+        """
+        self.refresh_from_server()
+        if 'user_id' not in kwargs:
+            kwargs['user_id'] = self._user.me['user_id']
+        return self.memberships.reconcile(self.members, users, **kwargs)
+
     def leave(self):
         """Leave the group.
 
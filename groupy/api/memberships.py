@@ -1,4 +1,8 @@
 from collections import namedtuple
+from concurrent import futures
+import heapq
+import itertools
+import threading
 import time
 import uuid
 
@@ -9,6 +13,39 @@ from groupy import utils
 from groupy import exceptions
 
 
+def get_user_key(user):
+    """Return the key that identifies a user to be added.
+
+    The user_id is preferred, then the email address, then the phone number.
+    Email addresses and phone numbers are normalized so that trivially
+    different spellings match.
+
+    :param dict user: a user with a user_id, email, or phone_number
+    :return: the kind of identifier and its normalized value
+    :rtype: tuple
+    :raises ValueError: if the user has no identifier
+    """
+    if user.get('user_id'):
+        return 'user_id', str(user['user_id'])
+    if user.get('email'):
+        return 'email', user['email'].strip().lower()
+    if user.get('phone_number'):
+        phone_number = user['phone_number'].strip()
+        digits = ''.join(c for c in phone_number if c.isdigit())
+        prefix = '+' if phone_number.startswith('+') else ''
+        return 'phone_number', prefix + digits
+    raise ValueError('user has no user_id, email, or phone_number')
+
+
+#: the changes needed to make the members of a group match a desired roster,
+#: and the desired users who kept any member from being planned for removal
+Plan = namedtuple('Plan', 'adds removals renames unconfirmed')
+
+
+#: a plan and the results of its adds, removals, and renames
+Reconciliation = namedtuple('Reconciliation', 'plan adds removals renames')
+
+
 class Memberships(base.Manager):
     """A membership manager for a particular group.
 
@@ -56,13 +93,203 @@ class Memberships(base.Manager):
         guid = uuid.uuid4()
         for i, user_ in enumerate(users):
             user_['guid'] = '{}-{}'.format(guid, i)
+        return self._add(users)
 
-        payload = {'members': users}
+    def _add(self, users):
+        payload = {'members': list(users)}
         url = utils.urljoin(self.url, 'add')
         response = self.session.post(url, json=payload)
         return MembershipRequest(self, *users, group_id=self.group_id,
                                  **response.data)
 
+    def add_many(self, users, chunk_size=100, workers=4, retries=1,
+                 poller=None):
+        """Add many users to the group in concurrent chunks.
+
+        Each given user must be a dictionary containing a nickname and either
+        an email, phone number, or user_id. The users are split into chunks of
+        ``chunk_size``, which are submitted at the same time, and the results
+        of every chunk are combined. Users that were not added are submitted
+        again, up to ``retries`` more times. Users whose results expired
+        before they were fetched count as failures, and so are retried.
+
+        :param users: the users to add
+        :type users: :class:`list`
+        :param int chunk_size: the maximum number of users per request
+        :param int workers: the number of chunks submitted at the same time
+        :param int retries: the number of times to retry failed users
+        :param poller: the poller with which to wait for results (a new one
+                       is used if not given)
+        :type poller: :class:`~groupy.api.memberships.ResultsPoller`
+        :return: the new members and the users that could not be added
+        :rtype: :class:`~groupy.api.memberships.MembershipRequest.Results`
+        """
+        guid = uuid.uuid4()
+        pending = []
+        for i, user_ in enumerate(users):
+            pending.append(dict(user_, guid='{}-{}'.format(guid, i)))
+
+        own_poller = poller is None
+        if own_poller:
+            poller = ResultsPoller(workers=workers)
+        members = []
+        try:
+            for __ in range(retries + 1):
+                if not pending:
+                    break
+                chunks = [pending[i:i + chunk_size]
+                          for i in range(0, len(pending), chunk_size)]
+                pending = []
+                executor = futures.ThreadPoolExecutor(max_workers=workers)
+                with executor:
+                    jobs = [(chunk, executor.submit(self._add, chunk))
+                            for chunk in chunks]
+                waiting = []
+                for chunk, job in jobs:
+                    try:
+                        waiting.append((chunk, poller.submit(job.result())))
+                    except Exception:
+                        pending.extend(chunk)
+                for chunk, future in waiting:
+                    try:
+                        results = future.result()
+                    except Exception:
+                        pending.extend(chunk)
+                    else:
+                        members.extend(results.members)
+                        pending.extend(results.failures)
+        finally:
+            if own_poller:
+                poller.close()
+        return MembershipRequest.Results(members, pending)
+
+    def plan(self, members, users, remove=True, user_id=None):
+        """Return the changes needed to make the members match the users.
+
+        Users are matched to members by user_id. Users identified only by an
+        email address or phone number cannot be matched, because members do
+        not include them, and so are always planned as adds; adding a user
+        who is already a member does not add them twice.
+
+        Only members who are certainly not desired are planned for removal,
+        so nobody is removed when any user is identified only by an email
+        address or phone number, since any unmatched member might be that
+        user. Such users are listed as unconfirmed; giving their user_ids
+        instead (those of the members :func:`add_many` returns) lets the
+        other members be removed. Owners and yourself are never planned for
+        removal.
+
+        :param members: the current members
+        :type members: :class:`list`
+        :param users: the desired users, as dictionaries containing a nickname
+                      and either an email, phone number, or user_id
+        :type users: :class:`list`
+        :param bool remove: whether to remove members who are not desired
+        :param str user_id: your user_id, to avoid removing yourself
+        :return: the users to add, the members to remove, the members to
+                 rename with their new nicknames, and the users identified only
+                 by an email address or phone number
+        :rtype: :class:`~groupy.api.memberships.Plan`
+        """
+        members_by_user_id = {str(m.user_id): m for m in members}
+        desired = {}
+        for user_ in users:
+            desired[get_user_key(user_)] = user_
+
+        adds = []
+        renames = []
+        for (kind, value), user_ in desired.items():
+            member = None
+            if kind == 'user_id':
+                member = members_by_user_id.get(value)
+            if member is None:
+                adds.append(user_)
+                continue
+            nickname = user_.get('nickname')
+            if nickname and nickname != member.nickname:
+                renames.append((member, nickname))
+
+        unconfirmed = [u for (kind, __), u in desired.items()
+                       if kind != 'user_id']
+        removals = []
+        if remove and not unconfirmed:
+            for member_user_id, member in members_by_user_id.items():
+                is_owner = 'owner' in (member.data.get('roles') or [])
+                is_me = user_id is not None and member_user_id == str(user_id)
+                is_desired = ('user_id', member_user_id) in desired
+                if not (is_desired or is_owner or is_me):
+                    removals.append(member)
+        return Plan(adds, removals, renames, unconfirmed)
+
+    def reconcile(self, members, users, remove=True, dry_run=False,
+                  workers=4, user_id=None, **kwargs):
+        """Make the members of the group match the desired users.
+
+        The changes are those of :func:`plan`, so a dry run reports exactly
+        the operations that would be attempted. The users to add are added in
+        bulk with :func:`add_many`, and then the members to remove are removed
+        concurrently. No member is removed while any user is unconfirmed;
+        check ``plan.unconfirmed`` of the result. Only your own nickname can
+        be changed, so renaming any other member is reported as a failure.
+
+        :param members: the current members
+        :type members: :class:`list`
+        :param users: the desired users, as dictionaries containing a nickname
+                      and either an email, phone number, or user_id
+        :type users: :class:`list`
+        :param bool remove: whether to remove members who are not desired
+        :param bool dry_run: whether to only plan the changes
+        :param int workers: the number of requests made at the same time
+        :param str user_id: your user_id, to allow renaming yourself and to
+                            avoid removing yourself
+        :param kwargs kwargs: additional :func:`add_many` arguments
+        :return: the plan and the result of each operation (none for a dry
+                 run); the targets are the users added and the members
+                 removed or renamed, and the values of renames are the
+                 updated memberships
+        :rtype: :class:`~groupy.api.memberships.Reconciliation`
+        """
+        plan = self.plan(members, users, remove=remove, user_id=user_id)
+        adds, removals, renames = [], [], []
+        if dry_run:
+            return Reconciliation(plan, adds, removals, renames)
+
+        if plan.adds:
+            results = self.add_many(plan.adds, workers=workers, **kwargs)
+            failed = {get_user_key(f) for f in results.failures}
+            for user_ in plan.adds:
+                error = None
+                if get_user_key(user_) in failed:
+                    error = exceptions.GroupyError(
+                        'the user could not be added')
+                adds.append(utils.Result(user_, None, error))
+
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            jobs = [(m, executor.submit(self.remove, m.id))
+                    for m in plan.removals]
+        for member, job in jobs:
+            try:
+                error = None
+                if not job.result():
+                    error = exceptions.GroupyError(
+                        'the member was not removed')
+            except Exception as e:
+                error = e
+            removals.append(utils.Result(member, None, error))
+
+        for member, nickname in plan.renames:
+            updated, error = None, None
+            if member.user_id != user_id:
+                error = exceptions.GroupyError('only your own nickname can be '
+                                               'changed')
+            else:
+                try:
+                    updated = self.update(nickname=nickname)
+                except Exception as e:
+                    error = e
+            renames.append(utils.Result(member, updated, error))
+        return Reconciliation(plan, adds, removals, renames)
+
     def check(self, results_id):
         """Check for results of a membership request.
 
@@ -74,7 +301,13 @@ class Memberships(base.Manager):
         """
         path = 'results/{}'.format(results_id)
         url = utils.urljoin(self.url, path)
-        response = self.session.get(url)
+        try:
+            response = self.session.get(url)
+        except exceptions.BadResponse as e:
+            # the session raises for these status codes before we see them
+            response = e.response
+            if response.status_code not in (503, 404):
+                raise
         if response.status_code == 503:
             raise exceptions.ResultsNotReady(response)
         if response.status_code == 404:
@@ -160,29 +393,47 @@ class Member(base.ManagedResource):
         return self.messages.create(text=text, attachments=attachments,
                                     source_guid=source_guid)
 
-    def is_blocked(self):
+    def is_blocked(self, blocks=None):
         """Check whether you have the user of the membership blocked.
 
+        Checking many members is much faster with a cached set of blocks from
+        :func:`~groupy.api.blocks.Blocks.cached`, which needs no request per
+        member.
+
+        :param blocks: a cached set of blocks to check instead of the API
+        :type blocks: :class:`~groupy.api.blocks.BlockSet`
         :return: ``True`` if the user is blocked
         :rtype: bool
         """
+        if blocks is not None:
+            return blocks.is_blocked(self.user_id)
         return self._user.blocks.between(other_user_id=self.user_id)
 
-    def block(self):
+    def block(self, blocks=None):
         """Block the user of the membership.
 
+        :param blocks: a cached set of blocks to update
+        :type blocks: :class:`~groupy.api.blocks.BlockSet`
         :return: the block created
         :rtype: :class:`~groupy.api.blocks.Block`
         """
-        return self._user.blocks.block(other_user_id=self.user_id)
+        block = self._user.blocks.block(other_user_id=self.user_id)
+        if blocks is not None:
+            blocks.add(self.user_id)
+        return block
 
-    def unblock(self):
+    def unblock(self, blocks=None):
         """Unblock the user of the membership.
 
+        :param blocks: a cached set of blocks to update
+        :type blocks: :class:`~groupy.api.blocks.BlockSet`
         :return: ``True`` if successfully unblocked
         :rtype: bool
         """
-        return self._user.blocks.unblock(other_user_id=self.user_id)
+        unblocked = self._user.blocks.unblock(other_user_id=self.user_id)
+        if unblocked and blocks is not None:
+            blocks.discard(self.user_id)
+        return unblocked
 
     def remove(self):
         """Remove the member from the group (destroy the membership).
@@ -312,3 +563,140 @@ class MembershipRequest(base.ManagedResource):
         if self._not_ready_exception:
             raise self._not_ready_exception
         return self.results
+
+
+class ResultsPoller:
+    """Wait for the results of many membership requests at once.
+
+    Pending requests are checked from a small pool of threads, each on its
+    own schedule: the delay between checks starts at ``interval`` and grows
+    by ``backoff`` up to ``max_interval``. Each request has a future that is
+    resolved with its :class:`MembershipRequest.Results` as soon as they are
+    ready, so waiting for many requests takes about as long as the slowest
+    one.
+
+    Results that have expired resolve the future with
+    :class:`~groupy.exceptions.ResultsExpired`; this does not mean that the
+    users were not added, only that the outcome can no longer be fetched.
+    Results still not ready after ``timeout`` seconds resolve the future with
+    :class:`~groupy.exceptions.ResultsNotReady`.
+
+    :param int workers: the number of checks made at the same time
+    :param float interval: the number of seconds before the first check
+    :param float max_interval: the maximum number of seconds between checks
+    :param float backoff: the factor applied to the delay after each check
+    :param float timeout: the number of seconds after which to give up
+    """
+
+    def __init__(self, workers=4, interval=0.5, max_interval=8, backoff=2,
+                 timeout=60):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._executor = futures.ThreadPoolExecutor(max_workers=workers)
+        self._schedule = []
+        self._counter = itertools.count()
+        self._changed = threading.Condition()
+        self._is_closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _push(self, due, entry):
+        heapq.heappush(self._schedule, (due, next(self._counter), entry))
+        self._changed.notify()
+
+    def submit(self, request):
+        """Start waiting for the results of a membership request.
+
+        :param request: a membership request
+        :type request: :class:`~groupy.api.memberships.MembershipRequest`
+        :return: a future for the results
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        future = futures.Future()
+        now = time.monotonic()
+        entry = [request, future, self.interval, now + self.timeout]
+        with self._changed:
+            if self._is_closed:
+                raise RuntimeError('cannot submit to a closed poller')
+            self._push(now + self.interval, entry)
+        return future
+
+    def poll_all(self, requests):
+        """Wait for the results of many membership requests.
+
+        A failure does not affect the other requests; its exception is
+        returned in place of the results.
+
+        :param requests: membership requests
+        :type requests: :class:`list`
+        :return: the results (or exceptions), in the order given
+        :rtype: :class:`list`
+        """
+        pending = [self.submit(request) for request in requests]
+        results = []
+        for future in pending:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._is_closed:
+                    now = time.monotonic()
+                    if self._schedule and self._schedule[0][0] <= now:
+                        break
+                    delay = None
+                    if self._schedule:
+                        delay = self._schedule[0][0] - now
+                    self._changed.wait(delay)
+                if self._is_closed:
+                    return
+                __, __, entry = heapq.heappop(self._schedule)
+            self._executor.submit(self._check, entry)
+
+    def _check(self, entry):
+        request, future, delay, deadline = entry
+        if future.cancelled():
+            return
+        try:
+            is_ready = request.is_ready()
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if not is_ready and time.monotonic() + delay < deadline:
+            entry[2] = min(delay * self.backoff, self.max_interval)
+            with self._changed:
+                if not self._is_closed:
+                    self._push(time.monotonic() + delay, entry)
+                    return
+        try:
+            future.set_result(request.get())
+        except Exception as e:
+            future.set_exception(e)
+
+    def close(self, wait=True):
+        """Stop checking for results.
+
+        Requests still pending are cancelled.
+
+        :param bool wait: whether to wait for checks in progress to finish
+        """
+        with self._changed:
+            self._is_closed = True
+            pending, self._schedule = self._schedule, []
+            self._changed.notify()
+        for __, __, (request, future, __, __) in pending:
+            future.cancel()
+        self._thread.join()
+        self._executor.shutdown(wait=wait)
@@ -1,9 +1,15 @@
-import time
+import os
+import uuid
+from concurrent import futures
 
 from . import base
 from .attachments import Attachment
+from .attachments import Images
 from groupy import utils
 from groupy import pagers
+from groupy import backfill
+from groupy import cache
+from groupy import harvest
 
 
 class Messages(base.Manager):
@@ -17,6 +23,7 @@ class Messages(base.Manager):
     def __init__(self, session, group_id):
         path = 'groups/{}/messages'.format(group_id)
         super().__init__(session, path=path)
+        self.group_id = group_id
 
     def _raw_list(self, **params):
         response = self.session.get(self.url, params=params)
@@ -109,6 +116,55 @@ class Messages(base.Manager):
         """
         return self.list_after(message_id, limit=limit).autopage()
 
+    def backfill(self, partitions=8, workers=4, limit=100, path=None):
+        """Return a parallel crawl of all group messages.
+
+        The history is split into ``partitions`` spans of evenly spaced message
+        IDs between the oldest and newest messages, and the spans are crawled
+        concurrently. If ``path`` names an existing file, the crawl resumes
+        from the progress persisted there instead.
+
+        :param int partitions: number of spans into which to split the history
+        :param int workers: number of spans to crawl at the same time
+        :param int limit: maximum number of messages per page
+        :param str path: an optional file in which to persist progress
+        :return: a backfill
+        :rtype: :class:`~groupy.backfill.Backfill`
+        """
+        kwargs = dict(workers=workers, limit=limit)
+        if path is not None and os.path.exists(path):
+            return backfill.Backfill.load(self, path, **kwargs)
+        newest = self.list(limit=1).items
+        oldest = self.list_after('0', limit=1).items
+        seek_points = []
+        if newest and oldest:
+            low, high = int(oldest[0].id), int(newest[0].id)
+            seek_points = [low + (high - low) * i // partitions
+                           for i in range(1, partitions)]
+        return backfill.Backfill.from_seek_points(self, seek_points, path=path,
+                                                  **kwargs)
+
+    def _get_like_target(self, message):
+        if isinstance(message, GenericMessage):
+            return message.conversation_id, message.id
+        return self.group_id, message
+
+    def set_likes(self, messages, liked=True, workers=8, rate=None):
+        """Like or unlike many group messages concurrently.
+
+        :param messages: messages or their IDs
+        :type messages: :class:`list`
+        :param bool liked: whether to like rather than unlike the messages
+        :param int workers: the number of requests made at the same time
+        :param float rate: the maximum number of requests per second
+                           (unlimited if ``None``)
+        :return: the result for each message, in the order given
+        :rtype: :class:`list` of :class:`~groupy.utils.Result`
+        """
+        targets = [self._get_like_target(m) for m in messages]
+        return post_likes(self.session, targets, liked=liked,
+                          workers=workers, rate=rate)
+
     def create(self, text=None, attachments=None, source_guid=None):
         """Create a new message in the group.
 
@@ -120,7 +176,7 @@ class Messages(base.Manager):
         :rtype: :class:`~groupy.api.messages.Message`
         """
         message = {
-            'source_guid': source_guid or str(time.time()),
+            'source_guid': source_guid or str(uuid.uuid4()),
         }
 
         if text is not None:
@@ -215,6 +271,34 @@ class DirectMessages(base.Manager):
         """
         return self.list_before(message_id, **kwargs).autopage()
 
+    def _get_like_target(self, message, user_id):
+        if isinstance(message, GenericMessage):
+            return message.conversation_id, message.id
+        if user_id is None:
+            raise ValueError('your user_id is needed to like direct messages '
+                             'by ID')
+        participant_ids = sorted([str(user_id), str(self.other_user_id)])
+        return '+'.join(participant_ids), message
+
+    def set_likes(self, messages, liked=True, user_id=None, workers=8,
+                  rate=None):
+        """Like or unlike many direct messages concurrently.
+
+        :param messages: messages or their IDs
+        :type messages: :class:`list`
+        :param bool liked: whether to like rather than unlike the messages
+        :param str user_id: your user_id, needed only for message IDs
+        :param int workers: the number of requests made at the same time
+        :param float rate: the maximum number of requests per second
+                           (unlimited if ``None``)
+        :return: the result for each message, in the order given
+        :rtype: :class:`list` of :class:`~groupy.utils.Result`
+        :raises ValueError: if message IDs are given without your user_id
+        """
+        targets = [self._get_like_target(m, user_id) for m in messages]
+        return post_likes(self.session, targets, liked=liked,
+                          workers=workers, rate=rate)
+
     def create(self, text=None, attachments=None, source_guid=None):
         """Send a new direct message to the user.
 
@@ -234,7 +318,7 @@ class DirectMessages(base.Manager):
         :rtype: :class:`~groupy.api.messages.DirectMessage`
         """
         message = {
-            'source_guid': source_guid or str(time.time()),
+            'source_guid': source_guid or str(uuid.uuid4()),
             'recipient_id': self.other_user_id,
         }
 
@@ -408,6 +492,48 @@ class Likes(base.Manager):
         return response.ok
 
 
+def post_likes(session, targets, liked=True, workers=8, rate=None):
+    """Like or unlike many messages concurrently.
+
+    The requests are made directly, without a
+    :class:`~groupy.api.messages.Likes` manager per message.
+
+    :param session: the request session
+    :type session: :class:`~groupy.session.Session`
+    :param targets: pairs of a conversation ID and a message ID
+    :type targets: :class:`list`
+    :param bool liked: whether to like rather than unlike the messages
+    :param int workers: the number of requests made at the same time
+    :param float rate: the maximum number of requests per second (unlimited
+                       if ``None``)
+    :return: the result for each message ID, in the order given
+    :rtype: :class:`list` of :class:`~groupy.utils.Result`
+    """
+    limiter = utils.RateLimiter(rate) if rate else None
+    base_url = utils.urljoin(base.Manager.base_url, 'messages')
+    action = 'like' if liked else 'unlike'
+
+    def send(conversation_id, message_id):
+        if limiter is not None:
+            limiter.acquire()
+        path = '{}/{}/{}'.format(conversation_id, message_id, action)
+        session.post(utils.urljoin(base_url, path))
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        jobs = [(message_id, executor.submit(send, conversation_id,
+                                             message_id))
+                for conversation_id, message_id in targets]
+    results = []
+    for message_id, job in jobs:
+        try:
+            job.result()
+        except Exception as e:
+            results.append(utils.Result(message_id, None, e))
+        else:
+            results.append(utils.Result(message_id, None, None))
+    return results
+
+
 class Gallery(base.Manager):
     """Manager for messages in the gallery.
 
@@ -458,3 +584,18 @@ class Gallery(base.Manager):
     def list_all_after(self, when, limit=100):
         return self.list_after(when=when, limit=limit).autopage()
 
+    def harvest(self, root, workers=8, suffix=None, **params):
+        """Download the images of every gallery message into a store.
+
+        :param str root: the directory of the content store
+        :param int workers: the number of concurrent downloads
+        :param str suffix: an optional URL suffix for a size variant
+        :param kwargs params: additional :func:`list` params
+        :return: the statistics of the harvest
+        :rtype: :class:`~groupy.harvest.HarvestStats`
+        """
+        images = Images(self.session)
+        store = cache.ContentStore(root)
+        harvester = harvest.Harvester(images, store, workers=workers,
+                                      suffix=suffix)
+        return harvester.harvest(self.list_all(**params))
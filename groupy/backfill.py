@@ -0,0 +1,243 @@
+"""Crawl the message history of a conversation in parallel.
+
+The history is split into disjoint spans of message IDs. Each span is paged
+backwards with its own cursor, so many spans can be crawled at the same time.
+Because the spans neither overlap nor leave gaps, merging them produces the
+complete history exactly once.
+
+.. note::
+
+    Message IDs are assumed to increase with time when compared as integers,
+    which is true of the IDs issued by GroupMe.
+"""
+import json
+import os
+import queue
+import threading
+from concurrent import futures
+
+
+class Span:
+    """A contiguous range of message history.
+
+    A span contains the messages whose IDs are at least ``after_id`` and less
+    than ``before_id``. A value of ``None`` leaves that side unbounded.
+
+    :param str before_id: exclusive upper bound (``None`` for the newest)
+    :param str after_id: inclusive lower bound (``None`` for the oldest)
+    :param str cursor: the ID of the last message crawled
+    :param bool done: whether the span has been crawled completely
+    :param int count: the number of messages crawled so far
+    """
+
+    def __init__(self, before_id=None, after_id=None, cursor=None, done=False,
+                 count=0):
+        self.before_id = before_id
+        self.after_id = after_id
+        self.cursor = cursor
+        self.done = done
+        self.count = count
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(before_id={!r}, after_id={!r}, done={})>'
+                .format(klass, self.before_id, self.after_id, self.done))
+
+    def contains(self, message_id):
+        """Return ``True`` if the message ID falls within the span.
+
+        :param str message_id: the ID of a message
+        :rtype: bool
+        """
+        message_id = int(message_id)
+        if self.before_id is not None and message_id >= int(self.before_id):
+            return False
+        if self.after_id is not None and message_id < int(self.after_id):
+            return False
+        return True
+
+    def to_json(self):
+        """Return the span as a JSON serializable dict.
+
+        :return: serializable span data
+        :rtype: dict
+        """
+        return {
+            'before_id': self.before_id,
+            'after_id': self.after_id,
+            'cursor': self.cursor,
+            'done': self.done,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_seek_points(cls, seek_points):
+        """Create spans that together cover the entire history.
+
+        :param seek_points: message IDs at which to split the history
+        :type seek_points: :class:`list`
+        :return: spans, newest first
+        :rtype: :class:`list`
+        """
+        points = sorted({str(p) for p in seek_points}, key=int, reverse=True)
+        bounds = [None] + points + [None]
+        return [cls(before_id=before_id, after_id=after_id)
+                for before_id, after_id in zip(bounds, bounds[1:])]
+
+
+class Backfill:
+    """A parallel crawl of the message history of a conversation.
+
+    The manager must provide ``list(before_id=None, limit=None)`` as both
+    :class:`~groupy.api.messages.Messages` and
+    :class:`~groupy.api.messages.DirectMessages` do.
+
+    :param manager: the message manager of the conversation
+    :param spans: the disjoint spans to crawl, newest first
+    :type spans: :class:`list`
+    :param int limit: maximum number of messages per page
+    :param int workers: the number of spans to crawl at the same time
+    :param str path: an optional file in which to persist progress
+    :param int buffer: the number of pages fetched ahead per worker
+    """
+
+    def __init__(self, manager, spans, limit=100, workers=4, path=None,
+                 buffer=4):
+        self.manager = manager
+        self.spans = spans
+        self.limit = limit
+        self.workers = workers
+        self.path = path
+        self.buffer = buffer
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_seek_points(cls, manager, seek_points, **kwargs):
+        """Create a backfill that splits the history at the given message IDs.
+
+        :param manager: the message manager of the conversation
+        :param seek_points: message IDs at which to split the history
+        :type seek_points: :class:`list`
+        :param kwargs kwargs: additional :class:`Backfill` arguments
+        :return: a backfill
+        :rtype: :class:`~groupy.backfill.Backfill`
+        """
+        spans = Span.from_seek_points(seek_points)
+        return cls(manager, spans, **kwargs)
+
+    @classmethod
+    def load(cls, manager, path, **kwargs):
+        """Resume a backfill from the progress persisted in a file.
+
+        :param manager: the message manager of the conversation
+        :param str path: the file containing the progress
+        :param kwargs kwargs: additional :class:`Backfill` arguments
+        :return: a backfill
+        :rtype: :class:`~groupy.backfill.Backfill`
+        """
+        with open(path) as f:
+            state = json.load(f)
+        spans = [Span(**span) for span in state['spans']]
+        return cls(manager, spans, path=path, **kwargs)
+
+    @property
+    def is_done(self):
+        """Return ``True`` if every span has been crawled."""
+        return all(span.done for span in self.spans)
+
+    @property
+    def count(self):
+        """Return the number of messages crawled across all spans."""
+        return sum(span.count for span in self.spans)
+
+    def save(self):
+        """Persist the progress of every span, if a path was given."""
+        if self.path is None:
+            return
+        with self._lock:
+            state = {'spans': [span.to_json() for span in self.spans]}
+            tmp_path = '{}.tmp'.format(self.path)
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+    def fetch_page(self, span, cursor=None):
+        """Fetch the next page of a span.
+
+        The span itself is not advanced.
+
+        :param span: the span to fetch from
+        :type span: :class:`~groupy.backfill.Span`
+        :param str cursor: the ID of the message to page back from (defaults
+                           to the cursor of the span)
+        :return: the messages of the page that fall within the span, and
+                 whether the span is exhausted
+        :rtype: tuple
+        """
+        before_id = cursor or span.cursor or span.before_id
+        page = list(self.manager.list(before_id=before_id, limit=self.limit))
+        messages = [m for m in page if span.contains(m.id)]
+        return messages, not page or len(messages) < len(page)
+
+    def _put(self, pages, item, stop):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def _crawl_span(self, span, pages, stop):
+        cursor = span.cursor
+        try:
+            exhausted = span.done
+            while not exhausted and not stop.is_set():
+                messages, exhausted = self.fetch_page(span, cursor=cursor)
+                if messages:
+                    cursor = messages[-1].id
+                if not self._put(pages, (span, messages, exhausted), stop):
+                    return
+        finally:
+            self._put(pages, None, stop)
+
+    def crawl(self):
+        """Crawl every span and yield the messages as they arrive.
+
+        Spans are crawled concurrently and each runs to completion without
+        waiting for the others, so pages of different spans are interleaved.
+        The messages of one span are yielded newest first, and every message
+        is yielded exactly once. Up to ``buffer`` pages per worker are
+        fetched ahead of the messages being yielded.
+
+        Progress advances only as messages are yielded, and is persisted after
+        every page and when the crawl stops, so resuming a crawl that was
+        stopped early neither skips nor repeats messages.
+
+        :return: the messages of every span
+        :rtype: generator
+        """
+        stop = threading.Event()
+        pages = queue.Queue(maxsize=self.buffer * self.workers)
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            jobs = [executor.submit(self._crawl_span, span, pages, stop)
+                    for span in self.spans]
+            try:
+                running = len(jobs)
+                while running:
+                    page = pages.get()
+                    if page is None:
+                        running -= 1
+                        continue
+                    span, messages, exhausted = page
+                    for message in messages:
+                        span.cursor = message.id
+                        span.count += 1
+                        yield message
+                    span.done = exhausted
+                    self.save()
+                for job in jobs:
+                    job.result()
+            finally:
+                stop.set()
+                self.save()
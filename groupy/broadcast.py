@@ -0,0 +1,152 @@
+"""Post the same message to many groups at once."""
+import logging
+import time
+import uuid
+from concurrent import futures
+
+from groupy import exceptions
+from groupy import utils
+from groupy.api import messages
+
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """Post messages to many targets in parallel.
+
+    Attachments are serialized once for all targets. Posts that fail with a
+    transient error are retried after an exponentially increasing delay,
+    and every attempt counts against the shared rate limit.
+
+    :param int workers: the number of posts sent at the same time
+    :param float rate: the maximum number of posts per second (unlimited if
+                       ``None``)
+    :param int max_retries: the number of retries after transient failures
+    :param float backoff: the number of seconds before the first retry
+    """
+
+    def __init__(self, workers=16, rate=None, max_retries=3, backoff=1):
+        self.workers = workers
+        self.limiter = utils.RateLimiter(rate) if rate else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    @staticmethod
+    def get_source_guid(guid, target):
+        """Return the source_guid of a broadcast for one target.
+
+        :param str guid: the ID of the broadcast
+        :param str target: the ID of the target
+        :rtype: str
+        """
+        return '{}-{}'.format(guid, target)
+
+    def _attempt(self, post):
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            try:
+                return post(is_retry=attempt > 0)
+            except Exception as e:
+                is_transient = utils.is_transient_error(e)
+                if not is_transient or attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+
+    def _run(self, posts):
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            jobs = [(target, executor.submit(self._attempt, post))
+                    for target, post in posts]
+        results = []
+        for target, job in jobs:
+            try:
+                message = job.result()
+            except Exception as e:
+                logger.exception('could not post to %s', target)
+                results.append(utils.Result(target, None, e))
+            else:
+                results.append(utils.Result(target, message, None))
+        return results
+
+    def to_groups(self, session, group_ids, text=None, attachments=None,
+                  guid=None):
+        """Post a message to many groups.
+
+        Each group gets a source_guid derived from ``guid`` and its group_id,
+        so broadcasting again with the same ``guid`` does not post a second
+        copy of a message that was already delivered.
+
+        :param session: the request session
+        :type session: :class:`~groupy.session.Session`
+        :param group_ids: the group_ids of the groups
+        :type group_ids: :class:`list`
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :param str guid: the ID of the broadcast (random if not given)
+        :return: the result for each group, in the order given, whose value
+                 is the created message if the API returned one
+        :rtype: :class:`list` of :class:`~groupy.utils.Result`
+        """
+        guid = guid or uuid.uuid4().hex
+        message = {}
+        if text is not None:
+            message['text'] = text
+        if attachments is not None:
+            message['attachments'] = [a.to_json() for a in attachments]
+
+        def get_post(group_id, source_guid):
+            manager = messages.Messages(session, group_id)
+            payload = {'message': dict(message, source_guid=source_guid)}
+
+            def post(is_retry):
+                try:
+                    response = session.post(manager.url, json=payload)
+                except exceptions.BadResponse as e:
+                    if is_retry and utils.is_duplicate_error(e):
+                        return None
+                    raise
+                return messages.Message(manager, **response.data['message'])
+            return post
+
+        posts = []
+        for group_id in group_ids:
+            source_guid = self.get_source_guid(guid, group_id)
+            posts.append((group_id, get_post(group_id, source_guid)))
+        return self._run(posts)
+
+    def to_bots(self, manager, bot_ids, text, attachments=None):
+        """Post a message as many bots.
+
+        Bot posts have no source_guid, so a retried post may be delivered
+        twice if the original attempt reached the API but its response did
+        not make it back.
+
+        :param manager: a bot manager
+        :type manager: :class:`~groupy.api.bots.Bots`
+        :param bot_ids: the IDs of the bots
+        :type bot_ids: :class:`list`
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :return: the result for each bot, in the order given
+        :rtype: :class:`list` of :class:`~groupy.utils.Result`
+        """
+        url = utils.urljoin(manager.url, 'post')
+        serialized = None
+        if attachments:
+            serialized = [a.to_json() for a in attachments]
+
+        def get_post(bot_id):
+            payload = dict(bot_id=bot_id, text=text)
+            if serialized:
+                payload['attachments'] = serialized
+
+            def post(is_retry):
+                manager.session.post(url, json=payload)
+            return post
+
+        return self._run([(bot_id, get_post(bot_id)) for bot_id in bot_ids])
@@ -0,0 +1,263 @@
+"""On-disk storage and caching of downloaded media."""
+import hashlib
+import os
+import tempfile
+import threading
+
+
+def hash_url(url):
+    """Return a stable, filesystem-safe key for a URL.
+
+    :param str url: a URL
+    :return: the hex digest of the URL
+    :rtype: str
+    """
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class HashingWriter:
+    """A file wrapper that hashes everything written through it.
+
+    :param fp: a file object opened for binary writing
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self.fp.write(data)
+
+    @property
+    def digest(self):
+        """Return the hex digest of the data written so far."""
+        return self.hash.hexdigest()
+
+
+class ContentStore:
+    """A content-addressed store of files on disk.
+
+    Files are stored under the SHA-256 digest of their content, so identical
+    files are stored once. A URL index maps the URLs from which files were
+    downloaded to their digests. Every write is an atomic rename, so several
+    processes can share one store.
+
+    :param str root: the directory of the store
+    """
+
+    def __init__(self, root):
+        self.root = root
+        for name in ('objects', 'urls', 'tmp'):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __contains__(self, digest):
+        return os.path.exists(self.get_path(digest))
+
+    def get_path(self, digest):
+        """Return the path of the file with the given digest.
+
+        :param str digest: the hex digest of the content
+        :rtype: str
+        """
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def lookup(self, url):
+        """Return the digest of the content downloaded from a URL.
+
+        :param str url: a URL
+        :return: the hex digest, or ``None`` if the URL is not in the store
+        :rtype: str
+        """
+        index_path = os.path.join(self.root, 'urls', hash_url(url))
+        try:
+            with open(index_path) as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if digest in self else None
+
+    def create_temp_file(self):
+        """Return a new temporary file within the store.
+
+        :return: a file object opened for binary writing
+        """
+        tmp_dir = os.path.join(self.root, 'tmp')
+        return tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False)
+
+    def _write_atomically(self, path, text):
+        with self.create_temp_file() as f:
+            f.write(text.encode('utf-8'))
+        os.replace(f.name, path)
+
+    def add(self, tmp_path, digest, url=None):
+        """Move a temporary file into the store.
+
+        :param str tmp_path: the path of a temporary file
+        :param str digest: the hex digest of its content
+        :param str url: the URL from which the content was downloaded
+        :return: ``True`` if the content was not already in the store
+        :rtype: bool
+        """
+        path = self.get_path(digest)
+        with self._lock:
+            is_new = digest not in self
+            if is_new:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        if not is_new:
+            os.remove(tmp_path)
+        if url is not None:
+            index_path = os.path.join(self.root, 'urls', hash_url(url))
+            self._write_atomically(index_path, digest)
+        return is_new
+
+
+class ImageCache:
+    """A size-bounded cache of downloaded images on disk.
+
+    Images are keyed by their URL, which includes any size variant suffix.
+    When the cache grows beyond its budget, the least recently used images
+    are evicted until it is back under a lower mark, so that the cache
+    directory is scanned only once in a while rather than on every add.
+    Reading an image marks it as used by updating its modification time.
+    Every write is an atomic rename, so several processes can share one cache
+    directory; an image evicted by another process is simply a miss.
+
+    :param str root: the directory of the cache
+    :param int max_bytes: the maximum total size of the cached images
+    :param float low_water: the fraction of ``max_bytes`` to evict down to
+    """
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024, low_water=0.9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+        #: the number of lookups that found an image
+        self.hits = 0
+        #: the number of lookups that did not find an image
+        self.misses = 0
+        #: the number of images evicted
+        self.evictions = 0
+        self.size = sum(stat.st_size for __, stat in self._list_entries())
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(size={}, hits={}, misses={}, evictions={})>'
+                .format(klass, self.size, self.hits, self.misses,
+                        self.evictions))
+
+    @property
+    def hit_rate(self):
+        """Return the fraction of lookups that found an image."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def get_path(self, url):
+        """Return the path at which the image of a URL is cached.
+
+        :param str url: a URL
+        :rtype: str
+        """
+        return os.path.join(self.root, hash_url(url))
+
+    def _list_entries(self):
+        for entry in os.scandir(self.root):
+            if entry.is_file():
+                try:
+                    yield entry.path, entry.stat()
+                except FileNotFoundError:
+                    continue
+
+    def open(self, url):
+        """Open the cached image of a URL.
+
+        :param str url: a URL
+        :return: a file object opened for binary reading, or ``None`` on a miss
+        """
+        path = self.get_path(url)
+        try:
+            fp = open(path, 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return fp
+
+    def get(self, url):
+        """Return the cached image of a URL.
+
+        :param str url: a URL
+        :return: binary image data, or ``None`` on a miss
+        :rtype: bytes
+        """
+        fp = self.open(url)
+        if fp is None:
+            return None
+        with fp:
+            return fp.read()
+
+    def create_temp_file(self):
+        """Return a new temporary file within the cache.
+
+        :return: a file object opened for binary writing
+        """
+        tmp_dir = os.path.join(self.root, 'tmp')
+        return tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False)
+
+    def add(self, url, tmp_path):
+        """Move a temporary file into the cache as the image of a URL.
+
+        :param str url: a URL
+        :param str tmp_path: the path of a temporary file
+        """
+        path = self.get_path(url)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.size += size
+            if self.size > self.max_bytes:
+                self._evict(keep=path)
+
+    def put(self, url, data):
+        """Cache the image of a URL.
+
+        :param str url: a URL
+        :param bytes data: binary image data
+        """
+        with self.create_temp_file() as f:
+            f.write(data)
+        self.add(url, f.name)
+
+    def evict(self):
+        """Evict the least recently used images until under the low mark."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self, keep=None):
+        entries = sorted(self._list_entries(), key=lambda e: e[1].st_mtime)
+        self.size = sum(stat.st_size for __, stat in entries)
+        target = self.max_bytes * self.low_water
+        for path, stat in entries:
+            if self.size <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                self.evictions += 1
+            self.size -= stat.st_size
@@ -0,0 +1,332 @@
+"""Receive the messages that GroupMe posts to bot callback URLs.
+
+Every message in a group is posted to the ``callback_url`` of each bot in
+that group. A :class:`~groupy.callbacks.CallbackServer` accepts those posts,
+turns them into :class:`~groupy.api.messages.Message` objects, and passes
+them to the handlers registered for the path of the URL. Many bots can share
+one server by giving each a different path::
+
+    server = client.callback_server()
+    server.route('/bots/echo', echo)
+    server.route('/bots/logger', log_message)
+    server.run(port=8080)
+
+Handlers may be plain functions, which run in a thread pool, or coroutine
+functions, which run on the event loop.
+"""
+import asyncio
+import json
+import logging
+import time
+import urllib.parse
+from collections import namedtuple
+
+from groupy import utils
+from groupy.api import messages
+
+
+logger = logging.getLogger(__name__)
+
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+}
+
+
+class CallbackStats:
+    """Statistics about the callbacks received by a server."""
+
+    def __init__(self):
+        #: the number of callbacks accepted
+        self.received = 0
+        #: the number of callbacks dropped as duplicate deliveries
+        self.duplicates = 0
+        #: the number of callbacks rejected as malformed or unroutable
+        self.rejected = 0
+        #: the number of handler calls that succeeded
+        self.handled = 0
+        #: the number of handler calls that raised an exception
+        self.failed = 0
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(received={}, duplicates={}, handled={}, failed={})>'
+                .format(klass, self.received, self.duplicates, self.handled,
+                        self.failed))
+
+
+class CallbackServer:
+    """An asyncio HTTP server for bot callbacks.
+
+    Messages are deduplicated by path and message ID, since GroupMe may
+    deliver the same message more than once. Handler calls wait in a bounded
+    queue for one of the workers; when the queue is full, responses are held
+    back until there is room, which slows senders down instead of letting
+    memory grow without bound.
+
+    :param session: the request session given to the messages
+    :type session: :class:`~groupy.session.Session`
+    :param int workers: the number of handler calls run at the same time
+    :param int maxsize: the maximum number of handler calls waiting to run
+    :param int history: the number of message IDs remembered per path for
+                        dropping duplicate deliveries
+    :param int max_body: the maximum size of a callback in bytes
+    """
+
+    def __init__(self, session=None, workers=16, maxsize=1000, history=10000,
+                 max_body=1024 * 1024):
+        self.session = session
+        self.workers = workers
+        self.maxsize = maxsize
+        self.history = history
+        self.max_body = max_body
+        self.routes = {}
+        self.stats = CallbackStats()
+        self.port = None
+        self._seen = {}
+        self._managers = {}
+        self._queue = None
+        self._tasks = []
+        self._server = None
+        self._connections = set()
+
+    def route(self, path, handler):
+        """Pass the messages posted to a path to a handler.
+
+        :param str path: the path of a bot's callback URL
+        :param func handler: a callable taking a
+                             :class:`~groupy.api.messages.Message`
+        """
+        self.routes.setdefault(path, []).append(handler)
+        self._seen.setdefault(path, utils.RecentSet(self.history))
+
+    def to_message(self, data):
+        """Create a message from the data of a callback.
+
+        :param dict data: the data of a callback
+        :return: the message
+        :rtype: :class:`~groupy.api.messages.Message`
+        """
+        group_id = data['group_id']
+        manager = self._managers.get(group_id)
+        if manager is None:
+            manager = messages.Messages(self.session, group_id)
+            self._managers[group_id] = manager
+        return messages.Message(manager, **data)
+
+    async def receive(self, path, data):
+        """Queue the handlers of a path for the message of a callback.
+
+        This waits while the queue is full.
+
+        :param str path: the path to which the callback was posted
+        :param dict data: the data of a callback
+        :return: ``True`` if the message was new
+        :rtype: bool
+        :raises KeyError: if no handler is routed to the path
+        """
+        handlers = self.routes[path]
+        message = self.to_message(data)
+        if not self._seen[path].add(message.id):
+            self.stats.duplicates += 1
+            return False
+        self.stats.received += 1
+        for handler in handlers:
+            await self._queue.put((handler, message))
+        return True
+
+    async def _call(self, handler, message):
+        if asyncio.iscoroutinefunction(handler):
+            await handler(message)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, handler, message)
+
+    async def _work(self):
+        while True:
+            handler, message = await self._queue.get()
+            try:
+                await self._call(handler, message)
+            except Exception:
+                self.stats.failed += 1
+                logger.exception('callback handler failed')
+            else:
+                self.stats.handled += 1
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, method, target, body):
+        path = urllib.parse.urlsplit(target).path
+        if path not in self.routes:
+            return 404
+        if method != 'POST':
+            return 405
+        try:
+            data = json.loads(body.decode('utf-8'))
+            await self.receive(path, data)
+        except (ValueError, TypeError, KeyError):
+            return 400
+        return 200
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, version = request_line.decode('latin-1').split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, __, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    @staticmethod
+    def _respond(writer, status, keep_alive):
+        connection = 'keep-alive' if keep_alive else 'close'
+        head = ('HTTP/1.1 {} {}\r\nContent-Length: 0\r\nConnection: {}\r\n\r\n'
+                .format(status, REASONS[status], connection))
+        writer.write(head.encode('latin-1'))
+
+    async def _handle_connection(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers = request
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError('negative content length')
+                except ValueError:
+                    self._respond(writer, 400, False)
+                    break
+                if length > self.max_body:
+                    self._respond(writer, 413, False)
+                    break
+                body = await reader.readexactly(length)
+                status = await self._process(method, target, body)
+                if status != 200:
+                    self.stats.rejected += 1
+                keep_alive = (version == 'HTTP/1.1' and
+                              headers.get('connection', '').lower() != 'close')
+                self._respond(writer, status, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start accepting callbacks.
+
+        :param str host: the address on which to listen
+        :param int port: the port on which to listen (``0`` picks a free one)
+        """
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [asyncio.ensure_future(self._work())
+                       for __ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle_connection,
+                                                  host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting callbacks and wait for the queued handler calls."""
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self._server.wait_closed()
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def serve_forever(self, host='0.0.0.0', port=8080):
+        """Accept callbacks until cancelled.
+
+        :param str host: the address on which to listen
+        :param int port: the port on which to listen
+        """
+        await self.start(host=host, port=port)
+        try:
+            # a future that is never resolved, so this waits until cancelled
+            await asyncio.get_event_loop().create_future()
+        finally:
+            await self.close()
+
+    def run(self, host='0.0.0.0', port=8080):
+        """Accept callbacks in a new event loop until interrupted.
+
+        :param str host: the address on which to listen
+        :param int port: the port on which to listen
+        """
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(self.serve_forever(host=host, port=port))
+        try:
+            loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            task.cancel()
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            loop.close()
+
+
+LoadReport = namedtuple('LoadReport', 'requests errors seconds')
+
+
+async def _post_callbacks(host, port, requests, report):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path, data in requests:
+            body = json.dumps(data).encode('utf-8')
+            head = ('POST {} HTTP/1.1\r\nHost: {}\r\n'
+                    'Content-Type: application/json\r\n'
+                    'Content-Length: {}\r\n\r\n'
+                    .format(path, host, len(body)))
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            while await reader.readline() not in (b'\r\n', b''):
+                pass
+            report['requests'] += 1
+            if status_line.split()[1:2] != [b'200']:
+                report['errors'] += 1
+    finally:
+        writer.close()
+
+
+async def generate_load(host, port, requests, connections=8):
+    """Post callbacks to a server as fast as it accepts them.
+
+    The requests are shared among persistent connections, so this measures
+    the throughput of the server rather than of connection setup.
+
+    :param str host: the address of the server
+    :param int port: the port of the server
+    :param requests: pairs of a path and the data of a callback
+    :param int connections: the number of concurrent connections
+    :return: the number of requests made, how many failed, and how long
+             they took
+    :rtype: :class:`~groupy.callbacks.LoadReport`
+    """
+    requests = iter(requests)
+    report = {'requests': 0, 'errors': 0}
+    started_at = time.monotonic()
+    await asyncio.gather(*(_post_callbacks(host, port, requests, report)
+                           for __ in range(connections)))
+    return LoadReport(report['requests'], report['errors'],
+                      time.monotonic() - started_at)
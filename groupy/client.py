@@ -3,6 +3,10 @@ from .api import groups
 from .api import chats
 from .api import user
 from .api import attachments
+from .broadcast import Broadcaster
+from .callbacks import CallbackServer
+from .outbox import Outbox
+from .push import PushClient
 from .session import Session
 
 
@@ -35,3 +39,61 @@ class Client:
         """
         session = Session(token=token)
         return cls(session)
+
+    def push(self, group_ids=None, **kwargs):
+        """Create a client for receiving messages in realtime.
+
+        Messages from every group and chat arrive on your user channel, so
+        ``group_ids`` is only needed for group channel subscriptions.
+
+        :param group_ids: the group_ids of groups whose channels to join
+        :type group_ids: :class:`list`
+        :param kwargs kwargs: additional :class:`~groupy.push.PushClient`
+                              arguments
+        :return: a push client
+        :rtype: :class:`~groupy.push.PushClient`
+        """
+        user_id = self.user.me['user_id']
+        return PushClient(self.session, user_id, group_ids=group_ids, **kwargs)
+
+    def callback_server(self, **kwargs):
+        """Create a server for receiving the messages posted to bots.
+
+        :param kwargs kwargs: additional
+                              :class:`~groupy.callbacks.CallbackServer`
+                              arguments
+        :return: a callback server
+        :rtype: :class:`~groupy.callbacks.CallbackServer`
+        """
+        return CallbackServer(self.session, **kwargs)
+
+    def broadcast(self, group_ids, text=None, attachments=None, guid=None,
+                  **kwargs):
+        """Post the same message to many groups in parallel.
+
+        :param group_ids: the group_ids of the groups
+        :type group_ids: :class:`list`
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :param str guid: the ID of the broadcast, which makes retrying a
+                         broadcast safe (random if not given)
+        :param kwargs kwargs: additional :class:`~groupy.broadcast.Broadcaster`
+                              arguments
+        :return: the result for each group, in the order given
+        :rtype: :class:`list`
+        """
+        broadcaster = Broadcaster(**kwargs)
+        return broadcaster.to_groups(self.session, group_ids, text=text,
+                                     attachments=attachments, guid=guid)
+
+    def outbox(self, path, **kwargs):
+        """Open a durable journal for sending messages exactly once.
+
+        :param str path: the path of the SQLite database
+        :param kwargs kwargs: additional :class:`~groupy.outbox.Outbox`
+                              arguments
+        :return: an outbox
+        :rtype: :class:`~groupy.outbox.Outbox`
+        """
+        return Outbox(self.session, path, **kwargs)
@@ -0,0 +1,266 @@
+"""Shrink images before uploading them.
+
+GroupMe re-encodes uploaded images anyway, so large photos can be downscaled
+and re-encoded locally to save upload time and bandwidth. This requires
+`Pillow <https://python-pillow.org/>`_, which is an optional dependency::
+
+    pip install GroupyAPI[images]
+"""
+from concurrent import futures
+import io
+import itertools
+import threading
+import time
+
+try:
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+except ImportError:
+    PILImage = None
+
+
+# image info that describes how to display the pixels rather than where,
+# when, or with what the image was made
+_DISPLAY_INFO = frozenset([
+    'adobe', 'adobe_transform', 'aspect', 'background', 'dpi', 'duration',
+    'gamma', 'icc_profile', 'interlace', 'jfif', 'jfif_density', 'jfif_unit',
+    'jfif_version', 'loop', 'progression', 'progressive', 'transparency',
+    'version',
+])
+
+
+def has_metadata(image):
+    """Return ``True`` if an image carries metadata such as EXIF or text.
+
+    :param image: a Pillow image
+    :rtype: bool
+    """
+    return any(key not in _DISPLAY_INFO for key in image.info)
+
+
+def _strip_metadata(image):
+    image.info = {k: v for k, v in image.info.items() if k in _DISPLAY_INFO}
+    return image
+
+
+def has_transparency(image):
+    """Return ``True`` if an image may have transparent pixels.
+
+    :param image: a Pillow image
+    :rtype: bool
+    """
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def compress_image(data, max_dimension=2048, quality=85):
+    """Downscale and re-encode image data as a JPEG without metadata.
+
+    Since JPEG has no transparency, images that may have transparent pixels
+    are re-encoded as PNG instead, and animated images are re-encoded in
+    their own format without being downscaled. Metadata such as EXIF (which
+    may include a location) and PNG text is always removed; only an image
+    without any is returned unchanged, when it fits within the maximum
+    dimension and re-encoding would not make it smaller.
+
+    :param bytes data: binary image data
+    :param int max_dimension: the maximum width or height in pixels
+    :param int quality: the JPEG quality (1 to 95)
+    :return: the compressed image data
+    :rtype: bytes
+    """
+    image = PILImage.open(io.BytesIO(data))
+    is_clean = not has_metadata(image)
+    output = io.BytesIO()
+    if getattr(image, 'is_animated', False):
+        if is_clean:
+            return data
+        _strip_metadata(image).save(output, format=image.format,
+                                    save_all=True)
+        return output.getvalue()
+    # apply the EXIF orientation before the metadata is dropped
+    image = _strip_metadata(ImageOps.exif_transpose(image))
+    is_oversized = max(image.size) > max_dimension
+    if has_transparency(image):
+        if is_clean and not is_oversized:
+            return data
+        image = image.convert('RGBA')
+        image.thumbnail((max_dimension, max_dimension))
+        image.save(output, format='PNG', optimize=True)
+        return output.getvalue()
+    if is_oversized:
+        image.thumbnail((max_dimension, max_dimension))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    compressed = output.getvalue()
+    if is_clean and not is_oversized and len(compressed) >= len(data):
+        return data
+    return compressed
+
+
+def _timed_compress_image(data, max_dimension, quality):
+    start = time.perf_counter()
+    compressed = compress_image(data, max_dimension=max_dimension,
+                                quality=quality)
+    return compressed, time.perf_counter() - start
+
+
+def _read(source):
+    if hasattr(source, 'read'):
+        return source.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def _compress_source(source, max_dimension, quality):
+    # a path is read here, in the worker process, rather than in the parent
+    data = source if isinstance(source, bytes) else _read(source)
+    compressed, seconds = _timed_compress_image(data, max_dimension, quality)
+    return len(data), compressed, seconds
+
+
+class ImageCompressor:
+    """Compress images before upload.
+
+    Assign one to :attr:`~groupy.api.attachments.Images.compressor` to compress
+    every upload. Statistics are kept across all compressed images.
+
+    :param int max_dimension: the maximum width or height in pixels
+    :param int quality: the JPEG quality (1 to 95)
+    :param int processes: the number of processes with which to compress
+                          batches of images (``None`` compresses in-process)
+    :param int window: the number of images of a batch compressed or waiting
+                       to be collected at once (twice the processes if not
+                       given)
+    :raises ImportError: if Pillow is not installed
+    """
+
+    def __init__(self, max_dimension=2048, quality=85, processes=None,
+                 window=None):
+        if PILImage is None:
+            raise ImportError('Pillow is required to compress images')
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.processes = processes
+        self.window = window
+        #: the number of images compressed
+        self.count = 0
+        #: the total size of the images before compression
+        self.bytes_before = 0
+        #: the total size of the images after compression
+        self.bytes_after = 0
+        #: the total number of seconds spent compressing
+        self.seconds = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(count={}, bytes_before={}, bytes_after={})>'
+                .format(klass, self.count, self.bytes_before,
+                        self.bytes_after))
+
+    @property
+    def bytes_saved(self):
+        """Return the total number of bytes saved by compression."""
+        return self.bytes_before - self.bytes_after
+
+    def get_time_saved(self, bytes_per_second):
+        """Estimate the upload time saved, net of the time spent compressing.
+
+        :param float bytes_per_second: the upload throughput
+        :return: the estimated number of seconds saved
+        :rtype: float
+        """
+        return self.bytes_saved / bytes_per_second - self.seconds
+
+    def _record(self, before, after, seconds):
+        with self._lock:
+            self.count += 1
+            self.bytes_before += before
+            self.bytes_after += after
+            self.seconds += seconds
+
+    def compress(self, source):
+        """Compress one image.
+
+        :param source: a file object containing binary image data, or a path
+        :return: the compressed image
+        :rtype: :class:`io.BytesIO`
+        """
+        data = _read(source)
+        compressed, seconds = _timed_compress_image(data, self.max_dimension,
+                                                    self.quality)
+        self._record(len(data), len(compressed), seconds)
+        return io.BytesIO(compressed)
+
+    def iter_compressed(self, sources):
+        """Compress many images, yielding each as soon as it is ready.
+
+        With processes, at most :attr:`window` images are in flight at once,
+        and images given as paths are read by the worker processes, so a
+        large batch is never held in memory all at once. Images are yielded
+        in the order they finish, together with their position in
+        ``sources``. A failure does not affect the other images; its
+        exception is yielded in place of the compressed image.
+
+        :param sources: file objects containing binary image data, or paths
+        :return: the position of each image in ``sources`` and its compressed
+                 image (or exception)
+        :rtype: generator
+        """
+        if not self.processes:
+            for index, source in enumerate(sources):
+                try:
+                    yield index, self.compress(source)
+                except Exception as e:
+                    yield index, e
+            return
+
+        window = self.window or self.processes * 2
+        sources = enumerate(sources)
+        executor = futures.ProcessPoolExecutor(max_workers=self.processes)
+        with executor:
+            pending = {}
+            while True:
+                for index, source in itertools.islice(
+                        sources, window - len(pending)):
+                    try:
+                        if hasattr(source, 'read'):
+                            source = source.read()
+                        job = executor.submit(_compress_source, source,
+                                              self.max_dimension,
+                                              self.quality)
+                    except Exception as e:
+                        yield index, e
+                        continue
+                    pending[job] = index
+                if not pending:
+                    return
+                done, __ = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED)
+                for job in done:
+                    index = pending.pop(job)
+                    try:
+                        size, compressed, seconds = job.result()
+                    except Exception as e:
+                        yield index, e
+                    else:
+                        self._record(size, len(compressed), seconds)
+                        yield index, io.BytesIO(compressed)
+
+    def compress_many(self, sources):
+        """Compress many images, in a process pool if so configured.
+
+        A failure does not affect the other images; its exception is returned
+        in place of the compressed image.
+
+        :param sources: file objects containing binary image data, or paths
+        :type sources: :class:`list`
+        :return: the compressed images (or exceptions), in the order given
+        :rtype: :class:`list`
+        """
+        sources = list(sources)
+        results = [None] * len(sources)
+        for index, result in self.iter_compressed(sources):
+            results[index] = result
+        return results
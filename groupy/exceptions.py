@@ -152,3 +152,17 @@ class ResultsExpired(ResultsError):
 
     def __init__(self, response, message='The results have expired'):
         super().__init__(response, message)
+
+
+class PushError(ApiError):
+    """Exception raised when the push service rejects a request.
+
+    :param str message: a description of the exception
+    :param dict reply: the reply from the push service
+    """
+
+    message = 'The push service rejected the request'
+
+    def __init__(self, message=None, reply=None):
+        super().__init__(message)
+        self.reply = reply
@@ -0,0 +1,168 @@
+"""Export the direct message history of every chat.
+
+Chats are exported concurrently by a bounded pool of workers, each paging
+backwards through the history of one chat and handing every page to a sink
+as it arrives. The cursor of each chat is checkpointed after every page, so
+an interrupted export resumes where it left off::
+
+    def sink(chat, messages):
+        for message in messages:
+            print(chat.other_user['name'], message.text)
+
+    stats = client.chats.export(sink, path='export.json')
+    print(stats.messages_per_second)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent import futures
+
+from groupy import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExportStats(utils.Stats):
+    """Running totals of an export.
+
+    :param func clock: a function returning the current time in seconds
+    """
+
+    def __init__(self, clock=time.monotonic):
+        super().__init__(clock=clock)
+        self.chats = 0
+        self.pages = 0
+        self.messages = 0
+        self.failures = 0
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return '<{}(chats={}, messages={}, failures={})>'.format(
+            klass, self.chats, self.messages, self.failures)
+
+    @property
+    def messages_per_second(self):
+        """Return the overall rate at which messages were exported."""
+        return self.get_rate('messages')
+
+
+class DirectMessageExporter:
+    """A concurrent export of the direct messages of many chats.
+
+    The sink is called with the chat and each page of its messages, newest
+    first. Calls to the sink are made one at a time, so it need not be
+    thread-safe. Once the history of a chat is exhausted it is marked done
+    and skipped by later exports from the same checkpoint file.
+
+    :param manager: the chat manager
+    :type manager: :class:`~groupy.api.chats.Chats`
+    :param func sink: a function accepting a chat and a list of its messages
+    :param int workers: the number of chats exported at the same time
+    :param int limit: maximum number of messages per page
+    :param str path: an optional file in which to checkpoint cursors
+    :param func clock: a function returning the current time in seconds
+    """
+
+    def __init__(self, manager, sink, workers=8, limit=100, path=None,
+                 clock=time.monotonic):
+        self.manager = manager
+        self.sink = sink
+        self.workers = workers
+        self.limit = limit
+        self.path = path
+        self.clock = clock
+        #: the progress of each chat by other_user id
+        self.checkpoints = {}
+        self._lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.checkpoints = json.load(f)
+
+    def get_checkpoint(self, chat):
+        """Return the progress of a chat.
+
+        :param chat: a chat
+        :type chat: :class:`~groupy.api.chats.Chat`
+        :return: the cursor, whether it is done, and the number of messages
+                 exported so far
+        :rtype: dict
+        """
+        user_id = chat.other_user['id']
+        with self._lock:
+            checkpoint = self.checkpoints.get(user_id)
+            if checkpoint is None:
+                checkpoint = {'cursor': None, 'done': False, 'count': 0}
+                self.checkpoints[user_id] = checkpoint
+            return checkpoint
+
+    def save(self):
+        """Persist the progress of every chat, if a path was given."""
+        if self.path is None:
+            return
+        with self._lock:
+            tmp_path = '{}.tmp'.format(self.path)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.checkpoints, f)
+            os.replace(tmp_path, self.path)
+
+    def export_chat(self, chat, stats):
+        """Export the remaining history of one chat.
+
+        :param chat: a chat
+        :type chat: :class:`~groupy.api.chats.Chat`
+        :param stats: the totals to add to
+        :type stats: :class:`~groupy.export.ExportStats`
+        :return: the number of messages exported
+        :rtype: int
+        """
+        checkpoint = self.get_checkpoint(chat)
+        count = 0
+        while not checkpoint['done']:
+            page = list(chat.messages.list(before_id=checkpoint['cursor'],
+                                           limit=self.limit))
+            if page:
+                with self._sink_lock:
+                    self.sink(chat, page)
+            with self._lock:
+                if page:
+                    checkpoint['cursor'] = page[-1].id
+                    checkpoint['count'] += len(page)
+                else:
+                    checkpoint['done'] = True
+            self.save()
+            count += len(page)
+            stats.add(pages=1, messages=len(page))
+        stats.add(chats=1)
+        return count
+
+    def _export_chat(self, chat, stats):
+        try:
+            self.export_chat(chat, stats)
+        except Exception:
+            stats.add(failures=1)
+            logger.exception('could not export the chat with %s',
+                             chat.other_user['id'])
+
+    def export(self, chats=None):
+        """Export every chat.
+
+        A chat that cannot be exported is logged and counted as a failure;
+        its checkpoint keeps the progress made before the failure.
+
+        :param chats: the chats to export (defaults to all chats)
+        :type chats: :class:`list`
+        :return: the totals of the export
+        :rtype: :class:`~groupy.export.ExportStats`
+        """
+        if chats is None:
+            chats = self.manager.list_all()
+        stats = ExportStats(clock=self.clock)
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for chat in chats:
+                executor.submit(self._export_chat, chat, stats)
+        stats.finished_at = stats.clock()
+        return stats
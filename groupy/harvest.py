@@ -0,0 +1,153 @@
+"""Download the images of many messages in parallel."""
+import logging
+import os
+import threading
+from concurrent import futures
+
+from groupy import cache
+from groupy import utils
+from groupy.api import attachments
+
+
+logger = logging.getLogger(__name__)
+
+
+class HarvestStats(utils.Stats):
+    """Statistics about a harvest."""
+
+    def __init__(self):
+        super().__init__()
+        #: the number of image attachments found
+        self.images = 0
+        #: the number of images skipped because their URL was already stored
+        self.url_hits = 0
+        #: the number of downloads whose content was already stored
+        self.content_hits = 0
+        #: the number of images downloaded
+        self.downloads = 0
+        #: the number of bytes downloaded
+        self.bytes = 0
+        #: the URLs that could not be downloaded, with their exceptions
+        self.failures = []
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return ('<{}(images={}, downloads={}, bytes={}, failures={})>'
+                .format(klass, self.images, self.downloads, self.bytes,
+                        len(self.failures)))
+
+    def add_failure(self, url, exception):
+        """Record a failed download in a thread-safe manner.
+
+        :param str url: the URL of the image
+        :param exception: the exception raised
+        """
+        with self._lock:
+            self.failures.append((url, exception))
+
+    @property
+    def bytes_per_second(self):
+        """Return the download throughput."""
+        return self.get_rate('bytes')
+
+    @property
+    def url_hit_rate(self):
+        """Return the fraction of images skipped by URL."""
+        return self.url_hits / self.images if self.images else 0
+
+    @property
+    def content_hit_rate(self):
+        """Return the fraction of downloads that were already stored."""
+        return self.content_hits / self.downloads if self.downloads else 0
+
+
+class Harvester:
+    """Download the image attachments of messages into a content store.
+
+    Images are deduplicated by URL before downloading and by content after,
+    and images whose URL is already in the store are skipped.
+
+    :param images: an image manager
+    :type images: :class:`~groupy.api.attachments.Images`
+    :param store: the store in which to save images
+    :type store: :class:`~groupy.cache.ContentStore`
+    :param int workers: the number of concurrent downloads
+    :param str suffix: an optional URL suffix for a size variant
+    """
+
+    def __init__(self, images, store, workers=8, suffix=None):
+        self.images = images
+        self.store = store
+        self.workers = workers
+        self.suffix = suffix
+
+    @staticmethod
+    def get_images(messages):
+        """Return the image attachments of messages.
+
+        :param messages: messages
+        :return: image attachments
+        :rtype: generator
+        """
+        for message in messages:
+            for attachment in message.attachments:
+                if isinstance(attachment, attachments.Image):
+                    yield attachment
+
+    def fetch(self, image, stats):
+        """Download one image into the store.
+
+        :param image: an image attachment
+        :type image: :class:`~groupy.api.attachments.Image`
+        :param stats: the statistics to update
+        :type stats: :class:`~groupy.harvest.HarvestStats`
+        :return: the hex digest of the image
+        :rtype: str
+        """
+        url = self.images.get_url(image, suffix=self.suffix)
+        with self.store.create_temp_file() as f:
+            writer = cache.HashingWriter(f)
+            try:
+                self.images.download_to(image, writer, suffix=self.suffix)
+            except Exception:
+                f.close()
+                os.remove(f.name)
+                raise
+        is_new = self.store.add(f.name, writer.digest, url=url)
+        stats.add(downloads=1, bytes=writer.size, content_hits=int(not is_new))
+        return writer.digest
+
+    def _fetch_safely(self, image, stats, slots):
+        try:
+            return self.fetch(image, stats)
+        except Exception as e:
+            logger.exception('could not download %s', image.url)
+            stats.add_failure(image.url, e)
+        finally:
+            slots.release()
+
+    def harvest(self, messages):
+        """Download the images of messages.
+
+        Messages are consumed lazily, so a pager's ``autopage()`` can be given
+        directly; at most twice as many images as workers are queued at once.
+
+        :param messages: messages with image attachments
+        :return: the statistics of the harvest
+        :rtype: :class:`~groupy.harvest.HarvestStats`
+        """
+        stats = HarvestStats()
+        seen_urls = set()
+        slots = threading.BoundedSemaphore(self.workers * 2)
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for image in self.get_images(messages):
+                stats.add(images=1)
+                url = self.images.get_url(image, suffix=self.suffix)
+                if url in seen_urls or self.store.lookup(url) is not None:
+                    stats.add(url_hits=1)
+                    continue
+                seen_urls.add(url)
+                slots.acquire()
+                executor.submit(self._fetch_safely, image, stats, slots)
+        stats.finished_at = stats.clock()
+        return stats
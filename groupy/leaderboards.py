@@ -0,0 +1,167 @@
+"""Combine the leaderboards of many groups."""
+import heapq
+import logging
+import threading
+import time
+from concurrent import futures
+
+from groupy.api import messages
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_like_count(message):
+    """Return the number of likes of a message.
+
+    :param message: a message
+    :type message: :class:`~groupy.api.messages.GenericMessage`
+    :rtype: int
+    """
+    return len(message.data.get('favorited_by') or [])
+
+
+class AggregateLeaderboard:
+    """The most liked messages across many groups.
+
+    The leaderboard of each group is cached per period for ``ttl`` seconds.
+    Stale leaderboards are fetched concurrently when the top messages are
+    requested, or, once :func:`start` is called, by a background thread so
+    that requests are answered from the cache without waiting. A group whose
+    leaderboard cannot be fetched keeps its previous one.
+
+    :param session: the request session
+    :type session: :class:`~groupy.session.Session`
+    :param group_ids: the group_ids of the groups
+    :type group_ids: :class:`list`
+    :param float ttl: the number of seconds a leaderboard is fresh
+    :param int workers: the number of leaderboards fetched at the same time
+    :param func clock: a function returning the current time in seconds
+    """
+
+    def __init__(self, session, group_ids, ttl=300, workers=8,
+                 clock=time.monotonic):
+        self.session = session
+        self.group_ids = list(group_ids)
+        self.ttl = ttl
+        self.workers = workers
+        self.clock = clock
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._periods = set()
+
+    @property
+    def is_running(self):
+        """Return ``True`` if the background thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_stale(self, group_id, period):
+        """Return ``True`` if a leaderboard should be fetched again.
+
+        :param str group_id: the group_id of a group
+        :param str period: either "day", "week", or "month"
+        :rtype: bool
+        """
+        entry = self._cache.get((group_id, period))
+        return entry is None or self.clock() - entry[0] >= self.ttl
+
+    def fetch(self, group_id, period):
+        """Fetch and cache the leaderboard of one group.
+
+        :param str group_id: the group_id of a group
+        :param str period: either "day", "week", or "month"
+        :return: the messages
+        :rtype: :class:`list`
+        """
+        leaderboard = messages.Leaderboard(self.session, group_id)
+        top = leaderboard.list(period)
+        with self._lock:
+            self._cache[(group_id, period)] = (self.clock(), top)
+        return top
+
+    def refresh(self, period, missing_only=False):
+        """Fetch the stale leaderboards of a period concurrently.
+
+        :param str period: either "day", "week", or "month"
+        :param bool missing_only: whether to fetch only leaderboards that were
+                                  never fetched
+        :return: the number of leaderboards fetched
+        :rtype: int
+        """
+        if missing_only:
+            group_ids = [g for g in self.group_ids
+                         if (g, period) not in self._cache]
+        else:
+            group_ids = [g for g in self.group_ids if self.is_stale(g, period)]
+        if not group_ids:
+            return 0
+        fetched = 0
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            jobs = [(g, executor.submit(self.fetch, g, period))
+                    for g in group_ids]
+        for group_id, job in jobs:
+            try:
+                job.result()
+            except Exception:
+                logger.exception('could not fetch the leaderboard of %s',
+                                 group_id)
+            else:
+                fetched += 1
+        return fetched
+
+    def top(self, period='day', k=10):
+        """Return the most liked messages across all of the groups.
+
+        :param str period: either "day", "week", or "month"
+        :param int k: the number of messages
+        :return: the messages, most liked first
+        :rtype: :class:`list`
+        """
+        self._periods.add(period)
+        self.refresh(period, missing_only=self.is_running)
+        with self._lock:
+            boards = [self._cache.get((g, period)) for g in self.group_ids]
+        candidates = (m for board in boards if board for m in board[1])
+        return heapq.nlargest(k, candidates, key=get_like_count)
+
+    def run(self, interval=None):
+        """Refresh the periods requested so far until stopped.
+
+        :param float interval: the number of seconds between refreshes
+                               (defaults to the TTL)
+        """
+        interval = self.ttl if interval is None else interval
+        while not self._stop.is_set():
+            for period in list(self._periods):
+                self.refresh(period)
+            self._stop.wait(interval)
+
+    def start(self, periods=('day',), interval=None):
+        """Refresh leaderboards in a background thread.
+
+        :param periods: the periods to keep fresh
+        :type periods: :class:`list`
+        :param float interval: the number of seconds between refreshes
+                               (defaults to the TTL)
+        :return: ``True`` if a new thread was started
+        :rtype: bool
+        """
+        self._periods.update(periods)
+        if self.is_running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(interval,),
+                                        daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, wait=True):
+        """Stop refreshing leaderboards in the background.
+
+        :param bool wait: whether to wait for the background thread to exit
+        """
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
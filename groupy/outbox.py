@@ -0,0 +1,247 @@
+"""Send messages exactly once through a durable journal.
+
+A send is recorded in a SQLite journal, with its own source_guid, before it
+is attempted. If the process crashes or a request times out, nobody knows
+whether the message went out, so before a send is attempted again the recent
+messages of its conversation are searched for its source_guid. Only sends
+that were never delivered are posted again::
+
+    outbox = client.outbox('outbox.db')
+    outbox.flush()  # finish whatever the last run left pending
+    outbox.send(group.messages, text='hello')
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from groupy import exceptions
+from groupy import utils
+from groupy.api import attachments as attachments_
+from groupy.api import messages
+
+
+#: a send that has not been delivered yet
+PENDING = 'pending'
+#: a send that was delivered
+SENT = 'sent'
+#: a send that failed for good
+FAILED = 'failed'
+
+
+Send = namedtuple('Send', 'source_guid kind conversation_id text attachments '
+                          'status attempts message_id error created_at')
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sends (
+    source_guid TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    text TEXT,
+    attachments TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    message_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sends_status ON sends (status);
+'''
+
+
+class Outbox:
+    """A durable journal of group and direct message sends.
+
+    :param session: the request session
+    :type session: :class:`~groupy.session.Session`
+    :param str path: the path of the SQLite database
+    :param int max_attempts: the number of attempts before a send fails
+    :param int lookback: the maximum number of recent messages searched for a
+                         send whose delivery is unknown
+    :param float skew: the number of seconds of clock difference tolerated
+                       when deciding how far back to search
+    """
+
+    def __init__(self, session, path, max_attempts=5, lookback=200, skew=60):
+        self.session = session
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lookback = lookback
+        self.skew = skew
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the journal."""
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, *args):
+        with self._lock, self._db:
+            return self._db.execute(sql, args).fetchall()
+
+    @staticmethod
+    def _to_send(row):
+        send = Send(*row)
+        attachments = None
+        if send.attachments:
+            attachments = json.loads(send.attachments)
+        return send._replace(attachments=attachments)
+
+    def _select(self, where, *args):
+        sql = ('SELECT source_guid, kind, conversation_id, text, attachments, '
+               'status, attempts, message_id, error, created_at FROM sends '
+               'WHERE {} ORDER BY created_at'.format(where))
+        return [self._to_send(row) for row in self._execute(sql, *args)]
+
+    def get(self, source_guid):
+        """Return a send.
+
+        :param str source_guid: the source_guid of the send
+        :return: the send, or ``None`` if it is not in the journal
+        :rtype: :class:`~groupy.outbox.Send`
+        """
+        sends = self._select('source_guid = ?', source_guid)
+        return sends[0] if sends else None
+
+    def pending(self):
+        """Return the sends not yet delivered, oldest first.
+
+        :rtype: :class:`list`
+        """
+        return self._select('status = ?', PENDING)
+
+    def add(self, manager, text=None, attachments=None):
+        """Record a new send without attempting it.
+
+        :param manager: a :class:`~groupy.api.messages.Messages` or
+                        :class:`~groupy.api.messages.DirectMessages` manager
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :return: the pending send
+        :rtype: :class:`~groupy.outbox.Send`
+        """
+        if isinstance(manager, messages.DirectMessages):
+            kind, conversation_id = 'direct', manager.other_user_id
+        else:
+            kind, conversation_id = 'group', manager.group_id
+        serialized = None
+        if attachments is not None:
+            serialized = json.dumps([a.to_json() for a in attachments])
+        send = Send(str(uuid.uuid4()), kind, conversation_id, text, serialized,
+                    PENDING, 0, None, None, time.time())
+        placeholders = ', '.join('?' * len(send))
+        self._execute('INSERT INTO sends VALUES ({})'.format(placeholders),
+                      *send)
+        return self._to_send(send)
+
+    def send(self, manager, text=None, attachments=None):
+        """Record a new send and attempt it.
+
+        :param manager: a :class:`~groupy.api.messages.Messages` or
+                        :class:`~groupy.api.messages.DirectMessages` manager
+        :param str text: the text of the message
+        :param attachments: a list of attachments
+        :type attachments: :class:`list`
+        :return: the send after the attempt
+        :rtype: :class:`~groupy.outbox.Send`
+        """
+        send = self.add(manager, text=text, attachments=attachments)
+        return self.deliver(send)
+
+    def get_manager(self, send):
+        """Return the message manager of the conversation of a send.
+
+        :param send: a send
+        :type send: :class:`~groupy.outbox.Send`
+        :return: a :class:`~groupy.api.messages.Messages` or
+                 :class:`~groupy.api.messages.DirectMessages` manager
+        """
+        if send.kind == 'direct':
+            return messages.DirectMessages(self.session, send.conversation_id)
+        return messages.Messages(self.session, send.conversation_id)
+
+    def find(self, send):
+        """Search the recent messages of a conversation for a send.
+
+        :param send: a send
+        :type send: :class:`~groupy.outbox.Send`
+        :return: the delivered message, or ``None`` if it was not found
+        :rtype: :class:`~groupy.api.messages.GenericMessage`
+        """
+        manager = self.get_manager(send)
+        oldest = utils.get_datetime(send.created_at - self.skew)
+        recent = manager.list(limit=min(self.lookback, 100)).autopage()
+        for count, message in enumerate(recent, 1):
+            if getattr(message, 'source_guid', None) == send.source_guid:
+                return message
+            if message.created_at < oldest or count >= self.lookback:
+                break
+        return None
+
+    def _update(self, send, **changes):
+        send = send._replace(**changes)
+        self._execute('UPDATE sends SET status = ?, attempts = ?, '
+                      'message_id = ?, error = ? WHERE source_guid = ?',
+                      send.status, send.attempts, send.message_id, send.error,
+                      send.source_guid)
+        return send
+
+    def deliver(self, send):
+        """Attempt a pending send.
+
+        A send that was attempted before is first searched for among the
+        recent messages of its conversation, and only posted again if it is
+        not found. The attempt is recorded before the request is made, so a
+        crash during the request is never mistaken for a send that was never
+        attempted.
+
+        :param send: a pending send
+        :type send: :class:`~groupy.outbox.Send`
+        :return: the send after the attempt
+        :rtype: :class:`~groupy.outbox.Send`
+        """
+        if send.status != PENDING:
+            return send
+        if send.attempts:
+            message = self.find(send)
+            if message is not None:
+                return self._update(send, status=SENT, message_id=message.id,
+                                    error=None)
+            if send.attempts >= self.max_attempts:
+                return self._update(send, status=FAILED)
+        send = self._update(send, attempts=send.attempts + 1)
+        manager = self.get_manager(send)
+        attachments = None
+        if send.attachments is not None:
+            attachments = attachments_.Attachment.from_bulk_data(
+                send.attachments)
+        try:
+            message = manager.create(text=send.text, attachments=attachments,
+                                     source_guid=send.source_guid)
+        except exceptions.ApiError as e:
+            status = FAILED
+            if utils.is_transient_error(e):
+                status = PENDING
+            elif utils.is_duplicate_error(e):
+                # a send with the same source_guid was already accepted
+                return self._update(send, status=SENT, error=None)
+            return self._update(send, status=status, error=str(e))
+        return self._update(send, status=SENT, message_id=message.id,
+                            error=None)
+
+    def flush(self):
+        """Attempt every pending send, oldest first.
+
+        Call this on startup to finish the sends left by a crash.
+
+        :return: the sends after their attempts
+        :rtype: :class:`list`
+        """
+        return [self.deliver(send) for send in self.pending()]
@@ -70,6 +70,29 @@ class GroupList(Pager):
     def set_next_page_params(self):
         self.params['page'] += 1
 
+    def list_changed(self, has_changed):
+        """Collect items until reaching a page with an unchanged item.
+
+        Since the order of groups and chats is determined by recent activity,
+        every item after the first unchanged item is assumed to be unchanged
+        as well. The rest of that page is still checked in case activity ties.
+
+        :param func has_changed: a callable that returns ``True`` for an item
+                                 that has changed
+        :return: the changed items, most recently active first
+        :rtype: :class:`list`
+        """
+        changed = []
+        per_page = self.params.get('per_page')
+        while self.items:
+            page_changed = [i for i in self.items if has_changed(i)]
+            changed.extend(page_changed)
+            is_last_page = per_page is not None and len(self.items) < per_page
+            if len(page_changed) < len(self.items) or is_last_page:
+                break
+            self.items = self.fetch_next()
+        return changed
+
 
 class ChatList(GroupList):
     pass
@@ -0,0 +1,338 @@
+"""Poll conversations for new messages."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from groupy import exceptions
+from groupy import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_since(manager, last_id, limit=20):
+    """Return the messages created since a message without skipping any.
+
+    :param manager: a :class:`~groupy.api.messages.Messages` or
+                    :class:`~groupy.api.messages.DirectMessages` manager
+    :param str last_id: the ID of the newest message already seen (``None``
+                        if the conversation had no messages)
+    :param int limit: maximum number of messages per page
+    :return: the new messages, oldest first, and the ID of the newest message
+    :rtype: tuple
+    """
+    # with no previous message, every message is new
+    poller = GapAwarePoller(manager, last_id or '0', limit=limit)
+    messages = poller.poll()
+    return messages, poller.last_id if messages else last_id
+
+
+class GapAwarePoller:
+    """Poll a conversation for new messages without skipping any.
+
+    Listing messages ``since_id`` returns only the most recent messages, so a
+    full page means there may be messages between the watermark and the page.
+    When that happens, the gap is filled by paging forwards from the watermark
+    (or backwards from the page, for direct messages) before the watermark is
+    moved.
+
+    :param manager: a :class:`~groupy.api.messages.Messages` or
+                    :class:`~groupy.api.messages.DirectMessages` manager
+    :param str last_id: the ID of the newest message already seen
+    :param int limit: maximum number of messages per page
+    :param limiter: a limiter charged once before each request
+    :type limiter: :class:`~groupy.utils.RateLimiter`
+    """
+
+    def __init__(self, manager, last_id=None, limit=20, limiter=None):
+        self.manager = manager
+        self.last_id = last_id
+        self.limit = limit
+        self.limiter = limiter
+        #: the number of full pages that might have hidden messages
+        self.gaps_found = 0
+        #: the number of gaps that were filled
+        self.gaps_filled = 0
+        #: the number of messages recovered by filling gaps
+        self.messages_recovered = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        if self.limiter is not None:
+            self.limiter.acquire()
+
+    def _autopage(self, messages):
+        while messages.items:
+            yield from messages.items
+            self._acquire()
+            messages.items = messages.fetch_next()
+
+    def poll(self):
+        """Return the messages created since the last poll.
+
+        If no watermark was given, the first poll only establishes one.
+
+        :return: new messages, oldest first
+        :rtype: :class:`list`
+        """
+        with self._lock:
+            self._acquire()
+            if self.last_id is None:
+                newest = list(self.manager.list(limit=1))
+                if newest:
+                    self.last_id = newest[0].id
+                return []
+            page = list(self.manager.list_since(self.last_id,
+                                                limit=self.limit))
+            if not page:
+                return []
+            page.reverse()
+            if len(page) >= self.limit:
+                self.gaps_found += 1
+                gap = self.fill_gap(self.last_id, page[0].id)
+                self.gaps_filled += 1
+                self.messages_recovered += len(gap)
+                page = gap + page
+            self.last_id = page[-1].id
+            return page
+
+    def fill_gap(self, after_id, before_id):
+        """Return the messages strictly between two messages.
+
+        :param str after_id: the ID of the older message
+        :param str before_id: the ID of the newer message
+        :return: the messages in between, oldest first
+        :rtype: :class:`list`
+        """
+        low, high = int(after_id), int(before_id)
+        self._acquire()
+        if hasattr(self.manager, 'list_after'):
+            messages = self.manager.list_after(after_id, limit=self.limit)
+            gap = []
+            for message in self._autopage(messages):
+                if int(message.id) >= high:
+                    break
+                gap.append(message)
+            return gap
+        messages = self.manager.list(before_id=before_id, limit=self.limit)
+        gap = []
+        for message in self._autopage(messages):
+            if int(message.id) <= low:
+                break
+            gap.append(message)
+        gap.reverse()
+        return gap
+
+
+class Conversation:
+    """A conversation watched by a :class:`~groupy.polling.MultiPoller`.
+
+    :param manager: a :class:`~groupy.api.messages.Messages` or
+                    :class:`~groupy.api.messages.DirectMessages` manager
+    :param str last_id: the ID of the newest message already seen
+    :param float interval: the initial number of seconds between polls
+    :param int limit: maximum number of messages per page
+    :param limiter: a limiter charged once before each request
+    :type limiter: :class:`~groupy.utils.RateLimiter`
+    """
+
+    def __init__(self, manager, last_id=None, interval=1, limit=20,
+                 limiter=None):
+        self.manager = manager
+        self.poller = GapAwarePoller(manager, last_id=last_id, limit=limit,
+                                     limiter=limiter)
+        self.interval = interval
+        #: when the conversation is next due to be polled
+        self.next_poll = 0
+        #: the number of times the conversation has been polled
+        self.polls = 0
+        #: the number of new messages found
+        self.message_count = 0
+        #: the number of polls that failed
+        self.failures = 0
+        self.is_watched = True
+
+    def __repr__(self):
+        klass = self.__class__.__name__
+        return '<{}(url={!r}, interval={})>'.format(klass, self.manager.url,
+                                                    self.interval)
+
+
+class MultiPoller:
+    """Poll many conversations for new messages from a single loop.
+
+    Each conversation is polled on its own interval, which shrinks while new
+    messages keep arriving and grows while the conversation is idle. Every
+    request, including those made to fill a gap, is charged to a global budget
+    of requests per second. New messages are passed to
+    the handler along with their conversation, oldest first.
+
+    :param func handler: a callable taking a
+                         :class:`~groupy.polling.Conversation` and a
+                         :class:`list` of new messages
+    :param float min_interval: the minimum number of seconds between polls of
+                               one conversation
+    :param float max_interval: the maximum number of seconds between polls of
+                               one conversation
+    :param float rate: the maximum number of requests per second across all
+                       conversations (unlimited if ``None``)
+    :param float speedup: the factor applied to the interval after new messages
+    :param float slowdown: the factor applied to the interval after no messages
+    :param int limit: maximum number of messages per page
+    """
+
+    def __init__(self, handler, min_interval=1, max_interval=300, rate=None,
+                 speedup=0.5, slowdown=2, limit=20):
+        self.handler = handler
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.limiter = utils.RateLimiter(rate) if rate else None
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.limit = limit
+        self.conversations = []
+        self._schedule = []
+        self._counter = itertools.count()
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+
+    def _push(self, conversation):
+        entry = (conversation.next_poll, next(self._counter), conversation)
+        heapq.heappush(self._schedule, entry)
+
+    def watch(self, manager, last_id=None):
+        """Start polling a conversation.
+
+        :param manager: a :class:`~groupy.api.messages.Messages` or
+                        :class:`~groupy.api.messages.DirectMessages` manager
+        :param str last_id: the ID of the newest message already seen
+        :return: the watched conversation
+        :rtype: :class:`~groupy.polling.Conversation`
+        """
+        conversation = Conversation(manager, last_id=last_id,
+                                    interval=self.min_interval,
+                                    limit=self.limit, limiter=self.limiter)
+        with self._changed:
+            self.conversations.append(conversation)
+            self._push(conversation)
+            self._changed.notify()
+        return conversation
+
+    def unwatch(self, conversation):
+        """Stop polling a conversation.
+
+        :param conversation: a watched conversation
+        :type conversation: :class:`~groupy.polling.Conversation`
+        """
+        with self._changed:
+            conversation.is_watched = False
+            self.conversations.remove(conversation)
+
+    def adapt(self, conversation, new_count):
+        """Adjust the interval of a conversation after a poll.
+
+        :param conversation: the conversation just polled
+        :type conversation: :class:`~groupy.polling.Conversation`
+        :param int new_count: the number of new messages found
+        """
+        factor = self.speedup if new_count else self.slowdown
+        interval = conversation.interval * factor
+        conversation.interval = min(self.max_interval,
+                                    max(self.min_interval, interval))
+
+    def poll(self, conversation, now=None):
+        """Poll one conversation and reschedule it.
+
+        A poll that fails with an API error is logged and counted, and the
+        conversation backs off as if it were idle.
+
+        :param conversation: the conversation to poll
+        :type conversation: :class:`~groupy.polling.Conversation`
+        :param float now: the current time
+        :return: the new messages, oldest first
+        :rtype: :class:`list`
+        """
+        try:
+            new_messages = conversation.poller.poll()
+        except exceptions.ApiError:
+            logger.exception('could not poll %r', conversation)
+            conversation.failures += 1
+            new_messages = []
+        conversation.polls += 1
+        conversation.message_count += len(new_messages)
+        self.adapt(conversation, len(new_messages))
+        if now is None:
+            now = time.monotonic()
+        conversation.next_poll = now + conversation.interval
+        if new_messages:
+            self.handler(conversation, new_messages)
+        return new_messages
+
+    def _pop_due(self, now):
+        with self._changed:
+            while self._schedule:
+                next_poll, __, conversation = self._schedule[0]
+                if not conversation.is_watched:
+                    heapq.heappop(self._schedule)
+                elif next_poll <= now:
+                    return heapq.heappop(self._schedule)[-1]
+                else:
+                    return None
+            return None
+
+    def poll_due(self, now=None):
+        """Poll every conversation that is due.
+
+        :param float now: the current time
+        :return: the number of conversations polled
+        :rtype: int
+        """
+        due_at = time.monotonic() if now is None else now
+        polled = []
+        try:
+            conversation = self._pop_due(due_at)
+            while conversation is not None:
+                polled.append(conversation)
+                self.poll(conversation, now=now)
+                conversation = self._pop_due(due_at)
+        finally:
+            with self._changed:
+                for conversation in polled:
+                    if conversation.is_watched:
+                        self._push(conversation)
+        return len(polled)
+
+    def get_delay(self, now=None):
+        """Return the number of seconds until the next poll is due.
+
+        :param float now: the current time
+        :return: seconds until the next poll, or ``None`` if nothing is watched
+        :rtype: float
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._changed:
+            while self._schedule and not self._schedule[0][-1].is_watched:
+                heapq.heappop(self._schedule)
+            if not self._schedule:
+                return None
+            return max(0, self._schedule[0][0] - now)
+
+    def run(self):
+        """Poll conversations until stopped.
+
+        Handler exceptions propagate and end the loop.
+        """
+        while not self._stop.is_set():
+            self.poll_due()
+            with self._changed:
+                if not self._stop.is_set():
+                    self._changed.wait(self.get_delay())
+
+    def stop(self):
+        """Stop polling after the current round."""
+        with self._changed:
+            self._stop.set()
+            self._changed.notify()
@@ -0,0 +1,256 @@
+"""Receive messages in realtime from the GroupMe push service.
+
+The push service speaks the Bayeux protocol over HTTP long-polling. After a
+handshake, the client subscribes to your user channel (which carries new
+messages from every group and chat) and optionally to individual group
+channels, and then repeatedly connects to wait for new messages.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+from groupy import exceptions
+from groupy import utils
+from groupy.api import messages
+
+
+logger = logging.getLogger(__name__)
+
+
+class PushClient:
+    """A subscriber to the GroupMe push service.
+
+    New messages are delivered as :class:`~groupy.api.messages.Message` and
+    :class:`~groupy.api.messages.DirectMessage` objects, either to handlers
+    called from a background thread or through an async iterator::
+
+        async for message in client.push():
+            print(message.text)
+
+    :param session: the request session
+    :type session: :class:`~groupy.session.Session`
+    :param str user_id: your user ID
+    :param group_ids: the group_ids of groups whose channels to subscribe to
+    :type group_ids: :class:`list`
+    :param str url: the URL of the push service
+    :param float timeout: the maximum number of seconds to wait for a response
+    :param float backoff: the initial number of seconds to wait before
+                          reconnecting after a failure
+    :param float max_backoff: the maximum number of seconds to wait before
+                              reconnecting after a failure
+    :param int history: the number of message IDs remembered for dropping
+                        duplicate deliveries
+    """
+
+    #: the URL of the push service
+    url = 'https://push.groupme.com/faye'
+
+    #: the version of the Bayeux protocol
+    version = '1.0'
+
+    def __init__(self, session, user_id, group_ids=None, url=None, timeout=60,
+                 backoff=1, max_backoff=60, history=1000):
+        self.session = session
+        self.user_id = str(user_id)
+        self.group_ids = list(group_ids or [])
+        if url is not None:
+            self.url = url
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.client_id = None
+        self.handlers = []
+        self._message_ids = itertools.count(1)
+        self._seen = utils.RecentSet(history)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __aiter__(self):
+        return self.stream()
+
+    @property
+    def channels(self):
+        """Return the channels to which to subscribe.
+
+        :rtype: :class:`list`
+        """
+        channels = ['/user/{}'.format(self.user_id)]
+        channels.extend('/group/{}'.format(g) for g in self.group_ids)
+        return channels
+
+    @property
+    def is_running(self):
+        """Return ``True`` if the background thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _send(self, message):
+        message['id'] = str(next(self._message_ids))
+        response = self.session.post(self.url, json=[message],
+                                     timeout=self.timeout)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise exceptions.InvalidJsonError(response) from e
+
+    def _send_meta(self, message):
+        replies = self._send(message)
+        for reply in replies:
+            if reply.get('channel') == message['channel']:
+                break
+        else:
+            raise exceptions.PushError(
+                'no reply to {}'.format(message['channel']))
+        if not reply.get('successful'):
+            raise exceptions.PushError(reply.get('error'), reply=reply)
+        return reply, replies
+
+    def _get_ext(self):
+        return {
+            'access_token': self.session.headers['x-access-token'],
+            'timestamp': int(time.time()),
+        }
+
+    def handshake(self):
+        """Perform the handshake and obtain a client ID.
+
+        :raises groupy.exceptions.PushError: if the handshake fails
+        """
+        message = {
+            'channel': '/meta/handshake',
+            'version': self.version,
+            'supportedConnectionTypes': ['long-polling'],
+        }
+        reply, __ = self._send_meta(message)
+        self.client_id = reply['clientId']
+
+    def subscribe(self, channel):
+        """Subscribe to a channel.
+
+        :param str channel: the channel
+        :raises groupy.exceptions.PushError: if the subscription fails
+        """
+        message = {
+            'channel': '/meta/subscribe',
+            'clientId': self.client_id,
+            'subscription': channel,
+            'ext': self._get_ext(),
+        }
+        self._send_meta(message)
+
+    def connect(self):
+        """Wait for new messages.
+
+        :return: new messages
+        :rtype: :class:`list`
+        :raises groupy.exceptions.PushError: if the connection fails
+        """
+        message = {
+            'channel': '/meta/connect',
+            'clientId': self.client_id,
+            'connectionType': 'long-polling',
+        }
+        __, replies = self._send_meta(message)
+        new_messages = []
+        for reply in replies:
+            message = self.to_message(reply.get('data') or {})
+            if message is not None and self._seen.add(message.id):
+                new_messages.append(message)
+        return new_messages
+
+    def to_message(self, data):
+        """Create a message from the data of a push event.
+
+        :param dict data: the data of a push event
+        :return: the message, or ``None`` for events that are not new messages
+        :rtype: :class:`~groupy.api.messages.GenericMessage`
+        """
+        subject = data.get('subject')
+        if data.get('type') == 'line.create':
+            manager = messages.Messages(self.session, subject['group_id'])
+            return messages.Message(manager, **subject)
+        if data.get('type') == 'direct_message.create':
+            other_user_id = subject['sender_id']
+            if other_user_id == self.user_id:
+                other_user_id = subject['recipient_id']
+            manager = messages.DirectMessages(self.session, other_user_id)
+            return messages.DirectMessage(manager, **subject)
+        return None
+
+    def _dispatch(self, message):
+        for handler in list(self.handlers):
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('push handler failed')
+
+    def run(self):
+        """Receive messages until stopped.
+
+        Each new message is passed to every handler. Failures are retried
+        after an exponentially increasing delay, with a new handshake.
+        """
+        delay = self.backoff
+        while not self._stop.is_set():
+            try:
+                if self.client_id is None:
+                    self.handshake()
+                    for channel in self.channels:
+                        self.subscribe(channel)
+                for message in self.connect():
+                    self._dispatch(message)
+            except exceptions.ApiError:
+                logger.exception('lost connection to the push service')
+                self.client_id = None
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+            else:
+                delay = self.backoff
+
+    def start(self):
+        """Receive messages in a background thread.
+
+        :return: ``True`` if a new thread was started
+        :rtype: bool
+        """
+        if self.is_running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, wait=True):
+        """Stop receiving messages.
+
+        :param bool wait: whether to wait for the background thread to exit
+        """
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    async def stream(self):
+        """Return new messages as they arrive.
+
+        The background thread is started if necessary, and stopped again when
+        the iteration ends if it was started here.
+
+        :return: new messages
+        :rtype: async generator
+        """
+        loop = asyncio.get_event_loop()
+        inbox = asyncio.Queue()
+
+        def handler(message):
+            loop.call_soon_threadsafe(inbox.put_nowait, message)
+
+        self.handlers.append(handler)
+        started = self.start()
+        try:
+            while True:
+                yield await inbox.get()
+        finally:
+            self.handlers.remove(handler)
+            if started:
+                self.stop(wait=False)
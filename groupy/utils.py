@@ -1,5 +1,9 @@
+import collections
+from collections import namedtuple
 import urllib
 import operator
+import threading
+import time
 from datetime import datetime, timezone, timedelta
 
 from groupy import exceptions
@@ -26,6 +30,35 @@ def parse_share_url(share_url):
     return group_id, share_token
 
 
+def is_transient_error(error):
+    """Return ``True`` if a failed request may succeed when retried.
+
+    :param Exception error: the exception raised by the request
+    :rtype: bool
+    """
+    if isinstance(error, exceptions.NoResponse):
+        return True
+    if isinstance(error, exceptions.BadResponse):
+        status_code = getattr(error.response, 'status_code', None)
+        return status_code == 429 or (status_code or 0) >= 500
+    return False
+
+
+def is_duplicate_error(error):
+    """Return ``True`` if a message was rejected for reusing a source_guid.
+
+    The API rejects a message whose source_guid matches one sent shortly
+    before, so when a send is retried this means an earlier attempt was
+    delivered.
+
+    :param Exception error: the exception raised by the request
+    :rtype: bool
+    """
+    if isinstance(error, exceptions.BadResponse):
+        return getattr(error.response, 'status_code', None) == 409
+    return False
+
+
 def get_rfc3339(when):
     """Return an RFC 3339 timestamp.
 
@@ -117,3 +150,136 @@ def make_filter(**tests):
     """Create a filter from keyword arguments."""
     tests = [AttrTest(k, v) for k, v in tests.items()]
     return Filter(tests)
+
+
+class RateLimiter:
+    """A thread-safe token bucket for limiting the rate of requests.
+
+    :param float rate: number of tokens added per second
+    :param float capacity: maximum number of tokens (defaults to ``rate``)
+    :param func clock: a callable returning the current time in seconds
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(rate, 1) if capacity is None else capacity
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available.
+
+        :param float tokens: number of tokens to take
+        :return: ``0`` if the tokens were taken, otherwise the number of
+                 seconds until they will be available
+        :rtype: float
+        """
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self.updated_at
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Take tokens, waiting until they are available.
+
+        :param float tokens: number of tokens to take
+        """
+        delay = self.try_acquire(tokens)
+        while delay:
+            time.sleep(delay)
+            delay = self.try_acquire(tokens)
+
+
+class RecentSet:
+    """A set that remembers only its most recently added items.
+
+    :param int capacity: the maximum number of items remembered
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        """Add an item, forgetting the oldest items beyond the capacity.
+
+        :param item: a hashable item
+        :return: ``True`` if the item was not already present
+        :rtype: bool
+        """
+        with self._lock:
+            if item in self._items:
+                return False
+            self._items[item] = None
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+            return True
+
+
+class Result(namedtuple('Result', 'target value error')):
+    """The outcome of one operation of a bulk request.
+
+    ``target`` is what the operation was applied to, ``value`` is what it
+    produced, if anything, and ``error`` is the exception that made it fail,
+    if it failed.
+    """
+
+    @property
+    def ok(self):
+        """Return ``True`` if the operation succeeded."""
+        return self.error is None
+
+
+class Stats:
+    """Thread-safe counters of a long-running operation.
+
+    Subclasses set their counters to zero after calling ``__init__``.
+
+    :param func clock: a callable returning the current time in seconds
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started_at = clock()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        """Increase counters in a thread-safe manner.
+
+        :param kwargs counts: the amount by which to increase each counter
+        """
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def elapsed(self):
+        """Return the number of seconds the operation took (or has taken)."""
+        finished_at = self.finished_at
+        if finished_at is None:
+            finished_at = self.clock()
+        return finished_at - self.started_at
+
+    def get_rate(self, name):
+        """Return the increase of a counter per second.
+
+        :param str name: the name of the counter
+        :rtype: float
+        """
+        elapsed = self.elapsed
+        return getattr(self, name) / elapsed if elapsed > 0 else 0.0
@@ -29,6 +29,11 @@ setup(
     package_dir={'groupy': 'groupy'},
     include_package_data=True,
     install_requires=requirements,
+    python_requires='>=3.6',
+    extras_require={
+        'images': ['Pillow'],
+        'analytics': ['numpy'],
+    },
     license="Apache Software License, Version 2.0",
     keywords=['api', 'GroupMe'],
     classifiers=[
@@ -46,8 +51,6 @@ setup(
         'Natural Language :: English',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
     ],
     test_suite='tests',
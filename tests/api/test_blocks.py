@@ -128,3 +128,56 @@ class BlockEqualityTests(BlockTests):
         block = blocks.Block(self.m_manager, user_id=self.block.user_id,
                              blocked_user_id=self.block.blocked_user_id)
         self.assertEqual(self.block, block)
+
+
+class BlockSetTests(BlocksTests):
+    def setUp(self):
+        super().setUp()
+        self.now = 0
+        data = {'blocks': [{'blocked_user_id': 'a'}, {'blocked_user_id': 'b'}]}
+        self.m_session.get.return_value = mock.Mock(data=data)
+        self.m_session.post.return_value = mock.Mock(data={'block': {}})
+        self.m_session.delete.return_value = mock.Mock(ok=True)
+        self.cache = self.blocks.cached(ttl=60)
+        self.cache.clock = lambda: self.now
+
+    def test_blocks_are_listed_once(self):
+        for user_id in ['a', 'b', 'c'] * 10:
+            self.cache.is_blocked(user_id)
+        self.assertEqual(self.m_session.get.call_count, 1)
+
+    def test_is_blocked(self):
+        self.assertTrue(self.cache.is_blocked('a'))
+        self.assertFalse(self.cache.is_blocked('c'))
+
+    def test_blocks_are_listed_again_after_ttl(self):
+        self.cache.is_blocked('a')
+        self.now = 60
+        self.cache.is_blocked('a')
+        self.assertEqual(self.m_session.get.call_count, 2)
+
+    def test_cache_is_shared(self):
+        self.assertIs(self.blocks.cached(), self.cache)
+
+    def test_cached_keeps_ttl_by_default(self):
+        self.blocks.cached()
+        self.assertEqual(self.cache.ttl, 60)
+
+    def test_cached_updates_ttl(self):
+        self.blocks.cached(ttl=10)
+        self.assertEqual(self.cache.ttl, 10)
+
+    def test_block_updates_cache(self):
+        self.cache.refresh()
+        self.blocks.block('c')
+        self.assertIn('c', self.cache)
+        self.assertEqual(self.m_session.get.call_count, 1)
+
+    def test_unblock_updates_cache(self):
+        self.cache.refresh()
+        self.blocks.unblock('a')
+        self.assertNotIn('a', self.cache)
+
+    def test_filter_blocked(self):
+        members = [mock.Mock(user_id=u) for u in 'abc']
+        self.assertEqual(self.cache.filter_blocked(members), members[:2])
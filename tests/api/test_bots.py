@@ -1,6 +1,8 @@
+import threading
 import unittest
 from unittest import mock
 
+from groupy import exceptions
 from groupy.api import bots
 
 
@@ -143,3 +145,107 @@ class BotEqualityTests(BotTests):
         bot = bots.Bot(self.m_manager, name='bob', bot_id=self.bot_id)
         bot.bot_id = 2 * self.bot_id
         self.assertNotEqual(self.bot, bot)
+
+
+class DispatcherTests(BotsTests):
+    def setUp(self):
+        super().setUp()
+        self.bots.post = mock.Mock(return_value=True)
+        self.dispatcher = self.bots.dispatcher(workers=2, backoff=0.01)
+        self.addCleanup(self.dispatcher.close)
+
+    def test_posts_are_delivered(self):
+        futures = [self.dispatcher.submit('a', str(i)) for i in range(10)]
+        self.assertTrue(all(f.result(timeout=5) for f in futures))
+        self.assertEqual(self.bots.post.call_count, 10)
+
+    def test_callback_is_called(self):
+        callback = mock.Mock()
+        future = self.dispatcher.submit('a', 'foo', callback=callback)
+        future.result(timeout=5)
+        self.dispatcher.close()
+        callback.assert_called_once_with(future)
+
+    def test_transient_failures_are_retried(self):
+        error = exceptions.NoResponse(mock.Mock())
+        self.bots.post.side_effect = [error, error, True]
+        future = self.dispatcher.submit('a', 'foo')
+        self.assertTrue(future.result(timeout=5))
+        self.assertEqual(self.dispatcher.stats.retries, 2)
+
+    def test_permanent_failures_are_not_retried(self):
+        error = exceptions.BadResponse(mock.Mock(status_code=400), message='x')
+        self.bots.post.side_effect = error
+        future = self.dispatcher.submit('a', 'foo')
+        with self.assertRaises(exceptions.BadResponse):
+            future.result(timeout=5)
+        self.assertEqual(self.dispatcher.stats.failed, 1)
+
+    def test_stats(self):
+        for i in range(3):
+            self.dispatcher.submit('a', str(i))
+        self.dispatcher.close()
+        self.assertEqual(self.dispatcher.stats.submitted, 3)
+        self.assertEqual(self.dispatcher.stats.delivered, 3)
+        self.assertGreater(self.dispatcher.stats.throughput, 0)
+
+    def test_submit_after_close(self):
+        self.dispatcher.close()
+        with self.assertRaises(RuntimeError):
+            self.dispatcher.submit('a', 'foo')
+
+
+class DispatcherOrderingTests(BotsTests):
+    def setUp(self):
+        super().setUp()
+        self.posted = []
+        self.bots.post = mock.Mock(side_effect=self.post)
+        self.dispatcher = bots.Dispatcher(self.bots, workers=1, bot_rate=1000)
+        self.addCleanup(self.dispatcher.close)
+
+    def post(self, bot_id, text, attachments=None):
+        if text == 'blocker':
+            self.started.set()
+            self.gate.wait(5)
+        else:
+            self.posted.append(text)
+        return True
+
+    def test_higher_priority_is_posted_first(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        blocker = self.dispatcher.submit('a', 'blocker')
+        self.started.wait(5)
+        self.dispatcher.submit('a', 'low', priority=5)
+        self.dispatcher.submit('a', 'high', priority=1)
+        self.gate.set()
+        blocker.result(timeout=5)
+        self.dispatcher.close()
+        self.assertEqual(self.posted, ['high', 'low'])
+
+    def test_per_bot_rate_is_limited(self):
+        self.dispatcher.bot_rate = 0.001
+        self.dispatcher.submit('a', 'first').result(timeout=5)
+        second = self.dispatcher.submit('a', 'second')
+        other = self.dispatcher.submit('b', 'other')
+        other.result(timeout=5)
+        self.assertFalse(second.done())
+        second.cancel()
+
+
+class BroadcastBotsTests(BotsTests):
+    def test_each_bot_posts_once(self):
+        self.m_session.post.return_value = mock.Mock(ok=True)
+        results = self.bots.broadcast(['b1', 'b2'], 'hi', backoff=0)
+        self.assertEqual([r.target for r in results], ['b1', 'b2'])
+        self.assertTrue(all(r.ok for r in results))
+        bot_ids = {kwargs['json']['bot_id']
+                   for __, kwargs in self.m_session.post.call_args_list}
+        self.assertEqual(bot_ids, {'b1', 'b2'})
+
+    def test_failures_are_reported(self):
+        response = mock.Mock(status_code=400)
+        self.m_session.post.side_effect = exceptions.BadResponse(response,
+                                                                    message='x')
+        result, = self.bots.broadcast(['b1'], 'hi', backoff=0)
+        self.assertFalse(result.ok)
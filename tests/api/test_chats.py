@@ -47,3 +47,102 @@ class ChatTests(unittest.TestCase):
         self.chat.messages = mock.Mock()
         self.chat.post()
         self.assertTrue(self.chat.messages.create.called)
+
+
+def get_chat_data(user_id, updated_at, last_message_id=None):
+    return {
+        'other_user': {'id': user_id, 'name': user_id},
+        'created_at': 123457890,
+        'updated_at': updated_at,
+        'last_message': {'id': last_message_id},
+    }
+
+
+class ChatListChangedTests(ChatsTests):
+    def setUp(self):
+        super().setUp()
+        self.pages = [
+            [get_chat_data('a', 30), get_chat_data('b', 20)],
+            [get_chat_data('c', 10), get_chat_data('d', 5)],
+            [get_chat_data('e', 1)],
+        ]
+        self.m_session.get.side_effect = [mock.Mock(data=p) for p in self.pages]
+
+    def test_stops_at_page_with_unchanged_chat(self):
+        chats = self.chats.list(per_page=2)
+        changed = chats.list_changed(lambda c: c.other_user['id'] != 'd')
+        self.assertEqual([c.other_user['id'] for c in changed], ['a', 'b', 'c'])
+        self.assertEqual(self.m_session.get.call_count, 2)
+
+    def test_stops_at_short_page(self):
+        changed = self.chats.list(per_page=2).list_changed(lambda c: True)
+        self.assertEqual(len(changed), 5)
+        self.assertEqual(self.m_session.get.call_count, 3)
+
+
+class ChatDirectoryTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = mock.Mock()
+        self.chats = {
+            'a': self.get_chat('a', 10, '100'),
+            'b': self.get_chat('b', 10, '200'),
+        }
+        self.manager.list_all.return_value = list(self.chats.values())
+        self.directory = chats.ChatDirectory(self.manager, limit=20)
+        self.directory.sync()
+
+    def get_chat(self, user_id, updated_at, last_message_id=None):
+        chat = chats.Chat(self.manager, **get_chat_data(user_id, updated_at,
+                                                       last_message_id))
+        chat.messages = mock.Mock()
+        return chat
+
+    def set_changed(self, *changed):
+        def list_changed(has_changed):
+            return [c for c in changed if has_changed(c)]
+        chat_list = self.manager.list.return_value
+        chat_list.list_changed.side_effect = list_changed
+
+    def test_first_sync_lists_every_chat(self):
+        self.assertEqual(len(self.directory), 2)
+        self.assertEqual(self.directory.watermarks, {'a': '100', 'b': '200'})
+
+    def test_first_sync_fetches_no_messages(self):
+        self.assertFalse(self.chats['a'].messages.list_since.called)
+
+    def test_changed_chat_fetches_messages_since_watermark(self):
+        chat = self.get_chat('a', 20, '102')
+        new_messages = [mock.Mock(id='102'), mock.Mock(id='101')]
+        chat.messages.list_since.return_value = new_messages
+        self.set_changed(chat)
+        changes = self.directory.sync()
+        chat.messages.list_since.assert_called_once_with('100', limit=20)
+        self.assertEqual(changes, [chats.ChatDirectory.Change(
+            chat, new_messages[::-1])])
+        self.assertEqual(self.directory.watermarks['a'], '102')
+        self.assertIs(self.directory.chats['a'], chat)
+
+    def test_unchanged_chats_are_skipped(self):
+        self.set_changed(self.get_chat('a', 10, '100'))
+        self.assertEqual(self.directory.sync(), [])
+
+    def test_sync_does_not_list_every_chat_again(self):
+        self.set_changed()
+        self.directory.sync()
+        self.assertEqual(self.manager.list_all.call_count, 1)
+
+    def test_new_chat_is_added(self):
+        chat = self.get_chat('c', 20, '300')
+        chat.messages.list_since.return_value = [mock.Mock(id='300')]
+        self.set_changed(chat)
+        changes = self.directory.sync()
+        chat.messages.list_since.assert_called_once_with('0', limit=20)
+        self.assertEqual(len(changes[0].messages), 1)
+        self.assertEqual(len(self.directory), 3)
+
+
+class DirectoryChatsTests(ChatsTests):
+    def test_directory_is_a_ChatDirectory(self):
+        directory = self.chats.directory(watermarks={'a': '1'})
+        self.assertIsInstance(directory, chats.ChatDirectory)
+        self.assertEqual(directory.watermarks, {'a': '1'})
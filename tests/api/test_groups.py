@@ -2,6 +2,7 @@ from unittest import mock
 
 from .base import get_fake_response, get_fake_member_data, get_fake_group_data
 from .base import TestCase
+from groupy import exceptions
 from groupy import pagers
 from groupy.api import groups
 
@@ -152,6 +153,45 @@ class ChangeOwnersGroupTests(GroupsTests):
         self.assertTrue(isinstance(self.result, groups.ChangeOwnersResult))
 
 
+class ChangeOwnersManyGroupTests(GroupsTests):
+    def setUp(self):
+        super().setUp()
+        self.posted = []
+        self.m_session.post.side_effect = self.post
+
+    def post(self, url, json):
+        self.posted.append(json['requests'])
+        results = [dict(r, status='200') for r in json['requests']]
+        results.reverse()
+        return get_fake_response(data={'results': results})
+
+    def test_requests_are_chunked(self):
+        requests = [(str(i), 'owner') for i in range(5)]
+        self.groups.change_owners_many(requests, chunk_size=2)
+        self.assertEqual([len(p) for p in self.posted], [2, 2, 1])
+
+    def test_results_are_in_order_given(self):
+        requests = [(str(i), 'owner') for i in range(5)]
+        results = self.groups.change_owners_many(requests, chunk_size=2)
+        self.assertEqual([r.group_id for r in results], [g for g, __ in requests])
+        self.assertTrue(all(r.is_success for r in results))
+
+    def test_missing_results_are_not_successes(self):
+        self.m_session.post.side_effect = None
+        self.m_session.post.return_value = get_fake_response(data={'results': []})
+        result, = self.groups.change_owners_many([('foo', 'bar')])
+        self.assertFalse(result.is_success)
+
+    def test_failed_chunks_keep_their_errors(self):
+        error = exceptions.NoResponse(None)
+        self.m_session.post.side_effect = [error, self.post(None, {
+            'requests': [{'group_id': '2', 'owner_id': 'owner'}]})]
+        requests = [('0', 'owner'), ('1', 'owner'), ('2', 'owner')]
+        results = self.groups.change_owners_many(requests, chunk_size=2)
+        self.assertEqual([r.is_success for r in results], [False, False, True])
+        self.assertIs(results[0].error, error)
+
+
 class GroupTests(TestCase):
     def setUp(self):
         self.group = groups.Group(mock.Mock(), **get_fake_group_data())
@@ -229,6 +269,20 @@ class GroupRefreshFromServerTests(GroupTests):
         self.assertEqual(len(self.group.members), len(self.members))
 
 
+class GroupReconcileTests(GroupTests):
+    @mock.patch('groupy.api.memberships.Memberships.reconcile')
+    def test_reconcile_uses_refreshed_members(self, m_reconcile):
+        members = [get_fake_member_data()]
+        refreshed_group = get_fake_group_data(members=members)
+        self.group.manager.get.return_value = get_fake_response(data=refreshed_group)
+        users = [{'user_id': 'baz', 'nickname': 'nick'}]
+        self.group.reconcile(users, user_id='me', dry_run=True)
+        (members, given_users), kwargs = m_reconcile.call_args
+        self.assertEqual(len(members), 1)
+        self.assertEqual(given_users, users)
+        self.assertEqual(kwargs, {'user_id': 'me', 'dry_run': True})
+
+
 class UnsuccessfulChangeOwnersResultTests(TestCase):
     known_codes = '400', '403', '404', '405'
 
@@ -263,3 +317,115 @@ class UnknownChangeOwnerResults(TestCase):
 
     def test_reason_is_unknown(self):
         self.assertEqual(self.result.reason, 'unknown')
+
+
+class ChangeFeedTests(GroupsTests):
+    def setUp(self):
+        super().setUp()
+        self.pages = []
+        self.groups.list = mock.Mock(side_effect=self.get_pager)
+        self.feed = self.groups.change_feed(per_page=2)
+
+    def get_pager(self, **params):
+        endpoint = mock.Mock(side_effect=self.pages + [[]])
+        return pagers.GroupList(self.groups, endpoint, **params)
+
+    def get_group(self, group_id, last_message_id):
+        data = get_fake_group_data(id=group_id, group_id=group_id,
+                                   messages={'last_message_id': last_message_id})
+        group = groups.Group(self.groups, **data)
+        group.messages = mock.Mock()
+        return group
+
+    def test_first_sweep_records_watermarks(self):
+        self.pages = [[self.get_group('a', '1'), self.get_group('b', '2')],
+                      [self.get_group('c', '3')]]
+        changes = self.feed.sweep()
+        self.assertEqual([c.messages for c in changes], [[], [], []])
+        self.assertEqual(self.feed.watermarks, {'a': '1', 'b': '2', 'c': '3'})
+
+    def test_paging_stops_at_unchanged_group(self):
+        self.feed.watermarks = {'a': '1', 'b': '2', 'c': '3'}
+        changed = self.get_group('c', '4')
+        changed.messages.list_since.return_value = [mock.Mock(id='4')]
+        self.pages = [[changed, self.get_group('a', '1')],
+                      [self.get_group('b', '2')]]
+        changes = self.feed.sweep()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].group.group_id, 'c')
+        self.assertEqual(self.feed.watermarks['c'], '4')
+
+    def test_new_messages_are_fetched_since_watermark(self):
+        self.feed.watermarks = {'a': '1'}
+        changed = self.get_group('a', '3')
+        changed.messages.list_since.return_value = [mock.Mock(id='3'),
+                                                    mock.Mock(id='2')]
+        self.pages = [[changed]]
+        change, = self.feed.sweep()
+        changed.messages.list_since.assert_called_once_with('1', limit=100)
+        self.assertEqual([m.id for m in change.messages], ['2', '3'])
+
+
+class GroupDirectoryTests(GroupsTests):
+    def setUp(self):
+        super().setUp()
+        self.pages = []
+        self.groups.list = mock.Mock(side_effect=self.get_pager)
+        self.groups.list_former = mock.Mock(return_value=[])
+        self.directory = self.groups.directory(per_page=2)
+        self.directory.groups = {
+            'a': self.get_group('a', 10),
+            'b': self.get_group('b', 20),
+            'c': self.get_group('c', 30),
+        }
+
+    def get_pager(self, **params):
+        self.endpoint = mock.Mock(side_effect=self.pages + [[]])
+        return pagers.GroupList(self.groups, self.endpoint, **params)
+
+    def get_group(self, group_id, updated_at):
+        data = get_fake_group_data(id=group_id, group_id=group_id,
+                                   updated_at=updated_at)
+        return groups.Group(self.groups, **data)
+
+    def test_added_and_changed(self):
+        self.pages = [[self.get_group('d', 50), self.get_group('a', 40)],
+                      [self.get_group('c', 30), self.get_group('b', 20)]]
+        delta = self.directory.sync()
+        self.assertEqual([g.group_id for g in delta.added], ['d'])
+        self.assertEqual([g.group_id for g in delta.changed], ['a'])
+        self.assertEqual(delta.removed, [])
+        self.assertEqual(len(self.directory), 4)
+
+    def test_paging_stops_at_unchanged_group(self):
+        self.pages = [[self.get_group('a', 40), self.get_group('c', 30)],
+                      [self.get_group('b', 20)]]
+        self.directory.sync()
+        self.assertEqual(self.endpoint.call_count, 1)
+
+    def test_former_groups_are_removed(self):
+        self.pages = [[self.get_group('c', 30)]]
+        self.groups.list_former.return_value = [self.get_group('b', 25)]
+        delta = self.directory.sync()
+        self.assertEqual([g.group_id for g in delta.removed], ['b'])
+        self.assertNotIn('b', self.directory.groups)
+
+    def test_full_sync_removes_missing_groups(self):
+        self.groups.list_all = mock.Mock(return_value=[self.get_group('a', 10)])
+        delta = self.directory.sync(full=True)
+        self.assertEqual([g.group_id for g in delta.removed], ['b', 'c'])
+
+
+class LeaderboardGroupsTests(GroupsTests):
+    def test_all_groups_are_used_by_default(self):
+        groups_data = [get_fake_group_data(group_id=str(i)) for i in range(2)]
+        self.m_session.get.side_effect = [get_fake_response(data=groups_data),
+                                          get_fake_response(data=[])]
+        leaderboard = self.groups.leaderboard(ttl=5)
+        self.assertEqual(leaderboard.group_ids, ['0', '1'])
+        self.assertEqual(leaderboard.ttl, 5)
+
+    def test_given_group_ids_are_used(self):
+        leaderboard = self.groups.leaderboard(['a'])
+        self.assertEqual(leaderboard.group_ids, ['a'])
+        self.assertFalse(self.m_session.get.called)
@@ -1,8 +1,16 @@
 import io
+import os
+import tempfile
+import threading
 import unittest
 from unittest import mock
 
+import requests
+
+from groupy import cache
 from groupy.api import attachments
+from groupy.exceptions import BadResponse
+from groupy.exceptions import NoResponse
 
 
 class ImagesTests(unittest.TestCase):
@@ -30,3 +38,214 @@ class DownloadImageTests(ImagesTests):
 
     def test_result_is_content(self):
         self.assertEqual(self.result, 'bar')
+
+
+class DownloadSizeTests(ImagesTests):
+    def setUp(self):
+        super().setUp()
+        self.m_session.get.return_value = mock.Mock(content='bar')
+        self.m_image_attachment = mock.Mock(url='foo')
+
+    def test_preview_url_has_suffix(self):
+        self.images.download_preview(self.m_image_attachment)
+        (url,), __ = self.m_session.get.call_args
+        self.assertEqual(url, 'foo.preview')
+
+    def test_avatar_url_has_suffix(self):
+        self.images.download_avatar(self.m_image_attachment)
+        (url,), __ = self.m_session.get.call_args
+        self.assertEqual(url, 'foo.avatar')
+
+
+class DownloadToTests(ImagesTests):
+    def setUp(self):
+        super().setUp()
+        self.m_image_attachment = mock.Mock(url='foo')
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'image')
+
+    def get_response(self, code=200, chunks=(b'ab', b'cd'), headers=None):
+        response = mock.Mock(status_code=code, headers=headers or {})
+        response.iter_content.return_value = iter(chunks)
+        return response
+
+    def test_chunks_are_written_to_file_object(self):
+        self.m_session.get.return_value = self.get_response()
+        fp = io.BytesIO()
+        written = self.images.download_to(self.m_image_attachment, fp)
+        self.assertEqual(fp.getvalue(), b'abcd')
+        self.assertEqual(written, 4)
+
+    def test_chunks_are_written_to_path(self):
+        self.m_session.get.return_value = self.get_response()
+        self.images.download_to(self.m_image_attachment, self.path, suffix='large')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+        (url,), kwargs = self.m_session.get.call_args
+        self.assertEqual(url, 'foo.large')
+        self.assertTrue(kwargs['stream'])
+
+    def test_partial_download_is_resumed(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'ab')
+        self.m_session.get.return_value = self.get_response(
+            206, [b'cd'], headers={'content-range': 'bytes 2-3/4'})
+        self.images.download_to(self.m_image_attachment, self.path,
+                                resume=True)
+        __, kwargs = self.m_session.get.call_args
+        self.assertEqual(kwargs['headers'], {'range': 'bytes=2-'})
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+    def test_ignored_range_starts_over(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'xx')
+        self.m_session.get.return_value = self.get_response(200)
+        self.images.download_to(self.m_image_attachment, self.path,
+                                resume=True)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+    def test_existing_file_is_replaced_by_default(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'xx')
+        self.m_session.get.return_value = self.get_response()
+        self.images.download_to(self.m_image_attachment, self.path)
+        __, kwargs = self.m_session.get.call_args
+        self.assertIsNone(kwargs['headers'])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+    def test_mismatched_range_starts_over(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'xx')
+        self.m_session.get.side_effect = [
+            self.get_response(206, [b'd'],
+                              headers={'content-range': 'bytes 3-3/4'}),
+            self.get_response(200),
+        ]
+        self.images.download_to(self.m_image_attachment, self.path,
+                                resume=True)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+    def test_interrupted_download_raises_no_response(self):
+        response = self.get_response()
+        response.iter_content.side_effect = requests.ConnectionError('reset')
+        self.m_session.get.return_value = response
+        with self.assertRaises(NoResponse):
+            self.images.download_to(self.m_image_attachment, io.BytesIO())
+
+    def test_complete_download_is_not_repeated(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'abcd')
+        response = mock.Mock(status_code=416)
+        self.m_session.get.side_effect = BadResponse(response, message='nope')
+        written = self.images.download_to(self.m_image_attachment, self.path,
+                                          resume=True)
+        self.assertEqual(written, 0)
+
+
+class StreamingUploadTests(ImagesTests):
+    def setUp(self):
+        super().setUp()
+        self.m_session.post.return_value = mock.Mock(data={'url': 'bar'})
+
+    def test_file_object_is_streamed(self):
+        fp = io.BytesIO(b'foo')
+        self.images.upload(fp)
+        __, kwargs = self.m_session.post.call_args
+        self.assertIs(kwargs['data'], fp)
+
+    def test_path_is_opened(self):
+        with tempfile.NamedTemporaryFile() as f:
+            self.images.upload(f.name)
+            __, kwargs = self.m_session.post.call_args
+            self.assertEqual(kwargs['data'].name, f.name)
+
+
+class UploadManyTests(ImagesTests):
+    def setUp(self):
+        super().setUp()
+        self.m_session.post.side_effect = self.post
+
+    def post(self, url, data):
+        content = data.read()
+        if content == b'bad':
+            raise ValueError(content)
+        return mock.Mock(data={'url': content, 'picture_url': content})
+
+    def test_results_are_in_input_order(self):
+        files = [io.BytesIO(str(i).encode()) for i in range(10)]
+        results = self.images.upload_many(files, workers=3)
+        urls = [r.image.url for r in results]
+        self.assertEqual(urls, [str(i).encode() for i in range(10)])
+
+    def test_errors_are_per_item(self):
+        files = [io.BytesIO(b'good'), io.BytesIO(b'bad')]
+        good, bad = self.images.upload_many(files)
+        self.assertIsNone(good.error)
+        self.assertIsInstance(bad.error, ValueError)
+        self.assertIsNone(bad.image)
+
+    def test_images_are_uploaded_as_they_are_compressed(self):
+        posted = threading.Event()
+
+        def post(url, data):
+            posted.set()
+            return mock.Mock(data={'url': data.read(), 'picture_url': ''})
+
+        def iter_compressed(sources):
+            yield 1, io.BytesIO(b'b')
+            # the first upload starts before the next image is compressed
+            self.assertTrue(posted.wait(timeout=5))
+            yield 0, io.BytesIO(b'a')
+
+        self.m_session.post.side_effect = post
+        self.images.compressor = mock.Mock(processes=2)
+        self.images.compressor.iter_compressed.side_effect = iter_compressed
+        files = [io.BytesIO(), io.BytesIO()]
+        results = self.images.upload_many(files, workers=1)
+        self.assertEqual([r.source for r in results], files)
+        self.assertEqual([r.image.url for r in results], [b'a', b'b'])
+
+
+class CachedDownloadTests(ImagesTests):
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.images.cache = cache.ImageCache(self.dir.name)
+        self.m_image_attachment = mock.Mock(url='foo')
+        self.m_session.get.side_effect = self.get
+
+    def get(self, url, **kwargs):
+        response = mock.Mock(content=b'bar', status_code=200)
+        response.iter_content.return_value = iter([b'ba', b'r'])
+        return response
+
+    def test_second_download_is_cached(self):
+        self.images.download(self.m_image_attachment)
+        result = self.images.download(self.m_image_attachment)
+        self.assertEqual(result, b'bar')
+        self.assertEqual(self.m_session.get.call_count, 1)
+
+    def test_size_variants_are_cached_separately(self):
+        self.images.download(self.m_image_attachment)
+        self.images.download_preview(self.m_image_attachment)
+        self.assertEqual(self.m_session.get.call_count, 2)
+
+    def test_streamed_download_is_cached(self):
+        self.images.download_to(self.m_image_attachment, io.BytesIO())
+        fp = io.BytesIO()
+        self.images.download_to(self.m_image_attachment, fp)
+        self.assertEqual(fp.getvalue(), b'bar')
+        self.assertEqual(self.m_session.get.call_count, 1)
+
+    def test_failed_download_leaves_no_temporary_file(self):
+        self.m_session.get.side_effect = ValueError('boom')
+        with self.assertRaises(ValueError):
+            self.images.download_to(self.m_image_attachment, io.BytesIO())
+        tmp_dir = os.path.join(self.dir.name, 'tmp')
+        self.assertEqual(os.listdir(tmp_dir), [])
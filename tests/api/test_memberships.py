@@ -3,6 +3,7 @@ from unittest import mock
 from groupy.api import memberships
 from groupy.exceptions import ResultsNotReady
 from groupy.exceptions import ResultsExpired
+from groupy.exceptions import BadResponse
 from .base import get_fake_response, get_fake_member_data
 from .base import TestCase
 
@@ -87,6 +88,15 @@ class MemberIsBlockedTests(MemberTests):
                            other_user_id=self.data['user_id'])
 
 
+class MemberIsBlockedWithCacheTests(MemberTests):
+    def test_cache_is_used_instead_of_api(self):
+        m_blocks = mock.Mock()
+        m_blocks.is_blocked.return_value = True
+        self.assertTrue(self.member.is_blocked(blocks=m_blocks))
+        m_blocks.is_blocked.assert_called_once_with(self.data['user_id'])
+        self.assertFalse(self._blocks.between.called)
+
+
 class BlockMemberTests(MemberTests):
     def setUp(self):
         super().setUp()
@@ -107,6 +117,26 @@ class UnblockMemberTests(MemberTests):
                            other_user_id=self.data['user_id'])
 
 
+class BlockMemberWithCacheTests(MemberTests):
+    def setUp(self):
+        super().setUp()
+        self.m_blocks = mock.Mock()
+
+    def test_block_updates_cache(self):
+        self.member.block(blocks=self.m_blocks)
+        self.m_blocks.add.assert_called_once_with(self.data['user_id'])
+
+    def test_unblock_updates_cache(self):
+        self._blocks.unblock.return_value = True
+        self.member.unblock(blocks=self.m_blocks)
+        self.m_blocks.discard.assert_called_once_with(self.data['user_id'])
+
+    def test_failed_unblock_leaves_cache(self):
+        self._blocks.unblock.return_value = False
+        self.member.unblock(blocks=self.m_blocks)
+        self.assertFalse(self.m_blocks.discard.called)
+
+
 class RemoveMemberTests(MemberTests):
     def setUp(self):
         super().setUp()
@@ -207,3 +237,283 @@ class PollResultsTests(MembershipRequestTests):
 
     def test_result_is_get(self):
         self.assertEqual(self.result, self.request.get.return_value)
+
+
+class CheckMembershipSessionErrorTests(MembershipsTests):
+    def get_error(self, code):
+        return BadResponse(get_fake_response(code=code), message='x')
+
+    def test_raised_not_ready_is_results_not_ready(self):
+        self.m_session.get.side_effect = self.get_error(503)
+        with self.assertRaises(ResultsNotReady):
+            self.memberships.check('bar')
+
+    def test_raised_not_found_is_results_expired(self):
+        self.m_session.get.side_effect = self.get_error(404)
+        with self.assertRaises(ResultsExpired):
+            self.memberships.check('bar')
+
+
+class ResultsPollerTests(TestCase):
+    def setUp(self):
+        self.poller = memberships.ResultsPoller(interval=0.01, max_interval=0.02,
+                                                timeout=1)
+        self.addCleanup(self.poller.close)
+
+    def get_request(self, *outcomes):
+        m_manager = mock.Mock()
+        m_manager.check.side_effect = list(outcomes)
+        request = get_fake_member_data(guid='g')
+        return memberships.MembershipRequest(m_manager, request,
+                                             group_id='baz', results_id='r')
+
+    def test_future_resolves_with_results(self):
+        request = self.get_request(ResultsNotReady(response=None),
+                                   [get_fake_member_data(guid='g')])
+        results = self.poller.submit(request).result(timeout=1)
+        self.assertEqual(len(results.members), 1)
+        self.assertEqual(request.manager.check.call_count, 2)
+
+    def test_expired_results_resolve_with_exception(self):
+        request = self.get_request(ResultsExpired(response=None))
+        with self.assertRaises(ResultsExpired):
+            self.poller.submit(request).result(timeout=1)
+
+    def test_timeout_resolves_with_not_ready(self):
+        self.poller.timeout = 0.05
+        request = self.get_request(*[ResultsNotReady(response=None)] * 100)
+        with self.assertRaises(ResultsNotReady):
+            self.poller.submit(request).result(timeout=1)
+
+    def test_other_errors_resolve_with_exception(self):
+        request = self.get_request(ValueError('x'))
+        with self.assertRaises(ValueError):
+            self.poller.submit(request).result(timeout=1)
+
+    def test_poll_all_returns_results_in_order(self):
+        ready = [get_fake_member_data(guid='g')]
+        requests = [self.get_request(ResultsNotReady(response=None), ready),
+                    self.get_request(ResultsExpired(response=None)),
+                    self.get_request(ready)]
+        results = self.poller.poll_all(requests)
+        self.assertEqual(len(results[0].members), 1)
+        self.assertIsInstance(results[1], ResultsExpired)
+        self.assertEqual(len(results[2].members), 1)
+
+    def test_close_cancels_pending_requests(self):
+        self.poller.interval = 10
+        future = self.poller.submit(self.get_request())
+        self.poller.close()
+        self.assertTrue(future.cancelled())
+
+    def test_closed_poller_rejects_requests(self):
+        self.poller.close()
+        with self.assertRaises(RuntimeError):
+            self.poller.submit(self.get_request())
+
+
+class AddManyMembershipsTests(MembershipsTests):
+    def setUp(self):
+        super().setUp()
+        self.posted = []
+        self.results = {}
+        self.rejected = set()
+        self.m_session.post.side_effect = self.post
+        self.m_session.get.side_effect = self.get
+        self.poller = memberships.ResultsPoller(interval=0.01)
+        self.addCleanup(self.poller.close)
+
+    def post(self, url, json):
+        results_id = str(len(self.posted))
+        self.posted.append(json['members'])
+        added = []
+        for member in json['members']:
+            if member['nickname'] in self.rejected:
+                self.rejected.discard(member['nickname'])
+            else:
+                added.append(get_fake_member_data(guid=member['guid'],
+                                                  nickname=member['nickname']))
+        self.results[results_id] = added
+        return get_fake_response(data={'results_id': results_id})
+
+    def get(self, url):
+        results_id = url.rsplit('/', 1)[-1]
+        return get_fake_response(data={'members': self.results[results_id]})
+
+    def add_many(self, count, **kwargs):
+        users = [{'nickname': str(i), 'user_id': str(i)} for i in range(count)]
+        return self.memberships.add_many(users, poller=self.poller, **kwargs)
+
+    def test_users_are_added_in_chunks(self):
+        results = self.add_many(10, chunk_size=4)
+        self.assertEqual(sorted(len(p) for p in self.posted), [2, 4, 4])
+        self.assertEqual(len(results.members), 10)
+        self.assertEqual(results.failures, [])
+
+    def test_guids_are_unique(self):
+        self.add_many(10, chunk_size=4)
+        guids = [m['guid'] for chunk in self.posted for m in chunk]
+        self.assertEqual(len(set(guids)), 10)
+
+    def test_given_users_are_not_changed(self):
+        users = [{'nickname': 'a', 'user_id': 'a'}]
+        self.memberships.add_many(users, poller=self.poller)
+        self.assertNotIn('guid', users[0])
+
+    def test_only_failed_users_are_retried(self):
+        self.rejected = {'3'}
+        results = self.add_many(10, chunk_size=4)
+        retried, = self.posted[3:]
+        self.assertEqual([m['nickname'] for m in retried], ['3'])
+        self.assertEqual(len(results.members), 10)
+
+    def test_retries_keep_the_same_guid(self):
+        self.rejected = {'3'}
+        self.add_many(10, chunk_size=4)
+        guids = [m['guid'] for chunk in self.posted for m in chunk
+                 if m['nickname'] == '3']
+        self.assertEqual(len(guids), 2)
+        self.assertEqual(len(set(guids)), 1)
+
+    def test_failures_remain_after_retries(self):
+        self.rejected = {'3'}
+        results = self.add_many(10, chunk_size=4, retries=0)
+        failure, = results.failures
+        self.assertEqual(failure['nickname'], '3')
+        self.assertEqual(len(results.members), 9)
+
+    def test_failed_chunk_requests_are_retried(self):
+        post = self.post
+        calls = []
+
+        def fail_once(url, json):
+            calls.append(json)
+            if len(calls) == 1:
+                raise BadResponse(get_fake_response(code=500), message='x')
+            return post(url, json)
+
+        self.m_session.post.side_effect = fail_once
+        results = self.add_many(3, chunk_size=10)
+        self.assertEqual(len(results.members), 3)
+
+
+class GetUserKeyTests(TestCase):
+    def test_user_id_is_preferred(self):
+        key = memberships.get_user_key({'user_id': 1, 'email': 'a@b.c'})
+        self.assertEqual(key, ('user_id', '1'))
+
+    def test_email_is_normalized(self):
+        key = memberships.get_user_key({'email': ' A@B.c'})
+        self.assertEqual(key, ('email', 'a@b.c'))
+
+    def test_phone_number_is_normalized(self):
+        key = memberships.get_user_key({'phone_number': '+1 (555) 123-4567'})
+        self.assertEqual(key, ('phone_number', '+15551234567'))
+
+    def test_user_without_identifier_is_invalid(self):
+        with self.assertRaises(ValueError):
+            memberships.get_user_key({'nickname': 'a'})
+
+
+class ReconcileMembershipsTests(MembershipsTests):
+    def setUp(self):
+        super().setUp()
+        self.members = [
+            self.get_member('1', 'one'),
+            self.get_member('2', 'two'),
+            self.get_member('3', 'boss', roles=['admin', 'owner']),
+        ]
+        self.users = [
+            {'user_id': '1', 'nickname': 'one'},
+            {'user_id': '2', 'nickname': 'deux'},
+            {'user_id': '4', 'nickname': 'four'},
+        ]
+
+    def get_member(self, user_id, nickname, **data):
+        data = get_fake_member_data(id='m' + user_id, user_id=user_id,
+                                    nickname=nickname, **data)
+        return memberships.Member(self.memberships, 'foo', **data)
+
+    def test_plan(self):
+        self.members.append(self.get_member('5', 'five'))
+        plan = self.memberships.plan(self.members, self.users)
+        self.assertEqual(plan.adds, [self.users[2]])
+        self.assertEqual([m.user_id for m in plan.removals], ['5'])
+        self.assertEqual([(m.user_id, n) for m, n in plan.renames],
+                         [('2', 'deux')])
+
+    def test_owners_are_not_removed(self):
+        plan = self.memberships.plan(self.members, self.users)
+        self.assertEqual(plan.removals, [])
+
+    def test_plan_without_removals(self):
+        self.members.append(self.get_member('5', 'five'))
+        plan = self.memberships.plan(self.members, self.users, remove=False)
+        self.assertEqual(plan.removals, [])
+
+    def test_users_by_email_are_added(self):
+        plan = self.memberships.plan(self.members, [{'email': 'a@b.c',
+                                                     'nickname': 'a'}])
+        self.assertEqual(len(plan.adds), 1)
+
+    def test_dry_run_makes_no_requests(self):
+        result = self.memberships.reconcile(self.members, self.users,
+                                            dry_run=True)
+        self.assertEqual(result[1:], ([], [], []))
+        self.assertEqual(len(result.plan.adds), 1)
+        self.m_session.post.assert_not_called()
+
+    @mock.patch('groupy.api.memberships.Memberships.add_many')
+    def test_reconcile_applies_plan(self, m_add_many):
+        new_member = self.get_member('4', 'four')
+        m_add_many.return_value = memberships.MembershipRequest.Results(
+            [new_member], [])
+        self.members.append(self.get_member('5', 'five'))
+        self.m_session.post.return_value = mock.Mock(
+            ok=True, data=get_fake_member_data())
+        result = self.memberships.reconcile(self.members, self.users,
+                                            user_id='2')
+        outcomes = [[r.ok for r in results] for results in result[1:]]
+        self.assertEqual(outcomes, [[True], [True], [True]])
+        m_add_many.assert_called_once_with([self.users[2]], workers=4)
+
+    def test_members_are_not_removed_when_users_are_unconfirmed(self):
+        self.members.append(self.get_member('5', 'five'))
+        self.users.append({'email': 'five@example.com', 'nickname': 'five'})
+        plan = self.memberships.plan(self.members, self.users)
+        self.assertEqual(plan.removals, [])
+        self.assertEqual(plan.unconfirmed, [self.users[3]])
+
+    def test_users_with_user_ids_are_confirmed(self):
+        plan = self.memberships.plan(self.members, self.users)
+        self.assertEqual(plan.unconfirmed, [])
+
+    def test_you_are_not_removed(self):
+        self.members.append(self.get_member('5', 'five'))
+        plan = self.memberships.plan(self.members, self.users, user_id='5')
+        self.assertEqual(plan.removals, [])
+
+    @mock.patch('groupy.api.memberships.Memberships.add_many')
+    def test_reconcile_matches_dry_run(self, m_add_many):
+        self.members.append(self.get_member('5', 'five'))
+        self.members.append(self.get_member('6', 'six'))
+        m_add_many.return_value = memberships.MembershipRequest.Results(
+            [self.get_member('4', 'four')], [])
+        self.m_session.post.return_value = mock.Mock(ok=True)
+        dry_run = self.memberships.reconcile(self.members, self.users,
+                                             dry_run=True, user_id='6')
+        result = self.memberships.reconcile(self.members, self.users,
+                                            user_id='6')
+        removed = [r.target for r in result.removals]
+        self.assertEqual(removed, dry_run.plan.removals)
+        self.assertEqual([m.user_id for m in removed], ['5'])
+
+    @mock.patch('groupy.api.memberships.Memberships.add_many')
+    def test_failures_are_reported(self, m_add_many):
+        m_add_many.return_value = memberships.MembershipRequest.Results(
+            [], [dict(self.users[2], guid='x')])
+        self.members.append(self.get_member('5', 'five'))
+        self.m_session.post.return_value = mock.Mock(ok=False)
+        result = self.memberships.reconcile(self.members, self.users)
+        outcomes = [[r.ok for r in results] for results in result[1:]]
+        self.assertEqual(outcomes, [[False], [False], [False]])
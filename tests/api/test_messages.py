@@ -101,6 +101,48 @@ class CreateAttachmentMessagesTests(MessagesTests):
         self.assertNotIn('text', message)
 
 
+class SetLikesMessagesTests(MessagesTests):
+    def get_urls(self):
+        return [args[0] for args, __ in self.m_session.post.call_args_list]
+
+    def test_message_ids_use_group_id(self):
+        self.messages.set_likes(['1', '2'])
+        self.assertEqual(sorted(self.get_urls()), [
+            'https://api.groupme.com/v3/messages/bar/1/like',
+            'https://api.groupme.com/v3/messages/bar/2/like',
+        ])
+
+    def test_messages_use_their_conversation_id(self):
+        message = messages.Message(self.messages,
+                                   **base.get_fake_message_data(group_id='baz'))
+        self.messages.set_likes([message], liked=False)
+        self.assertEqual(self.get_urls(), [
+            'https://api.groupme.com/v3/messages/baz/foo/unlike',
+        ])
+
+    def test_results_are_in_order_given(self):
+        message_ids = [str(i) for i in range(20)]
+        results = self.messages.set_likes(message_ids, workers=4)
+        self.assertEqual([r.target for r in results], message_ids)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_failures_are_reported(self):
+        error = ValueError('x')
+        self.m_session.post.side_effect = [None, error]
+        results = self.messages.set_likes(['1', '2'], workers=1)
+        self.assertEqual([r.error for r in results], [None, error])
+
+    def test_requests_are_rate_limited(self):
+        with mock.patch.object(utils.RateLimiter, 'acquire') as m_acquire:
+            self.messages.set_likes(['1', '2', '3'], rate=10)
+        self.assertEqual(m_acquire.call_count, 3)
+
+    def test_no_likes_managers_are_built(self):
+        with mock.patch('groupy.api.messages.Likes') as m_likes:
+            self.messages.set_likes(['1', '2'])
+        m_likes.assert_not_called()
+
+
 class DirectMessagesTests(base.TestCase):
     def setUp(self):
         self.m_session = mock.Mock()
@@ -400,3 +442,29 @@ class ListMethodGalleryTests(GalleryTests):
     def test_after(self):
         self.gallery.list_after(self.when)
         self.assert_kwargs(self.gallery._raw_list, after=self.ts)
+
+
+class BackfillMessagesTests(MessagesTests):
+    def setUp(self):
+        super().setUp()
+        self.messages.list = mock.Mock()
+        self.messages.list.return_value.items = [mock.Mock(id='400')]
+        self.messages.list_after = mock.Mock()
+        self.messages.list_after.return_value.items = [mock.Mock(id='0')]
+        self.result = self.messages.backfill(partitions=4)
+
+    def test_spans_are_evenly_spaced(self):
+        bounds = [span.after_id for span in self.result.spans]
+        self.assertEqual(bounds, ['300', '200', '100', None])
+
+
+class SetLikesDirectMessagesTests(DirectMessagesTests):
+    def test_message_ids_need_your_user_id(self):
+        with self.assertRaises(ValueError):
+            self.messages.set_likes(['1'])
+
+    def test_message_ids_use_conversation_id(self):
+        self.messages.set_likes(['1'], user_id='abc')
+        (url,), __ = self.m_session.post.call_args
+        self.assertEqual(url, 'https://api.groupme.com/v3/messages/abc+foo/1/like')
+
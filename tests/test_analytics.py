@@ -0,0 +1,88 @@
+import datetime
+import unittest
+from unittest import mock
+
+from groupy import analytics
+
+
+def get_message(message_id, user_id, created_at, favorited_by):
+    data = {'id': message_id, 'user_id': user_id, 'created_at': created_at,
+            'favorited_by': favorited_by}
+    return mock.Mock(id=message_id, data=data)
+
+
+def get_messages():
+    return [
+        get_message('1', 'a', 100, ['b', 'c']),
+        get_message('2', 'b', 200, ['a']),
+        get_message('3', 'a', 300, ['b', 'c', 'd']),
+        get_message('4', 'c', 400, []),
+    ]
+
+
+class LikeAnalyticsTests(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.analytics = analytics.LikeAnalytics(get_messages(),
+                                                 use_numpy=self.use_numpy)
+
+    def test_all_time_counts(self):
+        self.assertEqual(self.analytics.given, {'a': 1, 'b': 2, 'c': 2, 'd': 1})
+        self.assertEqual(self.analytics.received, {'a': 5, 'b': 1})
+
+    def test_top_messages(self):
+        top = self.analytics.top_messages(k=2)
+        self.assertEqual([m.message_id for m in top], ['3', '1'])
+
+    def test_top_messages_within_window(self):
+        top = self.analytics.top_messages(k=2, start=150, end=350)
+        self.assertEqual([m.message_id for m in top], ['3', '2'])
+
+    def test_windows_accept_datetimes(self):
+        start = datetime.datetime.fromtimestamp(150)
+        top = self.analytics.top_messages(k=1, start=start)
+        self.assertEqual([m.message_id for m in top], ['3'])
+
+    def test_count_likes_within_window(self):
+        given, received = self.analytics.count_likes(start=150)
+        self.assertEqual(given, {'a': 1, 'b': 1, 'c': 1, 'd': 1})
+        self.assertEqual(received, {'a': 3, 'b': 1})
+
+    def test_top_users(self):
+        self.assertEqual(self.analytics.top_users(k=1), [('a', 5)])
+        top_givers = self.analytics.top_users(k=2, end=350, received=False)
+        self.assertEqual(sorted(top_givers), [('b', 2), ('c', 2)])
+
+    def test_graph(self):
+        graph = self.analytics.get_graph(end=250)
+        self.assertEqual(graph, {'b': {'a': 1}, 'c': {'a': 1}, 'a': {'b': 1}})
+
+    def test_adding_new_messages(self):
+        new_count = self.analytics.add([get_message('5', 'd', 500, ['a'])])
+        self.assertEqual(new_count, 1)
+        self.assertEqual(self.analytics.received['d'], 1)
+        top = self.analytics.top_messages(k=5, start=450)
+        self.assertEqual([m.message_id for m in top], ['5'])
+
+    def test_updated_messages_replace_their_likes(self):
+        new_count = self.analytics.add([get_message('2', 'b', 200, ['a', 'c'])])
+        self.assertEqual(new_count, 0)
+        self.assertEqual(len(self.analytics), 4)
+        self.assertEqual(self.analytics.received['b'], 2)
+        self.assertEqual(self.analytics.given['c'], 3)
+
+    def test_removed_likes_drop_users(self):
+        self.analytics.add([get_message('3', 'a', 300, ['b', 'c'])])
+        self.assertNotIn('d', self.analytics.given)
+
+
+@unittest.skipIf(analytics.numpy is None, 'NumPy is not installed')
+class NumpyLikeAnalyticsTests(LikeAnalyticsTests):
+    use_numpy = True
+
+    def test_adjacency_matrix(self):
+        user_ids, matrix = self.analytics.get_adjacency_matrix()
+        b, a = user_ids.index('b'), user_ids.index('a')
+        self.assertEqual(matrix[b][a], 2)
+        self.assertEqual(matrix.sum(), 6)
@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from groupy import backfill
+
+
+class FakeManager:
+    def __init__(self, ids):
+        self.ids = sorted(ids, reverse=True)
+        self.calls = 0
+
+    def list(self, before_id=None, limit=None):
+        self.calls += 1
+        ids = self.ids
+        if before_id is not None:
+            ids = [i for i in ids if i < int(before_id)]
+        return [mock.Mock(id=str(i)) for i in ids[:limit]]
+
+
+class BlockedManager(FakeManager):
+    """A manager whose newest messages are listed only once released."""
+
+    def __init__(self, ids, newest_after):
+        super().__init__(ids)
+        self.newest_after = newest_after
+        self.released = threading.Event()
+
+    def list(self, before_id=None, limit=None):
+        if before_id is None or int(before_id) > self.newest_after:
+            self.released.wait(timeout=5)
+        return super().list(before_id=before_id, limit=limit)
+
+
+class SpanTests(unittest.TestCase):
+    def test_from_seek_points_covers_everything(self):
+        spans = backfill.Span.from_seek_points(['20', '10'])
+        bounds = [(s.before_id, s.after_id) for s in spans]
+        self.assertEqual(bounds, [(None, '20'), ('20', '10'), ('10', None)])
+
+    def test_seek_points_are_sorted_and_unique(self):
+        spans = backfill.Span.from_seek_points(['10', '20', '10'])
+        self.assertEqual(len(spans), 3)
+
+    def test_lower_bound_is_inclusive(self):
+        span = backfill.Span(before_id='20', after_id='10')
+        self.assertTrue(span.contains('10'))
+
+    def test_upper_bound_is_exclusive(self):
+        span = backfill.Span(before_id='20', after_id='10')
+        self.assertFalse(span.contains('20'))
+
+
+class BackfillCrawlTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = FakeManager(range(1, 100))
+        seek_points = ['25', '50', '75']
+        self.backfill = backfill.Backfill.from_seek_points(
+            self.manager, seek_points, limit=7, workers=3)
+        self.ids = [int(m.id) for m in self.backfill.crawl()]
+
+    def test_every_message_is_crawled_once(self):
+        self.assertEqual(sorted(self.ids), list(range(1, 100)))
+
+    def test_messages_of_each_span_are_in_order(self):
+        for low, high in [(1, 24), (25, 49), (50, 74), (75, 99)]:
+            span_ids = [i for i in self.ids if low <= i <= high]
+            self.assertEqual(span_ids, list(range(high, low - 1, -1)))
+
+    def test_every_span_is_done(self):
+        self.assertTrue(self.backfill.is_done)
+
+    def test_count(self):
+        self.assertEqual(self.backfill.count, 99)
+
+
+class BackfillConcurrencyTests(unittest.TestCase):
+    def test_older_spans_do_not_wait_for_newer_spans(self):
+        manager = BlockedManager(range(1, 100), newest_after=50)
+        crawl = backfill.Backfill.from_seek_points(
+            manager, ['50'], limit=5, workers=2, buffer=1).crawl()
+        ids = [int(next(crawl).id) for __ in range(49)]
+        self.assertFalse(manager.released.is_set())
+        self.assertEqual(ids, list(range(49, 0, -1)))
+        manager.released.set()
+        ids.extend(int(m.id) for m in crawl)
+        self.assertEqual(sorted(ids), list(range(1, 100)))
+
+
+class BackfillProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = FakeManager(range(1, 30))
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.backfill = backfill.Backfill.from_seek_points(
+            self.manager, ['15'], limit=5, path=self.path)
+
+    def test_fetch_page_does_not_advance_span(self):
+        span = self.backfill.spans[0]
+        messages, exhausted = self.backfill.fetch_page(span)
+        self.assertEqual([m.id for m in messages], [str(i) for i in
+                                                    range(29, 24, -1)])
+        self.assertFalse(exhausted)
+        self.assertIsNone(span.cursor)
+
+    def test_progress_is_persisted_as_messages_are_yielded(self):
+        crawl = self.backfill.crawl()
+        ids = [next(crawl).id for __ in range(7)]
+        crawl.close()
+        with open(self.path) as f:
+            state = json.load(f)
+        for data, span in zip(state['spans'], self.backfill.spans):
+            span_ids = [i for i in ids if span.contains(i)]
+            self.assertEqual(data['count'], len(span_ids))
+            cursor = span_ids[-1] if span_ids else None
+            self.assertEqual(data['cursor'], cursor)
+
+    def test_resume_has_no_gaps_or_duplicates(self):
+        crawl = self.backfill.crawl()
+        ids = [int(next(crawl).id) for __ in range(7)]
+        crawl.close()
+        resumed = backfill.Backfill.load(self.manager, self.path, limit=5)
+        ids.extend(int(m.id) for m in resumed.crawl())
+        self.assertEqual(sorted(ids), list(range(1, 30)))
+
+    def test_buffered_pages_are_bounded(self):
+        manager = FakeManager(range(1, 100))
+        crawl = backfill.Backfill.from_seek_points(
+            manager, ['50'], limit=5, buffer=2).crawl()
+        next(crawl)
+        time.sleep(0.2)
+        # one page yielded, two buffered per worker, and one in flight per span
+        self.assertLessEqual(manager.calls, 11)
+        crawl.close()
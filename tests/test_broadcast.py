@@ -0,0 +1,101 @@
+import threading
+import unittest
+from unittest import mock
+
+from groupy import broadcast
+from groupy import exceptions
+from groupy.api import attachments
+from groupy.api import messages
+
+
+def get_error(status_code):
+    return exceptions.BadResponse(mock.Mock(status_code=status_code),
+                                  message='x')
+
+
+class ToGroupsTests(unittest.TestCase):
+    def setUp(self):
+        self.m_session = mock.Mock()
+        self.posted = []
+        self.lock = threading.Lock()
+        self.failures = {}
+
+        def post(url, json):
+            with self.lock:
+                self.posted.append((url, json))
+                group_id = url.split('/')[-2]
+                failures = self.failures.get(group_id)
+            if failures:
+                raise failures.pop(0)
+            data = dict(json['message'], id='m' + group_id, group_id=group_id,
+                        created_at=1)
+            return mock.Mock(data={'message': data})
+
+        self.m_session.post.side_effect = post
+        self.broadcaster = broadcast.Broadcaster(workers=4, backoff=0)
+
+    def to_groups(self, group_ids, **kwargs):
+        return self.broadcaster.to_groups(self.m_session, group_ids, **kwargs)
+
+    def test_results_are_in_order_given(self):
+        group_ids = [str(i) for i in range(20)]
+        results = self.to_groups(group_ids, text='hi')
+        self.assertEqual([r.target for r in results], group_ids)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_results_include_messages(self):
+        result, = self.to_groups(['1'], text='hi')
+        self.assertIsInstance(result.value, messages.Message)
+        self.assertEqual(result.value.text, 'hi')
+
+    def test_source_guids_are_stable_per_target(self):
+        self.to_groups(['1', '2'], text='hi', guid='x')
+        guids = {json['message']['source_guid'] for __, json in self.posted}
+        self.assertEqual(guids, {'x-1', 'x-2'})
+
+    def test_attachments_are_serialized_once(self):
+        attachment = attachments.Mentions(loci=[[0, 1]], user_ids=['u'])
+        with mock.patch.object(attachments.Mentions, 'to_json',
+                               return_value={'type': 'mentions'}) as m_to_json:
+            self.to_groups(['1', '2', '3'], attachments=[attachment])
+        self.assertEqual(m_to_json.call_count, 1)
+        for __, json in self.posted:
+            self.assertEqual(json['message']['attachments'],
+                             [{'type': 'mentions'}])
+
+    def test_transient_errors_are_retried_with_same_guid(self):
+        self.failures['1'] = [get_error(503)]
+        result, = self.to_groups(['1'], text='hi', guid='x')
+        self.assertTrue(result.ok)
+        guids = [json['message']['source_guid'] for __, json in self.posted]
+        self.assertEqual(guids, ['x-1', 'x-1'])
+
+    def test_conflict_on_retry_means_delivered(self):
+        self.failures['1'] = [get_error(503), get_error(409)]
+        result, = self.to_groups(['1'], text='hi')
+        self.assertTrue(result.ok)
+        self.assertIsNone(result.value)
+
+    def test_conflict_on_first_attempt_is_failure(self):
+        self.failures['1'] = [get_error(409)]
+        result, = self.to_groups(['1'], text='hi')
+        self.assertFalse(result.ok)
+
+    def test_failures_do_not_affect_other_groups(self):
+        self.failures['2'] = [get_error(400)]
+        results = self.to_groups(['1', '2', '3'], text='hi')
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertIsInstance(results[1].error, exceptions.BadResponse)
+
+    def test_retries_are_limited(self):
+        self.broadcaster.max_retries = 2
+        self.failures['1'] = [get_error(500)] * 5
+        result, = self.to_groups(['1'], text='hi')
+        self.assertFalse(result.ok)
+        self.assertEqual(len(self.posted), 3)
+
+    def test_posts_are_rate_limited(self):
+        self.broadcaster = broadcast.Broadcaster(rate=100)
+        with mock.patch.object(self.broadcaster.limiter, 'acquire') as m_acquire:
+            self.to_groups(['1', '2', '3'], text='hi')
+        self.assertEqual(m_acquire.call_count, 3)
@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from groupy import cache
+
+
+class HashingWriterTests(unittest.TestCase):
+    def test_digest_and_size_of_written_data(self):
+        fp = io.BytesIO()
+        writer = cache.HashingWriter(fp)
+        writer.write(b'foo')
+        writer.write(b'bar')
+        self.assertEqual(fp.getvalue(), b'foobar')
+        self.assertEqual(writer.size, 6)
+        expected = cache.hashlib.sha256(b'foobar').hexdigest()
+        self.assertEqual(writer.digest, expected)
+
+
+class ContentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = cache.ContentStore(self.dir.name)
+
+    def add(self, data, url=None):
+        with self.store.create_temp_file() as f:
+            writer = cache.HashingWriter(f)
+            writer.write(data)
+        return writer.digest, self.store.add(f.name, writer.digest, url=url)
+
+    def test_content_is_stored_by_digest(self):
+        digest, is_new = self.add(b'foo')
+        self.assertTrue(is_new)
+        self.assertIn(digest, self.store)
+        with open(self.store.get_path(digest), 'rb') as f:
+            self.assertEqual(f.read(), b'foo')
+
+    def test_identical_content_is_stored_once(self):
+        self.add(b'foo')
+        __, is_new = self.add(b'foo')
+        self.assertFalse(is_new)
+        self.assertEqual(os.listdir(os.path.join(self.dir.name, 'tmp')), [])
+
+    def test_lookup_by_url(self):
+        digest, __ = self.add(b'foo', url='http://example.com/foo')
+        self.assertEqual(self.store.lookup('http://example.com/foo'), digest)
+
+    def test_lookup_unknown_url(self):
+        self.assertIsNone(self.store.lookup('http://example.com/foo'))
+
+
+class ImageCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.cache = cache.ImageCache(self.dir.name, max_bytes=10)
+
+    def age(self, url, mtime):
+        os.utime(self.cache.get_path(url), (mtime, mtime))
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_hit(self):
+        self.cache.put('a', b'foo')
+        self.assertEqual(self.cache.get('a'), b'foo')
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.hit_rate, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put('a', b'1234')
+        self.cache.put('b', b'1234')
+        self.age('a', 100)
+        self.age('b', 200)
+        self.cache.get('a')
+        self.cache.put('c', b'1234')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), b'1234')
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(self.cache.size, 8)
+
+    def test_eviction_frees_space_below_budget(self):
+        image_cache = cache.ImageCache(self.dir.name, max_bytes=100,
+                                       low_water=0.5)
+        for index in range(10):
+            image_cache.put(str(index), b'x' * 10)
+            os.utime(image_cache.get_path(str(index)), (index, index))
+        with mock.patch.object(image_cache, '_list_entries',
+                               wraps=image_cache._list_entries) as m_list:
+            image_cache.put('a', b'x' * 10)
+            self.assertLessEqual(image_cache.size, 50)
+            for url in 'bcde':
+                image_cache.put(url, b'x' * 10)
+        self.assertEqual(m_list.call_count, 1)
+        self.assertIsNone(image_cache.get('0'))
+        self.assertEqual(image_cache.get('9'), b'x' * 10)
+
+    def test_oversized_image_is_kept_until_next_add(self):
+        self.cache.put('a', b'x' * 20)
+        self.assertEqual(self.cache.get('a'), b'x' * 20)
+
+    def test_size_is_restored_from_disk(self):
+        self.cache.put('a', b'1234')
+        reopened = cache.ImageCache(self.dir.name, max_bytes=10)
+        self.assertEqual(reopened.size, 4)
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import threading
+import unittest
+
+from groupy import callbacks
+from groupy.api import messages
+
+
+def get_callback(message_id, group_id='g1'):
+    return {'id': message_id, 'group_id': group_id, 'created_at': 1,
+            'text': 'hi', 'name': 'bob', 'sender_type': 'user',
+            'attachments': []}
+
+
+async def post(port, path, body, method='POST'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = ('{} {} HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'
+            .format(method, path, len(body)))
+    writer.write(head.encode('latin-1') + body)
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+class CallbackServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = callbacks.CallbackServer(workers=2)
+        self.received = []
+        self.server.route('/bots/a', self.received.append)
+
+    def run_with_server(self, coroutine_function):
+        async def main():
+            await self.server.start()
+            try:
+                return await coroutine_function()
+            finally:
+                await self.server.close()
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(main())
+        finally:
+            loop.close()
+
+    def post(self, path, data, method='POST'):
+        body = json.dumps(data).encode('utf-8')
+        return post(self.server.port, path, body, method=method)
+
+    def test_message_is_passed_to_handler(self):
+        status = self.run_with_server(lambda: self.post('/bots/a',
+                                                        get_callback('1')))
+        self.assertEqual(status, 200)
+        message, = self.received
+        self.assertIsInstance(message, messages.Message)
+        self.assertEqual(message.id, '1')
+        self.assertEqual(message.group_id, 'g1')
+
+    def test_query_string_is_ignored(self):
+        self.run_with_server(lambda: self.post('/bots/a?token=x',
+                                               get_callback('1')))
+        self.assertEqual(len(self.received), 1)
+
+    def test_duplicates_are_dropped(self):
+        async def post_twice():
+            await self.post('/bots/a', get_callback('1'))
+            return await self.post('/bots/a', get_callback('1'))
+
+        status = self.run_with_server(post_twice)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(self.server.stats.duplicates, 1)
+
+    def test_same_message_reaches_every_bot(self):
+        other = []
+        self.server.route('/bots/b', other.append)
+
+        async def post_to_both():
+            await self.post('/bots/a', get_callback('1'))
+            await self.post('/bots/b', get_callback('1'))
+
+        self.run_with_server(post_to_both)
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(len(other), 1)
+
+    def test_unknown_path_is_not_found(self):
+        status = self.run_with_server(lambda: self.post('/bots/x',
+                                                        get_callback('1')))
+        self.assertEqual(status, 404)
+        self.assertEqual(self.server.stats.rejected, 1)
+
+    def test_get_is_not_allowed(self):
+        status = self.run_with_server(lambda: self.post('/bots/a', {},
+                                                        method='GET'))
+        self.assertEqual(status, 405)
+
+    def test_malformed_body_is_bad_request(self):
+        status = self.run_with_server(lambda: post(self.server.port, '/bots/a',
+                                                   b'{nope'))
+        self.assertEqual(status, 400)
+        self.assertEqual(self.received, [])
+
+    def test_negative_content_length_is_bad_request(self):
+        async def post_negative():
+            reader, writer = await asyncio.open_connection(
+                '127.0.0.1', self.server.port)
+            writer.write(b'POST /bots/a HTTP/1.1\r\nContent-Length: -1\r\n'
+                         b'\r\n')
+            status_line = await reader.readline()
+            writer.close()
+            return int(status_line.split()[1])
+        self.assertEqual(self.run_with_server(post_negative), 400)
+
+    def test_oversized_body_is_rejected(self):
+        self.server.max_body = 10
+        status = self.run_with_server(lambda: self.post('/bots/a',
+                                                        get_callback('1')))
+        self.assertEqual(status, 413)
+
+    def test_coroutine_handlers_are_awaited(self):
+        received = []
+
+        async def handler(message):
+            await asyncio.sleep(0)
+            received.append(message)
+
+        self.server.route('/bots/b', handler)
+        self.run_with_server(lambda: self.post('/bots/b', get_callback('1')))
+        self.assertEqual(len(received), 1)
+
+    def test_handler_failures_are_counted(self):
+        def handler(message):
+            raise ValueError(message.id)
+
+        self.server.route('/bots/b', handler)
+        self.run_with_server(lambda: self.post('/bots/b', get_callback('1')))
+        self.assertEqual(self.server.stats.failed, 1)
+
+    def test_full_queue_holds_back_responses(self):
+        self.server = callbacks.CallbackServer(workers=1, maxsize=1)
+        gate = threading.Event()
+        self.server.route('/bots/a', lambda message: gate.wait(5))
+
+        async def post_three():
+            posts = [asyncio.ensure_future(self.post('/bots/a',
+                                                     get_callback(str(i))))
+                     for i in range(3)]
+            await asyncio.sleep(0.2)
+            pending = sum(not p.done() for p in posts)
+            gate.set()
+            await asyncio.gather(*posts)
+            return pending
+
+        self.assertEqual(self.run_with_server(post_three), 1)
+        self.assertEqual(self.server.stats.handled, 3)
+
+    def test_generate_load(self):
+        requests = [('/bots/a', get_callback(str(i))) for i in range(200)]
+
+        async def load():
+            return await callbacks.generate_load('127.0.0.1', self.server.port,
+                                                 requests, connections=4)
+
+        report = self.run_with_server(load)
+        self.assertEqual(report.requests, 200)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(len(self.received), 200)
@@ -0,0 +1,137 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from groupy import compression
+from groupy.api import attachments
+
+
+def get_image_data(size, format='JPEG', **kwargs):
+    image = compression.PILImage.new('RGB', size, color=(200, 10, 10))
+    output = io.BytesIO()
+    image.save(output, format=format, **kwargs)
+    return output.getvalue()
+
+
+@unittest.skipIf(compression.PILImage is None, 'Pillow is not installed')
+class CompressImageTests(unittest.TestCase):
+    def open(self, data):
+        return compression.PILImage.open(io.BytesIO(data))
+
+    def test_large_image_is_downscaled(self):
+        data = get_image_data((400, 200))
+        result = compression.compress_image(data, max_dimension=100)
+        self.assertEqual(self.open(result).size, (100, 50))
+
+    def test_metadata_is_stripped(self):
+        exif = compression.PILImage.Exif()
+        exif[0x010f] = 'Camera Maker'
+        data = get_image_data((400, 200), exif=exif)
+        result = compression.compress_image(data, max_dimension=100)
+        self.assertEqual(len(self.open(result).getexif()), 0)
+
+    def test_metadata_of_small_image_is_stripped(self):
+        exif = compression.PILImage.Exif()
+        exif[0x010f] = 'SecretCam'
+        data = get_image_data((300, 300), exif=exif)
+        result = compression.compress_image(data)
+        self.assertNotIn(b'SecretCam', result)
+
+    def get_transparent_image_data(self, size, **kwargs):
+        image = compression.PILImage.new('RGBA', size, color=(0, 0, 0, 0))
+        image.paste((200, 10, 10, 255), (0, 0, size[0] // 2, size[1]))
+        output = io.BytesIO()
+        image.save(output, format='PNG', **kwargs)
+        return output.getvalue()
+
+    def test_large_transparent_image_keeps_transparency(self):
+        data = self.get_transparent_image_data((400, 200))
+        result = self.open(compression.compress_image(data, max_dimension=100))
+        self.assertEqual(result.format, 'PNG')
+        self.assertEqual(result.size, (100, 50))
+        self.assertEqual(result.getpixel((90, 25))[3], 0)
+
+    def test_small_transparent_image_is_unchanged(self):
+        data = self.get_transparent_image_data((50, 50))
+        result = compression.compress_image(data, max_dimension=100)
+        self.assertEqual(result, data)
+
+    def test_text_of_small_transparent_image_is_stripped(self):
+        from PIL import PngImagePlugin
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Author', 'SecretCam')
+        data = self.get_transparent_image_data((50, 50), pnginfo=info)
+        result = compression.compress_image(data, max_dimension=100)
+        self.assertNotIn(b'SecretCam', result)
+        self.assertEqual(self.open(result).getpixel((40, 25))[3], 0)
+
+    def test_metadata_of_animated_image_is_stripped(self):
+        frames = [compression.PILImage.new('RGB', (20, 20), (i * 80, 0, 0))
+                  for i in range(3)]
+        output = io.BytesIO()
+        frames[0].save(output, format='GIF', save_all=True,
+                       append_images=frames[1:], comment=b'SecretCam')
+        result = compression.compress_image(output.getvalue())
+        self.assertNotIn(b'SecretCam', result)
+        self.assertEqual(self.open(result).n_frames, 3)
+
+    def test_small_image_that_would_grow_is_unchanged(self):
+        data = get_image_data((10, 10), format='PNG')
+        result = compression.compress_image(data, max_dimension=100)
+        self.assertEqual(result, data)
+
+
+@unittest.skipIf(compression.PILImage is None, 'Pillow is not installed')
+class ImageCompressorTests(unittest.TestCase):
+    def setUp(self):
+        self.compressor = compression.ImageCompressor(max_dimension=100)
+        self.data = get_image_data((400, 200), quality=95)
+
+    def test_statistics(self):
+        result = self.compressor.compress(io.BytesIO(self.data))
+        self.assertEqual(self.compressor.count, 1)
+        self.assertEqual(self.compressor.bytes_before, len(self.data))
+        self.assertEqual(self.compressor.bytes_after, len(result.getvalue()))
+        self.assertGreater(self.compressor.bytes_saved, 0)
+
+    def test_compress_many_in_processes(self):
+        self.compressor.processes = 2
+        sources = [io.BytesIO(self.data), io.BytesIO(b'not an image')]
+        compressed, error = self.compressor.compress_many(sources)
+        self.assertEqual(self.compressor.count, 1)
+        self.assertIsInstance(compressed, io.BytesIO)
+        self.assertIsInstance(error, Exception)
+
+    def test_compress_many_reads_paths_in_processes(self):
+        self.compressor.processes = 2
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+        compressed, = self.compressor.compress_many([path])
+        self.assertEqual(self.compressor.bytes_before, len(self.data))
+        self.assertIsInstance(compressed, io.BytesIO)
+
+    def test_images_in_flight_are_bounded(self):
+        self.compressor.processes = 1
+        self.compressor.window = 2
+        read = []
+
+        def get_sources():
+            for i in range(10):
+                read.append(i)
+                yield io.BytesIO(self.data)
+
+        compressed = self.compressor.iter_compressed(get_sources())
+        next(compressed)
+        self.assertEqual(len(read), 2)
+        compressed.close()
+
+    def test_uploads_are_compressed(self):
+        m_session = mock.Mock()
+        images = attachments.Images(m_session, compressor=self.compressor)
+        images.upload(io.BytesIO(self.data))
+        __, kwargs = m_session.post.call_args
+        self.assertLess(len(kwargs['data'].getvalue()), len(self.data))
@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from groupy import export
+from groupy.api import chats
+
+
+class FakeMessages:
+    def __init__(self, ids, fail_after=None):
+        self.ids = sorted(ids, reverse=True)
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def list(self, before_id=None, limit=None):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise ValueError('boom')
+        ids = self.ids
+        if before_id is not None:
+            ids = [i for i in ids if i < int(before_id)]
+        return [mock.Mock(id=str(i)) for i in ids[:limit]]
+
+
+def get_chat(user_id, ids, **kwargs):
+    return mock.Mock(other_user={'id': user_id},
+                     messages=FakeMessages(ids, **kwargs))
+
+
+class ExportStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 100
+        self.stats = export.ExportStats(clock=lambda: self.now)
+
+    def test_add_increases_totals(self):
+        self.stats.add(messages=3, pages=1)
+        self.stats.add(messages=2)
+        self.assertEqual((self.stats.messages, self.stats.pages), (5, 1))
+
+    def test_messages_per_second(self):
+        self.stats.add(messages=50)
+        self.now = 110
+        self.assertEqual(self.stats.messages_per_second, 5)
+
+    def test_messages_per_second_without_elapsed_time(self):
+        self.assertEqual(self.stats.messages_per_second, 0)
+
+
+class DirectMessageExporterTests(unittest.TestCase):
+    def setUp(self):
+        self.exported = {}
+        self.chats = [get_chat('a', range(1, 8)), get_chat('b', range(1, 4))]
+        self.manager = mock.Mock()
+        self.manager.list_all.return_value = self.chats
+
+    def sink(self, chat, messages):
+        user_id = chat.other_user['id']
+        self.exported.setdefault(user_id, []).extend(m.id for m in messages)
+
+    def get_exporter(self, **kwargs):
+        return export.DirectMessageExporter(self.manager, self.sink, limit=3,
+                                            workers=2, **kwargs)
+
+    def test_every_message_of_every_chat_is_exported(self):
+        stats = self.get_exporter().export()
+        self.assertEqual(self.exported['a'], [str(i) for i in range(7, 0, -1)])
+        self.assertEqual(self.exported['b'], ['3', '2', '1'])
+        self.assertEqual((stats.chats, stats.messages), (2, 10))
+
+    def test_pages_are_counted(self):
+        stats = self.get_exporter().export()
+        # 3 full or partial pages plus an empty one, and 1 plus an empty one
+        self.assertEqual(stats.pages, 6)
+
+    def test_failed_chat_does_not_stop_others(self):
+        self.chats[0] = get_chat('a', range(1, 8), fail_after=1)
+        stats = self.get_exporter().export()
+        self.assertEqual(stats.failures, 1)
+        self.assertEqual(self.exported['b'], ['3', '2', '1'])
+
+    def test_elapsed_time_stops_when_done(self):
+        now = [10]
+        stats = self.get_exporter(clock=lambda: now[0]).export()
+        now[0] = 20
+        self.assertEqual(stats.elapsed, 0)
+        self.assertEqual(stats.finished_at, 10)
+
+    def test_given_chats_are_exported(self):
+        self.get_exporter().export(chats=self.chats[1:])
+        self.assertEqual(list(self.exported), ['b'])
+        self.assertFalse(self.manager.list_all.called)
+
+
+class CheckpointTests(DirectMessageExporterTests):
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_checkpoints_are_saved(self):
+        self.get_exporter(path=self.path).export()
+        with open(self.path) as f:
+            checkpoints = json.load(f)
+        self.assertEqual(checkpoints['a'],
+                         {'cursor': '1', 'done': True, 'count': 7})
+
+    def test_export_resumes_from_checkpoint(self):
+        self.chats[0] = get_chat('a', range(1, 8), fail_after=1)
+        self.get_exporter(path=self.path).export()
+        self.exported.clear()
+        self.chats[0] = get_chat('a', range(1, 8))
+        stats = self.get_exporter(path=self.path).export()
+        self.assertEqual(self.exported['a'], ['4', '3', '2', '1'])
+        self.assertEqual(stats.messages, 4)
+
+    def test_done_chats_are_skipped(self):
+        self.get_exporter(path=self.path).export()
+        self.chats[1] = get_chat('b', range(1, 4))
+        self.get_exporter(path=self.path).export()
+        self.assertEqual(self.chats[1].messages.calls, 0)
+
+
+class ExportChatsTests(unittest.TestCase):
+    def test_export_uses_the_exporter(self):
+        manager = chats.Chats(mock.Mock())
+        sink = mock.Mock()
+        with mock.patch.object(export, 'DirectMessageExporter') as m_exporter:
+            result = manager.export(sink, workers=2)
+        m_exporter.assert_called_once_with(manager, sink, workers=2)
+        self.assertEqual(result, m_exporter.return_value.export.return_value)
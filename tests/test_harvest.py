@@ -0,0 +1,53 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from groupy import cache
+from groupy import harvest
+from groupy.api import attachments
+
+
+class HarvesterTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = cache.ContentStore(self.dir.name)
+        self.images = attachments.Images(mock.Mock())
+        self.images.download_to = mock.Mock(side_effect=self.download_to)
+        self.content = {'a': b'foo', 'b': b'bar', 'c': b'foo'}
+        self.harvester = harvest.Harvester(self.images, self.store, workers=2)
+
+    def download_to(self, image, fp, suffix=None):
+        fp.write(self.content[image.url])
+
+    def get_messages(self, *urls):
+        images = [attachments.Image(url) for url in urls]
+        location = attachments.Location(lat=1, lng=2, name='foo')
+        return [mock.Mock(attachments=[image, location]) for image in images]
+
+    def test_images_are_stored(self):
+        stats = self.harvester.harvest(self.get_messages('a', 'b'))
+        self.assertEqual(stats.downloads, 2)
+        self.assertEqual(stats.bytes, 6)
+        self.assertIsNotNone(self.store.lookup('b'))
+
+    def test_duplicate_urls_are_downloaded_once(self):
+        stats = self.harvester.harvest(self.get_messages('a', 'a', 'b'))
+        self.assertEqual(self.images.download_to.call_count, 2)
+        self.assertEqual(stats.url_hits, 1)
+
+    def test_stored_urls_are_skipped(self):
+        self.harvester.harvest(self.get_messages('a'))
+        stats = self.harvester.harvest(self.get_messages('a', 'b'))
+        self.assertEqual(stats.downloads, 1)
+        self.assertEqual(stats.url_hit_rate, 0.5)
+
+    def test_duplicate_content_is_counted(self):
+        stats = self.harvester.harvest(self.get_messages('a', 'c'))
+        self.assertEqual(stats.content_hits, 1)
+        self.assertEqual(stats.content_hit_rate, 0.5)
+
+    def test_failures_are_recorded(self):
+        self.content = {}
+        stats = self.harvester.harvest(self.get_messages('a'))
+        self.assertEqual([url for url, __ in stats.failures], ['a'])
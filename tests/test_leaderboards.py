@@ -0,0 +1,90 @@
+import threading
+import unittest
+from unittest import mock
+
+from groupy import leaderboards
+
+
+def get_message_data(message_id, group_id, like_count):
+    return {'id': message_id, 'group_id': group_id, 'created_at': 1,
+            'favorited_by': ['u{}'.format(i) for i in range(like_count)]}
+
+
+class AggregateLeaderboardTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.boards = {
+            'g1': [get_message_data('1', 'g1', 5), get_message_data('2', 'g1', 1)],
+            'g2': [get_message_data('3', 'g2', 7)],
+            'g3': [get_message_data('4', 'g3', 3)],
+        }
+        self.requests = []
+        self.lock = threading.Lock()
+        self.m_session = mock.Mock()
+        self.m_session.get.side_effect = self.get
+        self.leaderboard = leaderboards.AggregateLeaderboard(
+            self.m_session, ['g1', 'g2', 'g3'], ttl=60,
+            clock=lambda: self.now)
+
+    def get(self, url, params):
+        group_id = url.split('/')[-2]
+        with self.lock:
+            self.requests.append((group_id, params['period']))
+        if group_id not in self.boards:
+            raise ValueError(group_id)
+        return mock.Mock(data={'messages': self.boards[group_id]})
+
+    def test_top_merges_groups_by_like_count(self):
+        top = self.leaderboard.top(k=3)
+        self.assertEqual([m.id for m in top], ['3', '1', '4'])
+
+    def test_leaderboards_are_cached(self):
+        self.leaderboard.top()
+        self.leaderboard.top()
+        self.assertEqual(len(self.requests), 3)
+
+    def test_periods_are_cached_separately(self):
+        self.leaderboard.top(period='day')
+        self.leaderboard.top(period='week')
+        self.assertEqual(len(self.requests), 6)
+
+    def test_stale_leaderboards_are_fetched_again(self):
+        self.leaderboard.top()
+        self.now = 60
+        self.leaderboard.top()
+        self.assertEqual(len(self.requests), 6)
+
+    def test_failed_group_keeps_previous_leaderboard(self):
+        self.leaderboard.top()
+        self.now = 60
+        del self.boards['g2']
+        top = self.leaderboard.top(k=1)
+        self.assertEqual([m.id for m in top], ['3'])
+
+    def test_failed_group_is_skipped(self):
+        self.leaderboard.group_ids.append('g4')
+        top = self.leaderboard.top(k=10)
+        self.assertEqual(len(top), 4)
+
+    def test_running_leaderboard_serves_stale_entries(self):
+        self.leaderboard.top()
+        self.leaderboard._thread = mock.Mock(is_alive=lambda: True)
+        self.now = 60
+        self.leaderboard.top()
+        self.assertEqual(len(self.requests), 3)
+
+    def test_background_refresh(self):
+        refreshed = threading.Event()
+        refresh = self.leaderboard.refresh
+
+        def record_refresh(period, missing_only=False):
+            count = refresh(period, missing_only=missing_only)
+            refreshed.set()
+            return count
+
+        self.leaderboard.refresh = record_refresh
+        self.leaderboard.start(periods=['week'], interval=10)
+        self.assertTrue(refreshed.wait(5))
+        self.leaderboard.stop()
+        self.assertFalse(self.leaderboard.is_running)
+        self.assertIn(('g1', 'week'), self.requests)
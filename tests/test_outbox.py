@@ -0,0 +1,159 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from groupy import exceptions
+from groupy import outbox
+from groupy.api import attachments
+from groupy.api import messages
+
+
+class FakeSession:
+    """A stand-in session that remembers the messages posted to groups."""
+
+    def __init__(self):
+        self.posted = []
+        self.failures = []
+        self.lost_responses = 0
+
+    def post(self, url, json):
+        if self.failures:
+            raise self.failures.pop(0)
+        message = dict(json['message'], id=str(len(self.posted) + 1),
+                       group_id=url.split('/')[-2], created_at=time.time())
+        self.posted.append(message)
+        if self.lost_responses:
+            self.lost_responses -= 1
+            raise exceptions.NoResponse(None)
+        return mock.Mock(data={'message': message})
+
+    def get(self, url, params):
+        page = [] if params.get('before_id') else self.posted[::-1]
+        return mock.Mock(status_code=200, data={'messages': page})
+
+
+def get_error(status_code):
+    return exceptions.BadResponse(mock.Mock(status_code=status_code),
+                                  message='x')
+
+
+class OutboxTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.session = FakeSession()
+        self.outbox = outbox.Outbox(self.session, self.path, max_attempts=3)
+        self.manager = messages.Messages(self.session, 'g1')
+
+    def tearDown(self):
+        self.outbox.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def reopen(self):
+        self.outbox.close()
+        self.outbox = outbox.Outbox(self.session, self.path, max_attempts=3)
+
+    def test_send_is_delivered(self):
+        send = self.outbox.send(self.manager, text='hi')
+        self.assertEqual(send.status, outbox.SENT)
+        self.assertEqual(send.message_id, '1')
+        self.assertEqual(self.session.posted[0]['source_guid'], send.source_guid)
+
+    def test_source_guids_are_unique(self):
+        guids = {self.outbox.add(self.manager, text='hi').source_guid
+                 for __ in range(100)}
+        self.assertEqual(len(guids), 100)
+
+    def test_delivered_send_is_persisted(self):
+        send = self.outbox.send(self.manager, text='hi')
+        self.reopen()
+        self.assertEqual(self.outbox.get(send.source_guid).status, outbox.SENT)
+
+    def test_pending_send_survives_restart(self):
+        send = self.outbox.add(self.manager, text='hi')
+        self.reopen()
+        self.assertEqual(self.outbox.pending(), [send])
+
+    def test_flush_delivers_pending_sends(self):
+        self.outbox.add(self.manager, text='one')
+        self.outbox.add(self.manager, text='two')
+        self.reopen()
+        sends = self.outbox.flush()
+        self.assertEqual([s.status for s in sends], [outbox.SENT] * 2)
+        self.assertEqual([m['text'] for m in self.session.posted],
+                         ['one', 'two'])
+
+    def test_attachments_survive_restart(self):
+        image = attachments.Image(url='http://example.com/a.png')
+        self.outbox.add(self.manager, text='hi', attachments=[image])
+        self.reopen()
+        self.outbox.flush()
+        self.assertEqual(self.session.posted[0]['attachments'],
+                         [image.to_json()])
+
+    def test_lost_response_is_not_posted_twice(self):
+        self.session.lost_responses = 1
+        send = self.outbox.send(self.manager, text='hi')
+        self.assertEqual(send.status, outbox.PENDING)
+        send = self.outbox.deliver(send)
+        self.assertEqual(send.status, outbox.SENT)
+        self.assertEqual(send.message_id, '1')
+        self.assertEqual(len(self.session.posted), 1)
+
+    def test_retry_finds_send_among_other_messages(self):
+        self.outbox.send(self.manager, text='earlier')
+        self.session.lost_responses = 1
+        send = self.outbox.send(self.manager, text='hi')
+        self.outbox.send(self.manager, text='later')
+        send = self.outbox.deliver(send)
+        self.assertEqual(send.status, outbox.SENT)
+        self.assertEqual(send.message_id, '2')
+        self.assertEqual(len(self.session.posted), 3)
+
+    def test_retry_posts_again_when_send_is_not_found(self):
+        self.outbox.send(self.manager, text='earlier')
+        self.session.failures = [exceptions.NoResponse(None)]
+        send = self.outbox.send(self.manager, text='hi')
+        send = self.outbox.deliver(send)
+        self.assertEqual(send.status, outbox.SENT)
+        self.assertEqual([m['text'] for m in self.session.posted],
+                         ['earlier', 'hi'])
+
+    def test_transient_failure_is_retried(self):
+        self.session.failures = [get_error(503)]
+        send = self.outbox.send(self.manager, text='hi')
+        self.assertEqual(send.status, outbox.PENDING)
+        self.assertEqual(send.attempts, 1)
+        send = self.outbox.deliver(send)
+        self.assertEqual(send.status, outbox.SENT)
+        self.assertEqual(len(self.session.posted), 1)
+
+    def test_permanent_failure_fails(self):
+        self.session.failures = [get_error(400)]
+        send = self.outbox.send(self.manager, text='hi')
+        self.assertEqual(send.status, outbox.FAILED)
+        self.assertEqual(self.outbox.pending(), [])
+
+    def test_duplicate_guid_means_sent(self):
+        self.session.failures = [get_error(409)]
+        send = self.outbox.send(self.manager, text='hi')
+        self.assertEqual(send.status, outbox.SENT)
+
+    def test_send_fails_after_max_attempts(self):
+        self.session.failures = [get_error(503)] * 3
+        send = self.outbox.send(self.manager, text='hi')
+        for __ in range(3):
+            send = self.outbox.deliver(send)
+        self.assertEqual(send.status, outbox.FAILED)
+        self.assertEqual(send.attempts, 3)
+
+    def test_direct_message_sends_are_rebuilt_as_direct_messages(self):
+        manager = messages.DirectMessages(self.session, 'u1')
+        send = self.outbox.add(manager, text='hi')
+        rebuilt = self.outbox.get_manager(send)
+        self.assertIsInstance(rebuilt, messages.DirectMessages)
+        self.assertEqual(rebuilt.other_user_id, 'u1')
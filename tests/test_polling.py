@@ -0,0 +1,197 @@
+import unittest
+from unittest import mock
+
+from groupy import exceptions
+from groupy import pagers
+from groupy import polling
+
+
+class FakeDirectMessages:
+    url = 'https://example.com/messages'
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+
+    def _raw_list(self, before_id=None, since_id=None, after_id=None,
+                  limit=20):
+        ids = self.ids
+        if after_id is not None:
+            ids = [i for i in ids if i > int(after_id)][:limit]
+            return [mock.Mock(id=str(i)) for i in ids]
+        if before_id is not None:
+            ids = [i for i in ids if i < int(before_id)]
+        if since_id is not None:
+            ids = [i for i in ids if i > int(since_id)]
+        return [mock.Mock(id=str(i)) for i in reversed(ids[-limit:])]
+
+    def list(self, **params):
+        return pagers.MessageList(self, self._raw_list, **params)
+
+    def list_since(self, message_id, limit=None):
+        return self.list(since_id=message_id, limit=limit)
+
+
+class FakeMessages(FakeDirectMessages):
+    def list_after(self, message_id, limit=None):
+        return self.list(after_id=message_id, limit=limit)
+
+
+class GapAwarePollerTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = FakeMessages(range(1, 11))
+        self.poller = polling.GapAwarePoller(self.manager, last_id='10',
+                                             limit=5)
+
+    def get_ids(self):
+        return [int(m.id) for m in self.poller.poll()]
+
+    def test_no_new_messages(self):
+        self.assertEqual(self.get_ids(), [])
+
+    def test_partial_page_has_no_gap(self):
+        self.manager.ids.extend(range(11, 14))
+        self.assertEqual(self.get_ids(), [11, 12, 13])
+        self.assertEqual(self.poller.gaps_found, 0)
+
+    def test_full_page_gap_is_filled(self):
+        self.manager.ids.extend(range(11, 24))
+        self.assertEqual(self.get_ids(), list(range(11, 24)))
+        self.assertEqual(self.poller.gaps_found, 1)
+        self.assertEqual(self.poller.gaps_filled, 1)
+        self.assertEqual(self.poller.messages_recovered, 8)
+
+    def test_watermark_is_moved(self):
+        self.manager.ids.extend(range(11, 24))
+        self.poller.poll()
+        self.assertEqual(self.poller.last_id, '23')
+
+    def test_first_poll_sets_watermark(self):
+        poller = polling.GapAwarePoller(self.manager)
+        self.assertEqual(poller.poll(), [])
+        self.assertEqual(poller.last_id, '10')
+
+    def test_limiter_is_charged_per_request(self):
+        self.poller.limiter = mock.Mock()
+        self.manager._raw_list = mock.Mock(wraps=self.manager._raw_list)
+        self.manager.ids.extend(range(11, 24))
+        self.poller.poll()
+        self.assertEqual(self.poller.limiter.acquire.call_count,
+                         self.manager._raw_list.call_count)
+
+
+class DirectMessagesGapAwarePollerTests(unittest.TestCase):
+    def test_gap_is_filled_backwards(self):
+        manager = FakeDirectMessages(range(1, 24))
+        poller = polling.GapAwarePoller(manager, last_id='10', limit=5)
+        ids = [int(m.id) for m in poller.poll()]
+        self.assertEqual(ids, list(range(11, 24)))
+
+
+class FetchSinceTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = FakeMessages(range(1, 11))
+
+    def test_new_messages_and_watermark(self):
+        messages, last_id = polling.fetch_since(self.manager, '7', limit=5)
+        self.assertEqual([m.id for m in messages], ['8', '9', '10'])
+        self.assertEqual(last_id, '10')
+
+    def test_no_watermark_fetches_every_message(self):
+        messages, last_id = polling.fetch_since(self.manager, None, limit=5)
+        self.assertEqual(len(messages), 10)
+        self.assertEqual(last_id, '10')
+
+    def test_watermark_is_kept_without_new_messages(self):
+        messages, last_id = polling.fetch_since(self.manager, '10')
+        self.assertEqual((messages, last_id), ([], '10'))
+
+
+class MultiPollerTests(unittest.TestCase):
+    def setUp(self):
+        self.delivered = []
+        self.poller = polling.MultiPoller(self.handle, min_interval=1,
+                                          max_interval=8)
+        self.hot = FakeMessages(range(1, 11))
+        self.idle = FakeMessages(range(1, 11))
+        self.hot_conversation = self.poller.watch(self.hot, last_id='10')
+        self.idle_conversation = self.poller.watch(self.idle, last_id='10')
+
+    def handle(self, conversation, messages):
+        self.delivered.append((conversation, [int(m.id) for m in messages]))
+
+    def test_messages_are_delivered_in_order(self):
+        self.hot.ids.extend([11, 12, 13])
+        self.poller.poll_due(now=0)
+        self.assertEqual(self.delivered, [(self.hot_conversation, [11, 12, 13])])
+
+    def test_idle_conversations_slow_down(self):
+        for now in range(0, 30):
+            self.poller.poll_due(now=now)
+        self.assertEqual(self.idle_conversation.interval, 8)
+        self.assertLess(self.idle_conversation.polls, 8)
+
+    def test_active_conversations_speed_up(self):
+        for now in range(0, 30):
+            self.hot.ids.append(self.hot.ids[-1] + 1)
+            self.poller.poll_due(now=now)
+        self.assertEqual(self.hot_conversation.interval, 1)
+        self.assertEqual(self.hot_conversation.polls, 30)
+        self.assertEqual(self.hot_conversation.message_count, 30)
+
+    def test_only_due_conversations_are_polled(self):
+        self.poller.poll_due(now=0)
+        self.assertEqual(self.poller.poll_due(now=1), 0)
+        self.assertEqual(self.poller.poll_due(now=2), 2)
+
+    def test_unwatched_conversations_are_not_polled(self):
+        self.poller.unwatch(self.idle_conversation)
+        self.assertEqual(self.poller.poll_due(now=0), 1)
+
+    def test_delay_until_next_poll(self):
+        self.poller.poll_due(now=0)
+        self.assertEqual(self.poller.get_delay(now=0.5), 1.5)
+
+    def test_rate_limit_is_shared(self):
+        poller = polling.MultiPoller(self.handle, rate=100)
+        poller.limiter = mock.Mock()
+        poller.watch(self.hot, last_id='10')
+        poller.watch(self.idle, last_id='10')
+        poller.poll_due(now=0)
+        self.assertEqual(poller.limiter.acquire.call_count, 2)
+
+    def test_rate_limit_is_charged_for_gap_requests(self):
+        poller = polling.MultiPoller(self.handle, rate=100, limit=5)
+        poller.limiter = mock.Mock()
+        poller.watch(self.hot, last_id='10')
+        self.hot.ids.extend(range(11, 24))
+        poller.poll_due(now=0)
+        self.assertGreater(poller.limiter.acquire.call_count, 1)
+
+    def test_run_until_stopped(self):
+        self.hot.ids.append(11)
+        self.handle = mock.Mock(side_effect=lambda *args: self.poller.stop())
+        self.poller.handler = self.handle
+        self.poller.run()
+        self.assertEqual(self.handle.call_count, 1)
+
+    def test_failed_poll_keeps_conversation_scheduled(self):
+        self.hot.list_since = mock.Mock(
+            side_effect=exceptions.NoResponse(None))
+        self.assertEqual(self.poller.poll_due(now=0), 2)
+        self.assertEqual(self.hot_conversation.failures, 1)
+        self.assertEqual(self.poller.get_delay(now=0), 2)
+        self.assertEqual(self.poller.poll_due(now=2), 2)
+
+    def test_failed_poll_backs_off(self):
+        self.hot.list_since = mock.Mock(
+            side_effect=exceptions.NoResponse(None))
+        for now in range(0, 30):
+            self.poller.poll_due(now=now)
+        self.assertEqual(self.hot_conversation.interval, 8)
+
+    def test_handler_error_keeps_conversations_scheduled(self):
+        self.hot.ids.append(11)
+        self.poller.handler = mock.Mock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            self.poller.poll_due(now=0)
+        self.assertEqual(len(self.poller._schedule), 2)
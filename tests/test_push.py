@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http import server
+
+from groupy import push
+from groupy import session
+from groupy.api import messages
+
+
+def get_line(message_id, group_id='g1'):
+    subject = {'id': message_id, 'group_id': group_id, 'created_at': 1,
+               'text': 'hi', 'name': 'bob'}
+    return {'type': 'line.create', 'subject': subject}
+
+
+def get_direct_message(message_id):
+    subject = {'id': message_id, 'sender_id': 'u2', 'recipient_id': 'u1',
+               'created_at': 1, 'text': 'hi', 'name': 'bob'}
+    return {'type': 'direct_message.create', 'subject': subject}
+
+
+class FakeBayeuxServer(server.HTTPServer):
+    """A stand-in for the push service that serves queued events."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeBayeuxHandler)
+        self.events = []
+        self.subscriptions = []
+        self.handshakes = 0
+        self.failures = 0
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/faye'.format(self.server_address[1])
+
+
+class FakeBayeuxHandler(server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers['content-length'])
+        message, = json.loads(self.rfile.read(length).decode('utf-8'))
+        if self.server.failures:
+            self.server.failures -= 1
+            return self.reply(500, {})
+        channel = message['channel']
+        replies = [{'channel': channel, 'id': message['id'], 'successful': True}]
+        if channel == '/meta/handshake':
+            self.server.handshakes += 1
+            replies[0]['clientId'] = 'abc'
+        elif channel == '/meta/subscribe':
+            self.server.subscriptions.append(message['subscription'])
+        elif channel == '/meta/connect':
+            events, self.server.events = self.server.events, []
+            if not events:
+                time.sleep(0.01)
+            replies.extend({'channel': '/user/u1', 'data': e} for e in events)
+        self.reply(200, replies)
+
+    def reply(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PushClientTests(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeBayeuxServer()
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.01,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.session = session.Session('token')
+        self.client = push.PushClient(self.session, 'u1', group_ids=['g1'],
+                                      url=self.server.url, timeout=5,
+                                      backoff=0.01)
+        self.addCleanup(self.client.stop)
+        self.received = []
+        self.done = threading.Event()
+        self.client.handlers.append(self.receive)
+
+    def receive(self, message):
+        self.received.append(message)
+        if len(self.received) == 2:
+            self.done.set()
+
+    def test_subscribes_to_user_and_group_channels(self):
+        self.server.events = [get_line('1'), get_direct_message('2')]
+        self.client.start()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.server.subscriptions, ['/user/u1', '/group/g1'])
+
+    def test_messages_are_converted(self):
+        self.server.events = [get_line('1'), get_direct_message('2')]
+        self.client.start()
+        self.assertTrue(self.done.wait(5))
+        message, direct_message = self.received
+        self.assertIsInstance(message, messages.Message)
+        self.assertIsInstance(direct_message, messages.DirectMessage)
+        self.assertEqual(direct_message.manager.other_user_id, 'u2')
+
+    def test_duplicates_are_dropped(self):
+        self.server.events = [get_line('1'), get_line('1'), get_line('2')]
+        self.client.start()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual([m.id for m in self.received], ['1', '2'])
+
+    def test_reconnects_after_failure(self):
+        self.server.failures = 2
+        self.server.events = [get_line('1'), get_line('2')]
+        self.client.start()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.server.handshakes, 1)
+
+    def test_async_iteration(self):
+        self.server.events = [get_line('1'), get_line('2')]
+
+        async def receive_two():
+            received = []
+            async for message in self.client:
+                received.append(message.id)
+                if len(received) == 2:
+                    break
+            return received
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        received = loop.run_until_complete(asyncio.wait_for(receive_two(), 5))
+        self.assertEqual(received, ['1', '2'])
@@ -65,3 +65,107 @@ class FilterTests(unittest.TestCase):
         f = utils.make_filter(baz__lt=10)
         with self.assertRaises(exceptions.MultipleMatchesError):
             f.find(self.objects)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.limiter = utils.RateLimiter(2, capacity=2, clock=lambda: self.now)
+
+    def test_burst_up_to_capacity(self):
+        self.assertEqual(self.limiter.try_acquire(), 0)
+        self.assertEqual(self.limiter.try_acquire(), 0)
+        self.assertEqual(self.limiter.try_acquire(), 0.5)
+
+    def test_tokens_are_replenished(self):
+        self.limiter.try_acquire(2)
+        self.now = 0.5
+        self.assertEqual(self.limiter.try_acquire(), 0)
+
+
+class IsTransientErrorTests(unittest.TestCase):
+    def get_bad_response(self, code):
+        return exceptions.BadResponse(mock.Mock(status_code=code), message='x')
+
+    def test_no_response_is_transient(self):
+        error = exceptions.NoResponse(mock.Mock())
+        self.assertTrue(utils.is_transient_error(error))
+
+    def test_server_error_is_transient(self):
+        self.assertTrue(utils.is_transient_error(self.get_bad_response(502)))
+
+    def test_too_many_requests_is_transient(self):
+        self.assertTrue(utils.is_transient_error(self.get_bad_response(429)))
+
+    def test_client_error_is_not_transient(self):
+        self.assertFalse(utils.is_transient_error(self.get_bad_response(400)))
+
+    def test_other_errors_are_not_transient(self):
+        self.assertFalse(utils.is_transient_error(ValueError()))
+
+
+class IsDuplicateErrorTests(unittest.TestCase):
+    def test_conflict_is_duplicate(self):
+        error = exceptions.BadResponse(mock.Mock(status_code=409), message='x')
+        self.assertTrue(utils.is_duplicate_error(error))
+
+    def test_other_bad_responses_are_not_duplicates(self):
+        error = exceptions.BadResponse(mock.Mock(status_code=400), message='x')
+        self.assertFalse(utils.is_duplicate_error(error))
+
+    def test_no_response_is_not_duplicate(self):
+        error = exceptions.NoResponse(mock.Mock())
+        self.assertFalse(utils.is_duplicate_error(error))
+
+
+class RecentSetTests(unittest.TestCase):
+    def setUp(self):
+        self.items = utils.RecentSet(2)
+
+    def test_add_new_item(self):
+        self.assertTrue(self.items.add('a'))
+        self.assertIn('a', self.items)
+
+    def test_add_existing_item(self):
+        self.items.add('a')
+        self.assertFalse(self.items.add('a'))
+
+    def test_oldest_items_are_forgotten(self):
+        for item in 'abc':
+            self.items.add(item)
+        self.assertNotIn('a', self.items)
+        self.assertEqual(len(self.items), 2)
+
+
+class ResultTests(unittest.TestCase):
+    def test_ok_without_error(self):
+        self.assertTrue(utils.Result('a', 1, None).ok)
+
+    def test_not_ok_with_error(self):
+        self.assertFalse(utils.Result('a', None, ValueError()).ok)
+
+
+class StatsTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 10
+        self.stats = utils.Stats(clock=lambda: self.now)
+        self.stats.count = 0
+
+    def test_add(self):
+        self.stats.add(count=2)
+        self.stats.add(count=3)
+        self.assertEqual(self.stats.count, 5)
+
+    def test_rate(self):
+        self.stats.add(count=10)
+        self.now = 15
+        self.assertEqual(self.stats.get_rate('count'), 2)
+
+    def test_rate_without_elapsed_time(self):
+        self.assertEqual(self.stats.get_rate('count'), 0)
+
+    def test_elapsed_stops_when_finished(self):
+        self.now = 12
+        self.stats.finished_at = 12
+        self.now = 20
+        self.assertEqual(self.stats.elapsed, 2)